@@ -1,8 +1,13 @@
+import os
+
 des_data_network_dir = r"path to dir"
 bom_data_network_dir = r'path to dir'
 oeh_data_network_dir = r"path to dir"
 epav_data_network_dir = r"path to dir"
 
+# Local folder used to cache parsed station data between runs
+local_cache_dir = os.path.join(os.path.expanduser("~"), ".windrose_tool_cache")
+
 data_source_dict = {
     'BOM': bom_data_network_dir,
     'DES': des_data_network_dir,
@@ -24,6 +29,17 @@ cols_for_r = {
     'Date': 'date'
 }
 
+# Default wind rose options shared by the GUI and the headless batch runner
+default_hours = '0-23'
+default_ws_cats = '0.5,1,2,3,4,5,7,10,15,20'
+default_grid = 10
+default_ray = 30
+default_calms = 0.5
+default_image_format = 'png'
+
+# wind rose image formats - PNGs are rendered on white, SVG and PDF can be rendered on a transparent background
+image_formats = ['png', 'svg', 'pdf']
+
 r_type_size_dict = {
     'default': [800, 800],
     'season_daylight': [1500, 1000],
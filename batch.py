@@ -0,0 +1,195 @@
+import argparse
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from __params__ import data_source_dict, default_hours, default_ws_cats, default_grid, default_ray, default_calms, \
+    default_image_format, image_formats
+
+
+def parse_args(argv: list = None):
+    """
+    Command line arguments for the headless batch runner - the wind rose options match the GUI
+    :param argv: list of arguments, defaults to sys.argv
+    :return: parsed arguments
+    """
+    parser = argparse.ArgumentParser(description="Generate wind roses for many stations in one of AECOM's met databases without the GUI")
+    parser.add_argument('data_source', choices=list(data_source_dict), help="Database to load the stations from")
+    parser.add_argument('output_folder', help="Folder to store output - a sub folder is created for each station")
+    stations_grp = parser.add_mutually_exclusive_group(required=True)
+    stations_grp.add_argument('--stations', nargs="+", help="Station IDs or names to process")
+    stations_grp.add_argument('--all', action="store_true", help="Process all stations in the database")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="Number of worker processes")
+    parser.add_argument('--latitude', type=float, default=-34,
+                        help="Latitude used for stations without a 'Latitude' column in the station list")
+    parser.add_argument('--longitude', type=float, default=151,
+                        help="Longitude used for stations without a 'Longitude' column in the station list")
+    parser.add_argument('--data_period', type=str, help="Optional start and end date e.g. 1/1/2019-31/12/2019")
+    parser.add_argument('--cust_hours', type=str, default=default_hours, help="Subset of hours e.g. 0-6,18-23")
+    parser.add_argument('--wind_speed_categories', type=str, default=default_ws_cats)
+    parser.add_argument('--grid_spacing', type=int, default=default_grid)
+    parser.add_argument('--ray_angle', type=float, default=default_ray)
+    parser.add_argument('--calms_threshold', type=float, default=default_calms)
+    parser.add_argument('--max_freq', type=int)
+    parser.add_argument('--prefix', type=str)
+    parser.add_argument('--all_hours', action="store_true")
+    parser.add_argument('--seasons', action="store_true")
+    parser.add_argument('--seasons_daylight', action="store_true")
+    parser.add_argument('--monthly', action="store_true")
+    parser.add_argument('--annual_daylight', action="store_true")
+    parser.add_argument('--annual', action="store_true")
+    parser.add_argument('--transparent', action="store_true")
+    parser.add_argument('--save_tables', action="store_true")
+    parser.add_argument('--stats_only', action="store_true")
+    parser.add_argument('--use_cube', action="store_true",
+                        help="Produce the tables and matplotlib wind roses from each station's cached wind count cube")
+    parser.add_argument('--use_store', action="store_true",
+                        help="Read stations from their binary stores, if built with station_store.py")
+    parser.add_argument('--compact', action="store_true",
+                        help="Hold the wind data as float32/int16 columns - for long 1-minute records")
+    parser.add_argument('--image_format', choices=image_formats, default=default_image_format)
+    parser.add_argument('--render_cache', action="store_true",
+                        help="Copy wind roses rendered before from the same data and options instead of rendering them again")
+    parser.add_argument('--profile', action="store_true",
+                        help="Save the time and memory used by each stage next to each station's wind roses")
+    parser.add_argument('--resample', type=str,
+                        help="Average sub-hourly data into this interval while it is read - e.g. 1h or 10min")
+    parser.add_argument('--backend', choices=['R', 'matplotlib'], default='R')
+    parser.add_argument('--render_workers', type=int, default=1,
+                        help="Worker processes per station for the rose types and annual roses - useful for a few long stations")
+    return parser.parse_args(argv)
+
+
+def get_station_locations(data_source: str) -> dict:
+    """
+    Reads the station coordinates from the database station list where available
+    :param data_source: database identifier
+    :return: dictionary of station name to (latitude, longitude)
+    """
+    from station_catalogue import get_station_catalogue
+    try:
+        stations = get_station_catalogue().refresh(data_source, data_source_dict.get(data_source))["stations"]
+    except FileNotFoundError:
+        return {}
+    return {x["name"]: (x["latitude"], x["longitude"]) for x in stations if "latitude" in x}
+
+
+def run_station(station_id: str,
+                options: dict) -> dict:
+    """
+    Generates the wind roses for one station - runs in a worker process
+    :param station_id: station name or ID
+    :param options: keyword arguments for windrose_from_data
+    :return: dictionary summarising the result for the station
+    """
+    from main_wind_rose_function import windrose_from_data
+    start = time.perf_counter()
+    try:
+        outputs = windrose_from_data(station_id=station_id, database_source=True, **options)
+    except Exception as e:
+        return {"station": station_id, "success": False, "seconds": time.perf_counter() - start, "outputs": 0,
+                "error": f"{type(e).__name__}: {e}".strip(": "), "traceback": traceback.format_exc()}
+    return {"station": station_id, "success": True, "seconds": time.perf_counter() - start,
+            "outputs": len(outputs or []), "error": ""}
+
+
+def run_batch(data_source: str,
+              stations: list,
+              options: dict,
+              workers: int = None,
+              station_locations: dict = None) -> list:
+    """
+    Spreads windrose_from_data over a pool of worker processes, one station per task
+    :param data_source: database identifier
+    :param stations: list of station names or IDs
+    :param options: keyword arguments for windrose_from_data, excluding the station
+    :param workers: number of worker processes
+    :param station_locations: optional dictionary of station name to (latitude, longitude)
+    :return: list of result dictionaries, in the same order as the stations
+    """
+    from main_wind_rose_function import init_render_worker
+    station_locations = station_locations or {}
+    results = {}
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_render_worker,
+                             initargs=(options.get("backend", "R") == 'R' and not options.get("stats_only"),)) as executor:
+        futures = {}
+        for station_id in stations:
+            station_options = dict(options, data_source=data_source)
+            if station_id in station_locations:
+                station_options["lat"], station_options["long"] = station_locations[station_id]
+            futures[executor.submit(run_station, station_id, station_options)] = station_id
+        for future in as_completed(futures):
+            result = future.result()
+            results[futures[future]] = result
+            status = "OK" if result["success"] else "FAILED - " + result["error"]
+            print(f"[{len(results)}/{len(stations)}] {result['station']}: {status} ({result['seconds']:.1f} s)", flush=True)
+    return [results[x] for x in stations]
+
+
+def print_summary(results: list,
+                  elapsed: float):
+    """
+    Prints the per-station success/failure summary and the overall throughput
+    :param results: list of result dictionaries from run_batch
+    :param elapsed: wall time for the whole batch in seconds
+    """
+    failed = [x for x in results if not x["success"]]
+    n_outputs = sum(x["outputs"] for x in results)
+    print("\n========== Batch summary ==========")
+    for result in results:
+        status = "OK    " if result["success"] else "FAILED"
+        print(f"{status} {result['station']:30s} {result['seconds']:8.1f} s  {result['outputs']:4d} outputs  {result['error']}")
+    print(f"\n{len(results) - len(failed)} of {len(results)} stations succeeded, {n_outputs} outputs in {elapsed:.1f} s")
+    if elapsed > 0:
+        print(f"Throughput: {len(results) / elapsed * 60:.1f} stations/min, {n_outputs / elapsed:.2f} outputs/s")
+
+
+def main(argv: list = None) -> int:
+    args = parse_args(argv)
+    from functions import get_rose_types_and_layouts, list_stations
+
+    if args.all:
+        stations = list_stations(args.data_source, data_source_dict.get(args.data_source))
+    else:
+        stations = args.stations
+    rose_types, rose_layouts = get_rose_types_and_layouts(args.all_hours, args.seasons, args.seasons_daylight, args.monthly,
+                                                          args.annual_daylight)
+    options = dict(
+        output_folder=args.output_folder,
+        lat=args.latitude,
+        long=args.longitude,
+        data_period=args.data_period,
+        selected_hours=args.cust_hours,
+        ws_categories=args.wind_speed_categories,
+        grid_spacing=args.grid_spacing,
+        ray_angle=args.ray_angle,
+        calms_threshold=args.calms_threshold,
+        max_freq=args.max_freq,
+        file_prefix=args.prefix,
+        rose_types=rose_types,
+        rose_layouts=rose_layouts,
+        annual=args.annual,
+        save_transparent=args.transparent,
+        save_tables=args.save_tables,
+        stats_only=args.stats_only,
+        backend=args.backend,
+        render_workers=args.render_workers,
+        use_cube=args.use_cube,
+        use_store=args.use_store,
+        compact=args.compact,
+        resample=args.resample,
+        profile=args.profile,
+        render_cache=args.render_cache,
+        image_format=args.image_format
+    )
+
+    print(f"Processing {len(stations)} {args.data_source} stations with {args.workers} workers")
+    start = time.perf_counter()
+    results = run_batch(args.data_source, stations, options, args.workers, get_station_locations(args.data_source))
+    print_summary(results, time.perf_counter() - start)
+    return 0 if all(x["success"] for x in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
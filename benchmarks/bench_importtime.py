@@ -0,0 +1,143 @@
+"""
+Benchmark of the cold-start import time of each entry point, from python -X importtime, so start-up regressions such as
+an eager import of pandas, R, Gooey or PIL on the --help path show up per entry point. Results are written as JSON and can
+be compared with the results of another commit
+Run from the repository root: python -m benchmarks.bench_importtime
+                              python -m benchmarks.bench_importtime --compare benchmarks/results/importtime_<commit>.json
+"""
+import argparse
+import json
+import os
+import platform
+import re
+import subprocess
+import sys
+import time
+from benchmarks.bench_pipeline import get_commit
+
+repo_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+results_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+# entry points and the arguments they are timed with
+entry_points = {
+    "main --help": ["main.py", "--help"],
+    "main --validate_only": ["main.py", "--validate_only", "csv", "station.csv", "1", "1/1/2019", "0", "8760", "A", "B",
+                             "-34", "151", "test"],
+    "batch --help": ["batch.py", "--help"],
+    "service --help": ["service.py", "--help"],
+    "import main_wind_rose_function": ["-c", "import main_wind_rose_function"],
+    "import mpl_windrose": ["-c", "import mpl_windrose"],
+    "import rpy2_windrose": ["-c", "import rpy2_windrose"]
+}
+
+# packages that should only be imported once they are needed
+heavy_packages = ["pandas", "numpy", "rpy2", "gooey", "wx", "PIL", "matplotlib"]
+
+# entry points with a cumulative import time more than this ratio of the compared results are reported as regressions
+regression_ratio = 1.2
+
+importtime_line = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def parse_importtime(stderr: str) -> list:
+    """
+    Parses the output of python -X importtime
+    :param stderr: standard error of the process
+    :return: list of dictionaries with the 'module', 'depth', 'self_us' and 'cumulative_us' of each import, in import order
+    """
+    imports = []
+    for line in stderr.splitlines():
+        match = importtime_line.match(line)
+        if match:
+            imports.append({"module": match.group(4), "depth": (len(match.group(3)) - 1) // 2,
+                            "self_us": int(match.group(1)), "cumulative_us": int(match.group(2))})
+    return imports
+
+
+def time_entry_point(args: list,
+                     repeats: int = 3,
+                     top: int = 10) -> dict:
+    """
+    Runs an entry point in a new Python process with -X importtime
+    :param args: arguments after the python executable
+    :param repeats: number of runs - the run with the lowest total import time is kept
+    :param top: number of top-level imports to keep, slowest first
+    :return: dictionary with the wall time, total import time, heavy packages imported and the slowest top-level imports
+    """
+    best = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        process = subprocess.run([sys.executable, "-X", "importtime"] + args, cwd=repo_dir, capture_output=True,
+                                 text=True)
+        wall_seconds = time.perf_counter() - start
+        imports = parse_importtime(process.stderr)
+        total_us = sum(x["self_us"] for x in imports)
+        if best is None or total_us < best["import_ms"] * 1000:
+            top_level = sorted([x for x in imports if x["depth"] == 0], key=lambda x: -x["cumulative_us"])
+            modules = {x["module"].split(".")[0] for x in imports}
+            best = {"wall_seconds": wall_seconds, "import_ms": total_us / 1000, "modules": len(imports),
+                    "returncode": process.returncode, "heavy_packages": [x for x in heavy_packages if x in modules],
+                    "slowest": [(x["module"], x["cumulative_us"] / 1000) for x in top_level[:top]]}
+    return best
+
+
+def print_results(results: dict):
+    for name, entry in results["entry_points"].items():
+        print(f"{name}: {entry['import_ms']:8.1f} ms imports, {entry['wall_seconds'] * 1000:8.1f} ms wall, "
+              f"{entry['modules']} modules" + ("" if entry["returncode"] == 0 else f" (exit code {entry['returncode']})"))
+        print(f"    heavy packages: {', '.join(entry['heavy_packages']) or 'none'}")
+        for module, ms in entry["slowest"]:
+            print(f"    {module:40s} {ms:8.1f} ms")
+
+
+def print_comparison(results: dict,
+                     baseline: dict):
+    print(f"\nCompared with {baseline.get('commit') or 'baseline'}:")
+    regressions = 0
+    compared = 0
+    for name, entry in results["entry_points"].items():
+        baseline_entry = baseline["entry_points"].get(name)
+        if baseline_entry is None or not baseline_entry["import_ms"]:
+            continue
+        compared += 1
+        ratio = entry["import_ms"] / baseline_entry["import_ms"]
+        flag = "  SLOWER" if ratio > regression_ratio else ""
+        regressions += bool(flag)
+        new_heavy = sorted(set(entry["heavy_packages"]) - set(baseline_entry["heavy_packages"]))
+        # a failed run, e.g. a missing optional package, stops importing early and is not a fair comparison
+        failed = [label for label, x in [("baseline", baseline_entry), ("this run", entry)] if x["returncode"] != 0]
+        print(f"    {name:32s} {baseline_entry['import_ms']:8.1f} ms -> {entry['import_ms']:8.1f} ms  ({ratio:.2f}x){flag}"
+              + (f"  now imports {', '.join(new_heavy)}" if new_heavy else "")
+              + (f"  ({' and '.join(failed)} exited with an error)" if failed else ""))
+    print(f"{regressions} of {compared} entry points more than {regression_ratio:.0%} of the baseline import time")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the import time of each entry point with python -X importtime")
+    parser.add_argument("--entry_points", nargs="+", default=list(entry_points), choices=list(entry_points))
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--top", type=int, default=10, help="number of slowest top-level imports to report")
+    parser.add_argument("--output", help="results file - default is benchmarks/results/importtime_<commit>.json")
+    parser.add_argument("--compare", help="results file of another commit to compare against")
+    args = parser.parse_args(argv)
+
+    results = dict(get_commit(), python=platform.python_version(), platform=platform.platform(),
+                   created=time.strftime("%Y-%m-%dT%H:%M:%S"), entry_points={})
+    for name in args.entry_points:
+        print(f"Timing {name}...", file=sys.stderr)
+        results["entry_points"][name] = time_entry_point(entry_points[name], args.repeats, args.top)
+    print_results(results)
+
+    output = args.output or os.path.join(results_dir, f"importtime_{results['commit'] or 'local'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults saved to {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            print_comparison(results, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
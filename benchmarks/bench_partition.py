@@ -0,0 +1,54 @@
+"""
+Benchmark of the single-pass year partitioning against the original per-year mask scans
+Run from the repository root: python -m benchmarks.bench_partition
+"""
+import argparse
+import datetime as dt
+import time
+import pandas as pd
+from functions import generate_annual_wind_dict, partition_by_period
+from benchmarks.synthetic import make_wind_df
+
+
+def generate_annual_wind_dict_masks(df: pd.DataFrame) -> dict:
+    """
+    The original implementation of generate_annual_wind_dict, kept for comparison
+    """
+    annual_wind_dict = {}
+    start_year = df["date"].iloc[0].year
+    end_year = df["date"].iloc[-1].year
+    for year in range(start_year, end_year + 1):
+        start_date = dt.datetime(year=year, month=1, day=1, hour=1)
+        end_date = dt.datetime(year=year, month=12, day=31, hour=23)
+        annual_df = df.loc[df.date >= start_date]
+        annual_df = annual_df.loc[annual_df.date <= end_date]
+        annual_wind_dict[year] = annual_df
+    return annual_wind_dict
+
+
+def best_time(func, *args, repeats: int = 3) -> float:
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func(*args)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the annual partitioning of wind data")
+    parser.add_argument("--years", type=int, default=30)
+    args = parser.parse_args()
+
+    wind_df = make_wind_df(years=args.years)
+    print(f"{args.years} years of hourly data ({len(wind_df)} rows)")
+    mask_time = best_time(generate_annual_wind_dict_masks, wind_df)
+    print(f"  per-year mask scans:       {mask_time * 1000:8.1f} ms")
+    new_time = best_time(generate_annual_wind_dict, wind_df)
+    print(f"  generate_annual_wind_dict: {new_time * 1000:8.1f} ms  ({mask_time / new_time:.0f}x faster)")
+    for period in ["month", "season"]:
+        print(f"  partition by {period:6s}:       {best_time(partition_by_period, wind_df, period) * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+"""
+Benchmark of each stage of the wind rose pipeline on synthetic BOM, EPAV and custom csv station files, so performance can
+be measured off-network. Results are written as JSON and can be compared with the results of another commit
+Run from the repository root: python -m benchmarks.bench_pipeline --years 1 10 --freqs h min
+                              python -m benchmarks.bench_pipeline --compare benchmarks/results/pipeline_<commit>.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+import data_cache
+from __params__ import r_type_size_dict
+from functions import import_data, import_csv_data, slice_by_custom_dates, slice_by_custom_hours, replace_calms, \
+    generate_annual_wind_dict, make_image_transparent
+from benchmarks.synthetic import write_station_csv, write_custom_csv, csv_header_lines, csv_ws_col, csv_wd_col
+
+results_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+# stages slower than this ratio of the compared results are reported as regressions
+regression_ratio = 1.1
+
+data_period = "1/7/2000-30/6/2001"
+selected_hours = "0-6,18-23"
+calms_threshold = 0.5
+
+
+def best_time(func, setup=None, repeats: int = 3) -> float:
+    """
+    :param func: stage to time, called with the result of setup
+    :param setup: optional untimed call that prepares the stage's input, e.g. a copy for stages that modify their input
+    :param repeats: number of runs
+    :return: best wall time in seconds
+    """
+    times = []
+    for _ in range(repeats):
+        args = (setup(),) if setup else ()
+        # the stages report the data period etc. as they run
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            func(*args)
+            times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def render_rose(wind_df: pd.DataFrame,
+                backend: str,
+                png_file_path: str) -> str:
+    """
+    Renders the default wind rose with one backend
+    :return: path to the image
+    """
+    from main_wind_rose_function import get_wind_rose_class
+    wind_rose = get_wind_rose_class(backend)(data=wind_df)
+    wind_rose.rose_type = ["default"]
+    wind_rose.rose_layout = [1, 1]
+    wind_rose.width, wind_rose.height = r_type_size_dict.get("default")
+    wind_rose.png_file_path = png_file_path
+    wind_rose.create_wind_rose()
+    return png_file_path
+
+
+def run_case(folder: str,
+             source: str,
+             years: int,
+             freq: str,
+             backend: str,
+             repeats: int) -> dict:
+    """
+    Times every stage for one synthetic station
+    :param folder: folder for the station file and its outputs
+    :param source: 'BOM', 'EPAV' or 'csv'
+    :param years: length of the record in years
+    :param freq: 'h' or 'min'
+    :param backend: rendering backend, or None to skip rendering
+    :param repeats: number of runs of each stage
+    :return: dictionary describing the case, with the best time in seconds of each stage
+    """
+    stages = {}
+    if source == "csv":
+        data_file, num_hours = write_custom_csv(folder, years)
+        import_args = (data_file, csv_header_lines, "1/1/2000", 0, num_hours, csv_ws_col, csv_wd_col)
+        stages["import_csv_data"] = best_time(lambda: import_csv_data(*import_args), repeats=repeats)
+        wind_df = import_csv_data(*import_args)
+    else:
+        data_file = write_station_csv(folder, source, years, freq)
+        stages["import_data"] = best_time(lambda: import_data(source, data_file, use_cache=False), repeats=repeats)
+        import_data(source, data_file)
+        stages["import_data (cached)"] = best_time(lambda: import_data(source, data_file), repeats=repeats)
+        wind_df = import_data(source, data_file, use_cache=False)
+
+    stages["slice_by_custom_dates"] = best_time(lambda: slice_by_custom_dates(wind_df, data_period), repeats=repeats)
+    stages["slice_by_custom_hours"] = best_time(lambda: slice_by_custom_hours(wind_df, selected_hours), repeats=repeats)
+    stages["replace_calms"] = best_time(lambda df: replace_calms(df, calms_threshold), wind_df.copy, repeats=repeats)
+    calm_df = replace_calms(wind_df.copy(), calms_threshold)
+    stages["generate_annual_wind_dict"] = best_time(lambda: generate_annual_wind_dict(calm_df), repeats=repeats)
+    if backend:
+        png_file_path = os.path.join(folder, f"{source}_{years}y_{freq}.png")
+        stages[f"render ({backend})"] = best_time(lambda: render_rose(calm_df, backend, png_file_path), repeats=repeats)
+        stages["make_image_transparent"] = best_time(lambda: make_image_transparent(png_file_path), repeats=repeats)
+    return {"source": source, "years": years, "freq": freq, "rows": len(wind_df), "stages": stages}
+
+
+def get_commit() -> dict:
+    """
+    :return: the current git commit and whether the working tree has changes, or None values outside a git checkout
+    """
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True)
+        status = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True, text=True,
+                                check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return {"commit": None, "dirty": None}
+    return {"commit": commit.stdout.strip(), "dirty": bool(status.stdout.strip())}
+
+
+def get_case_key(case: dict) -> tuple:
+    return case["source"], case["years"], case["freq"]
+
+
+def compare_results(results: dict,
+                    baseline: dict) -> list:
+    """
+    Compares the stage times of two benchmark runs
+    :param results: results of this run
+    :param baseline: results of the run to compare against
+    :return: list of (case key, stage, baseline seconds, seconds, ratio) for the stages found in both runs
+    """
+    baseline_cases = {get_case_key(case): case for case in baseline["cases"]}
+    comparison = []
+    for case in results["cases"]:
+        baseline_case = baseline_cases.get(get_case_key(case))
+        if baseline_case is None:
+            continue
+        for stage, seconds in case["stages"].items():
+            if stage in baseline_case["stages"]:
+                baseline_seconds = baseline_case["stages"][stage]
+                comparison.append((get_case_key(case), stage, baseline_seconds, seconds, seconds / baseline_seconds))
+    return comparison
+
+
+def print_results(results: dict):
+    for case in results["cases"]:
+        print(f"{case['source']} {case['years']} years, {case['freq']} ({case['rows']:,} rows):")
+        for stage, seconds in case["stages"].items():
+            print(f"    {stage:28s} {seconds * 1000:10.1f} ms")
+
+
+def print_comparison(comparison: list,
+                     baseline: dict):
+    print(f"\nCompared with {baseline.get('commit') or 'baseline'}:")
+    regressions = 0
+    for (source, years, freq), stage, baseline_seconds, seconds, ratio in comparison:
+        flag = "  SLOWER" if ratio > regression_ratio else ""
+        regressions += bool(flag)
+        print(f"    {source:4s} {years:2d}y {freq:3s} {stage:28s} {baseline_seconds * 1000:10.1f} ms -> "
+              f"{seconds * 1000:10.1f} ms  ({ratio:.2f}x){flag}")
+    print(f"{regressions} of {len(comparison)} stages more than {regression_ratio:.0%} of the baseline time")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark each stage of the wind rose pipeline on synthetic stations")
+    parser.add_argument("--sources", nargs="+", default=["BOM", "EPAV", "csv"], choices=["BOM", "EPAV", "csv"])
+    parser.add_argument("--years", nargs="+", type=int, default=[1, 10, 30])
+    parser.add_argument("--freqs", nargs="+", default=["h", "min"], choices=["h", "min"],
+                        help="record frequencies - custom csv files are always hourly")
+    parser.add_argument("--backend", default="matplotlib", choices=["R", "matplotlib", "none"])
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--output", help="results file - default is benchmarks/results/pipeline_<commit>.json")
+    parser.add_argument("--compare", help="results file of another commit to compare against")
+    args = parser.parse_args(argv)
+
+    results = dict(get_commit(), python=platform.python_version(), numpy=np.__version__, pandas=pd.__version__,
+                   platform=platform.platform(), created=time.strftime("%Y-%m-%dT%H:%M:%S"), cases=[])
+    with tempfile.TemporaryDirectory() as folder:
+        data_cache.local_cache_dir = os.path.join(folder, "cache")
+        for source in args.sources:
+            for years in args.years:
+                for freq in ["h"] if source == "csv" else args.freqs:
+                    print(f"Running {source} {years} years, {freq}...", file=sys.stderr)
+                    results["cases"].append(run_case(folder, source, years, freq,
+                                                     None if args.backend == "none" else args.backend, args.repeats))
+    print_results(results)
+
+    output = args.output or os.path.join(results_dir, f"pipeline_{results['commit'] or 'local'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults saved to {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        print_comparison(compare_results(results, baseline), baseline)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Benchmark of the fused WindQuery against the original slice_by_custom_dates -> slice_by_custom_hours -> replace_calms chain
+Reports the best wall time and the peak memory allocated while filtering
+Run from the repository root: python -m benchmarks.bench_query
+"""
+import argparse
+import time
+import tracemalloc
+from functions import slice_by_custom_dates, slice_by_custom_hours, replace_calms
+from wind_query import WindQuery
+from benchmarks.synthetic import make_wind_df
+
+
+def run_chain(wind_df, data_period, selected_hours, calms_threshold):
+    # the chain modifies its input, so it is given a copy made before timing starts
+    wind_df = slice_by_custom_dates(wind_df, data_period)
+    wind_df = slice_by_custom_hours(wind_df, selected_hours)
+    return replace_calms(wind_df, calms_threshold)
+
+
+def run_query(wind_df, data_period, selected_hours, calms_threshold):
+    return WindQuery(wind_df).dates(data_period).hours(selected_hours).calms(calms_threshold).run()
+
+
+def measure(func, wind_df, args, repeats: int = 3) -> (float, float):
+    """
+    :return: best wall time in seconds, peak memory allocated in MB
+    """
+    times = []
+    peak = 0
+    for _ in range(repeats):
+        data = wind_df.copy()
+        tracemalloc.start()
+        start = time.perf_counter()
+        func(data, *args)
+        times.append(time.perf_counter() - start)
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    return min(times), peak / 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the date, hour and calms filtering stages")
+    parser.add_argument("--years", type=int, default=30)
+    parser.add_argument("--freq", type=str, default="h", help="Record frequency, e.g. 'h' or 'min'")
+    args = parser.parse_args()
+
+    wind_df = make_wind_df(years=args.years, freq=args.freq)
+    end_year = wind_df["date"].iloc[-1].year
+    print(f"{args.years} years of data ({len(wind_df)} rows, {wind_df.memory_usage().sum() / 1e6:.0f} MB)")
+    cases = [("all data, all hours", None, "0-23"),
+             ("10 years, night hours", f"1/1/{end_year - 9}-31/12/{end_year}", "0-6,18-23"),
+             ("1 year, all hours", f"1/1/{end_year}-31/12/{end_year}", "0-23")]
+    for name, data_period, selected_hours in cases:
+        chain_time, chain_peak = measure(run_chain, wind_df, (data_period, selected_hours, 0.5))
+        query_time, query_peak = measure(run_query, wind_df, (data_period, selected_hours, 0.5))
+        print(f"  {name}:")
+        print(f"    chain:     {chain_time * 1000:8.1f} ms  peak {chain_peak:7.1f} MB")
+        print(f"    WindQuery: {query_time * 1000:8.1f} ms  peak {query_peak:7.1f} MB  "
+              f"({chain_time / query_time:.1f}x faster)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""
+Benchmark of sending the wind data to R - pandas2ri's py2rpy of the whole frame against r_transfer.wind_df_to_r
+Run from the repository root: python -m benchmarks.bench_r_transfer
+"""
+import argparse
+import time
+from benchmarks.synthetic import make_wind_df
+
+
+def best_time(func, repeats: int = 5) -> float:
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the pandas to R data transfer")
+    parser.add_argument("--years", type=int, default=30)
+    parser.add_argument("--freq", default="h", help="record frequency, e.g. 'h' or 'min'")
+    args = parser.parse_args()
+    try:
+        import rpy2.robjects as ro
+        from rpy2.robjects import pandas2ri
+        from rpy2.robjects.conversion import localconverter
+    except ImportError:
+        print("rpy2 is not installed - nothing to benchmark")
+        return
+    from r_transfer import wind_df_to_r
+
+    wind_df = make_wind_df(years=args.years, freq=args.freq)
+
+    def convert_py2rpy():
+        with localconverter(ro.default_converter + pandas2ri.converter):
+            return ro.conversion.py2rpy(wind_df)
+
+    py2rpy_time = best_time(convert_py2rpy)
+    direct_time = best_time(lambda: wind_df_to_r(wind_df))
+    print(f"{args.years} years, {args.freq} ({len(wind_df):,} rows)")
+    print(f"  pandas2ri py2rpy:  {py2rpy_time * 1000:10.1f} ms")
+    print(f"  wind_df_to_r:      {direct_time * 1000:10.1f} ms  ({py2rpy_time / direct_time:.0f}x faster)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Benchmark of the R (openair) and matplotlib rendering backends - time per rose and peak memory
+Each backend runs in its own process so the peak memory of one does not hide the other
+Run from the repository root: python -m benchmarks.bench_render_backends
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from __params__ import r_type_size_dict
+from functions import get_rose_types_and_layouts, replace_calms
+from benchmarks.synthetic import make_wind_df
+
+
+def get_peak_rss_mb():
+    """
+    Returns the peak resident memory of this process in MB, or None if it cannot be measured on this platform
+    """
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+    except ImportError:
+        pass
+    try:
+        import psutil
+        return psutil.Process().memory_info().peak_wset / 1024 / 1024
+    except (ImportError, AttributeError):
+        return None
+
+
+def run_backend(backend: str,
+                years: int) -> dict:
+    """
+    Renders every rose type with one backend and returns the timings
+    """
+    from main_wind_rose_function import get_wind_rose_class
+    wind_df = replace_calms(make_wind_df(years=years), 0.5)
+    rose_types, rose_layouts = get_rose_types_and_layouts(False, False, False, False, False)
+
+    start = time.perf_counter()
+    wind_rose_class = get_wind_rose_class(backend)
+    timings = {"backend": backend, "years": years, "rows": len(wind_df), "roses": {}}
+    with tempfile.TemporaryDirectory() as tmp:
+        for r_type, layout in zip(rose_types, rose_layouts):
+            rose_start = time.perf_counter()
+            wind_rose = wind_rose_class(data=wind_df)
+            wind_rose.rose_type = r_type
+            wind_rose.rose_layout = layout
+            wind_rose.width, wind_rose.height = r_type_size_dict.get("_".join(r_type))
+            wind_rose.png_file_path = os.path.join(tmp, "_".join(r_type) + ".png")
+            wind_rose.create_wind_rose()
+            timings["roses"]["_".join(r_type)] = time.perf_counter() - rose_start
+    timings["total_seconds"] = time.perf_counter() - start
+    timings["seconds_per_rose"] = sum(timings["roses"].values()) / len(timings["roses"])
+    timings["peak_rss_mb"] = get_peak_rss_mb()
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the wind rose rendering backends")
+    parser.add_argument("--years", type=int, default=10)
+    parser.add_argument("--backends", nargs="+", default=["R", "matplotlib"])
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_backend(args.child, args.years)))
+        return
+
+    for backend in args.backends:
+        result = subprocess.run([sys.executable, "-m", "benchmarks.bench_render_backends", "--child", backend,
+                                 "--years", str(args.years)], capture_output=True, text=True)
+        if result.returncode != 0:
+            print(f"{backend}: failed - {result.stderr.strip().splitlines()[-1] if result.stderr.strip() else 'no output'}")
+            continue
+        timings = json.loads(result.stdout.strip().splitlines()[-1])
+        peak = f"{timings['peak_rss_mb']:.0f} MB" if timings["peak_rss_mb"] else "n/a"
+        print(f"{backend}: {timings['rows']} rows, {timings['seconds_per_rose']:.2f} s per rose "
+              f"(total incl. start-up {timings['total_seconds']:.2f} s), peak memory {peak}")
+        for rose, seconds in timings["roses"].items():
+            print(f"    {rose:16s} {seconds:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
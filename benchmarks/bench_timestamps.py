@@ -0,0 +1,70 @@
+"""
+Benchmark of timestamp parsing for each database - the original parse_dates/dayfirst read against read_wind_csv with the
+detected format, using pandas' C reader and, where installed, pyarrow's multithreaded reader. Results are written as JSON
+Run from the repository root: python -m benchmarks.bench_timestamps
+"""
+import argparse
+import json
+import os
+import platform
+import tempfile
+import time
+import pandas as pd
+import data_cache
+from timestamp_parsing import read_wind_csv, get_source_format
+from benchmarks.bench_pipeline import get_commit
+from benchmarks.synthetic import source_layouts, write_station_csv
+
+results_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+def best_time(func, repeats: int = 3) -> float:
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark timestamp parsing for each database")
+    parser.add_argument("--years", type=int, default=20)
+    parser.add_argument("--output", help="results file - default is benchmarks/results/timestamps_<commit>.json")
+    args = parser.parse_args()
+    try:
+        import pyarrow
+        engines = ["c", "pyarrow"]
+    except ImportError:
+        engines = ["c"]
+        print("pyarrow is not installed - only pandas' C reader is benchmarked")
+
+    results = dict(get_commit(), python=platform.python_version(), pandas=pd.__version__, platform=platform.platform(),
+                   created=time.strftime("%Y-%m-%dT%H:%M:%S"), years=args.years, sources={})
+    with tempfile.TemporaryDirectory() as folder:
+        data_cache.local_cache_dir = os.path.join(folder, "cache")
+        for source in source_layouts:
+            date_col, ws_col, wd_col, _ = source_layouts[source]
+            data_file = write_station_csv(folder, source, args.years)
+            n_rows = args.years * 8766
+            print(f"{source} ({n_rows} rows):")
+            original = best_time(lambda: pd.read_csv(data_file, parse_dates=[date_col], dayfirst=True))
+            print(f"  parse_dates, dayfirst:  {n_rows / original:12,.0f} rows/s")
+            entry = {"rows": n_rows, "rows_per_second": {"parse_dates": n_rows / original}}
+            for engine in engines:
+                detected = best_time(lambda: read_wind_csv(data_file, source, date_col, [ws_col, wd_col], engine=engine))
+                print(f"  detected format ({engine:7s}): {n_rows / detected:10,.0f} rows/s  ({original / detected:.1f}x faster)")
+                entry["rows_per_second"][engine] = n_rows / detected
+            entry["timestamp_format"] = get_source_format(source, pd.read_csv(data_file, usecols=[date_col], dtype=str,
+                                                                             nrows=10)[date_col])
+            results["sources"][source] = entry
+
+    output = args.output or os.path.join(results_dir, f"timestamps_{results['commit'] or 'local'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults saved to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Benchmark of the vectorised transparency stage against the original per-pixel loop
+Run from the repository root: python -m benchmarks.bench_transparency
+"""
+import argparse
+import os
+import tempfile
+import time
+from PIL import Image, ImageDraw
+from functions import make_image_transparent, make_images_transparent
+
+
+def make_image_transparent_loop(image_to_process: str) -> str:
+    """
+    The original nested-loop implementation of make_image_transparent, kept for comparison
+    :param image_to_process: path to image
+    :return: path to the transparent image
+    """
+    img = Image.open(image_to_process)
+    img = img.convert("RGBA")
+    pix_data = img.load()
+    width, height = img.size
+    for y in range(height):
+        for x in range(width):
+            if pix_data[x, y] == (255, 255, 255, 255):
+                pix_data[x, y] = (255, 255, 255, 0)
+    transparent_image = image_to_process.replace(".png", "_transparent.png")
+    img.save(transparent_image, "PNG")
+    return transparent_image
+
+
+def make_test_image(path: str,
+                    width: int,
+                    height: int):
+    """
+    Writes a white PNG with coloured wedges, roughly resembling a monthly wind rose figure
+    :param path: output path
+    :param width: image width in pixels
+    :param height: image height in pixels
+    """
+    img = Image.new("RGB", (width, height), "white")
+    draw = ImageDraw.Draw(img)
+    for i in range(12):
+        x0 = (i % 3) * width // 3
+        y0 = (i // 3) * height // 4
+        box = [x0 + 20, y0 + 20, x0 + width // 3 - 20, y0 + height // 4 - 20]
+        for angle in range(0, 360, 30):
+            draw.pieslice(box, angle, angle + 20, fill=(40 + angle // 2, 90, 200 - angle // 3), outline="black")
+    img.save(path, "PNG")
+
+
+def time_call(func, *args) -> float:
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark make_image_transparent")
+    parser.add_argument("--width", type=int, default=1200)
+    parser.add_argument("--height", type=int, default=1600)
+    parser.add_argument("--images", type=int, default=8, help="number of images for the batch benchmark")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        images = []
+        for i in range(args.images):
+            path = os.path.join(tmp, f"rose_{i}.png")
+            make_test_image(path, args.width, args.height)
+            images.append(path)
+
+        loop_time = time_call(make_image_transparent_loop, images[0])
+        vector_time = time_call(make_image_transparent, images[0])
+        serial_time = time_call(lambda x: [make_image_transparent(i) for i in x], images)
+        parallel_time = time_call(make_images_transparent, images)
+
+        # the two implementations must produce identical pixels
+        loop_result = Image.open(make_image_transparent_loop(images[0])).tobytes()
+        vector_result = Image.open(make_image_transparent(images[0])).tobytes()
+        assert loop_result == vector_result
+
+    print(f"Image size {args.width}x{args.height}")
+    print(f"  per-pixel loop:      {loop_time * 1000:10.1f} ms")
+    print(f"  vectorised:          {vector_time * 1000:10.1f} ms  ({loop_time / vector_time:.0f}x faster)")
+    print(f"{args.images} images on {os.cpu_count()} CPUs")
+    print(f"  vectorised, serial:  {serial_time * 1000:10.1f} ms")
+    print(f"  vectorised, threads: {parallel_time * 1000:10.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Synthetic wind data used by the benchmarks, so nothing depends on the network databases
+"""
+import os
+import numpy as np
+import pandas as pd
+from __params__ import rename_bom_df_cols
+
+bom_cols = {v: k for k, v in rename_bom_df_cols.items()}
+
+# column names and an example timestamp layout for each database - the formats are detected, not configured
+source_layouts = {
+    "BOM": (bom_cols["Date"], bom_cols["WS (m/s)"], bom_cols["WD (deg)"], "%d/%m/%Y %H:%M"),
+    "DES": ("Date", "WS (m/s)", "WD (deg)", "%d/%m/%Y %H:%M"),
+    "OEH": ("Date", "WS (m/s)", "WD (deg)", "%d/%m/%Y %H:%M:%S"),
+    "EPAV": ("Date", "WS (m/s)", "WD (deg)", "%Y-%m-%d %H:%M:%S")
+}
+
+# layout of the synthetic custom csv files - header lines and the spreadsheet columns holding WS and WD
+csv_header_lines = 2
+csv_ws_col = "E"
+csv_wd_col = "F"
+
+
+def make_wind_df(years: int = 1,
+                 freq: str = "h",
+                 start: str = "2000-01-01",
+                 seed: int = 0) -> pd.DataFrame:
+    """
+    Creates a wind data frame in the format returned by import_data
+    :param years: length of the record in years
+    :param freq: pandas frequency string of the record, e.g. 'h' or 'min'
+    :param start: first timestamp
+    :param seed: random seed
+    :return: DataFrame containing 'ws', 'wd', 'date' columns
+    """
+    dates = pd.date_range(start=start, end=pd.Timestamp(start) + pd.DateOffset(years=years), freq=freq, inclusive="left")
+    rng = np.random.default_rng(seed)
+    n = len(dates)
+    ws = rng.gamma(2.0, 2.0, n)
+    # prevailing south-easterly with some spread, as seen at a coastal station
+    wd = np.mod(rng.normal(135, 60, n), 360)
+    return pd.DataFrame({"ws": ws, "wd": wd, "date": dates})
+
+
+def write_station_csv(folder: str,
+                      source: str,
+                      years: int = 1,
+                      freq: str = "h",
+                      seed: int = 0) -> str:
+    """
+    Writes a synthetic station file in the layout of one of the databases, e.g. BOM wind speeds in km/h
+    :param folder: output folder
+    :param source: Database identifier - BOM, DES, OEH or EPAV
+    :param years: length of the record in years
+    :param freq: pandas frequency string of the record, e.g. 'h' or 'min'
+    :param seed: random seed
+    :return: path to the csv file
+    """
+    date_col, ws_col, wd_col, timestamp_format = source_layouts[source]
+    wind_df = make_wind_df(years=years, freq=freq, seed=seed)
+    ws = wind_df["ws"] * 3.6 if source == "BOM" else wind_df["ws"]
+    data_file = os.path.join(folder, f"{source}_{years}y_{freq}.csv")
+    pd.DataFrame({date_col: wind_df["date"].dt.strftime(timestamp_format), ws_col: ws.round(1),
+                  wd_col: wind_df["wd"].round()}).to_csv(data_file, index=False)
+    return data_file
+
+
+def write_custom_csv(folder: str,
+                     years: int = 1,
+                     seed: int = 0) -> (str, int):
+    """
+    Writes a synthetic hourly csv file for import_csv_data - date columns followed by WS and WD, after two header lines
+    :param folder: output folder
+    :param years: length of the record in years
+    :param seed: random seed
+    :return: path to the csv file, number of hours
+    """
+    wind_df = make_wind_df(years=years, seed=seed)
+    data_file = os.path.join(folder, f"csv_{years}y_h.csv")
+    with open(data_file, "w") as f:
+        f.write("Synthetic station\nYear,Month,Day,Hour,WS,WD\n")
+    dates = wind_df["date"].dt
+    pd.DataFrame({"year": dates.year, "month": dates.month, "day": dates.day, "hour": dates.hour,
+                  "ws": wind_df["ws"].round(1), "wd": wind_df["wd"].round()}).to_csv(data_file, mode="a", header=False,
+                                                                                    index=False)
+    return data_file, len(wind_df)
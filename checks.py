@@ -1,6 +1,10 @@
+import math
+
+
 def raise_error(message, error):
     print(f"\n********** ERROR ********** {message}\n")
-    raise error
+    # the message is kept on the error for callers that report it elsewhere, e.g. the wind rose service
+    raise error(message)
 
 
 def check_calms_threshold(cat_thresh, calms_thresh):
@@ -32,3 +36,19 @@ def check_and_get_ws_cat(cat):
     else:
         return categories
 
+
+def check_wind_rose_inputs(lat, long, grid_spacing, ray_angle, ws_categories, calms_threshold, max_freq):
+    """
+    Checks the wind rose options up front, before any data is read
+    :return: list of wind speed categories, maximum frequency or "NULL" for openair's automatic scaling
+    """
+    check_lat_long(lat, long)
+    check_custom_inputs("grid_spacing", grid_spacing)
+    check_custom_inputs("ray_angle", int(math.floor(ray_angle)))
+    ws_categories = check_and_get_ws_cat(ws_categories)
+    check_calms_threshold(ws_categories[0], calms_threshold)
+    if max_freq or max_freq == 0:
+        check_custom_inputs("max_freq", max_freq)
+    else:
+        max_freq = "NULL"
+    return ws_categories, max_freq
@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+
+# wind direction codes in compact frames - calms keep openair's null flag, missing directions use the smallest int16
+wd_calm = -999
+wd_missing = np.iinfo(np.int16).min
+
+
+def is_compact(df: pd.DataFrame) -> bool:
+    """
+    :param df: wind data frame
+    :return: True if the wind directions are stored as compact int16 codes
+    """
+    return df["wd"].dtype == np.int16
+
+
+def compact_wind_df(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Converts a wind data frame to the compact representation - float32 'ws', int16 'wd' in whole degrees with wd_missing for
+    missing directions and wd_calm for calms, and datetime64[s] 'date' - 14 bytes a row rather than 24
+    :param df: data frame containing 'ws', 'wd', 'date' columns
+    :return: new compact data frame with the same columns
+    """
+    if is_compact(df):
+        return df
+    wd = df["wd"].to_numpy(dtype=np.float64)
+    with np.errstate(invalid="ignore"):
+        compact_wd = np.where(np.isnan(wd), wd_missing, np.round(wd)).astype(np.int16)
+    columns = {}
+    for col in df.columns:
+        if col == "ws":
+            columns[col] = df["ws"].to_numpy(dtype=np.float32)
+        elif col == "wd":
+            columns[col] = compact_wd
+        elif col == "date":
+            columns[col] = df["date"].to_numpy(dtype="datetime64[s]")
+        else:
+            columns[col] = df[col].reset_index(drop=True)
+    return pd.DataFrame(columns, copy=False)
+
+
+def get_wd_values(wd) -> np.ndarray:
+    """
+    Returns wind directions as floats with NaN for missing values, from either representation
+    :param wd: 'wd' column or array
+    :return: float64 array of wind directions
+    """
+    values = np.asarray(wd)
+    if values.dtype == np.int16:
+        return np.where(values == wd_missing, np.nan, values.astype(np.float64))
+    return values.astype(np.float64, copy=False)
+
+
+def get_wd_missing(wd) -> np.ndarray:
+    """
+    :param wd: 'wd' column or array, in either representation
+    :return: boolean array, True where the wind direction is missing
+    """
+    values = np.asarray(wd)
+    if values.dtype == np.int16:
+        return values == wd_missing
+    return pd.isna(values)
+
+
+def expand_wind_df(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Converts a compact wind data frame back to float64 'ws' and 'wd' with NaN for missing directions and datetime64[ns]
+    'date' - used where data leaves Python, e.g. for R
+    :param df: wind data frame in either representation
+    :return: data frame in the standard representation - the input frame if it is not compact
+    """
+    if not is_compact(df):
+        return df
+    return df.assign(ws=df["ws"].to_numpy(dtype=np.float64), wd=get_wd_values(df["wd"]),
+                     date=df["date"].to_numpy(dtype="datetime64[ns]"))
@@ -0,0 +1,157 @@
+import hashlib
+import os
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from __params__ import local_cache_dir
+
+cache_version = 1
+
+# number of parsed stations also kept in memory, for long-running processes such as the wind rose service - see
+# set_memory_cache_size
+memory_cache_size = 0
+_memory_cache = OrderedDict()
+
+
+def get_cache_path(data_source: str,
+                   data_file: str,
+                   cache_dir: str = None,
+                   suffix: str = "") -> str:
+    """
+    Returns the path of the local cache file for a station data file. One cache file is kept per source file
+    :param data_source: Database identifier - BOM or OEH etc.
+    :param data_file: path to the station's csv data file
+    :param cache_dir: local folder for cached station data - defaults to the folder in __params__
+    :param suffix: optional suffix to distinguish other data cached for the same station, e.g. '_cube'
+    :return: path to the cache file in string form
+    """
+    if cache_dir is None:
+        cache_dir = local_cache_dir
+    source_id = f"{data_source}|{os.path.abspath(str(data_file))}"
+    name = hashlib.sha1(source_id.encode("utf-8")).hexdigest()
+    return os.path.join(cache_dir, name + suffix + ".npz")
+
+
+def get_file_signature(data_file: str) -> np.ndarray:
+    """
+    Returns the size and modification time of a file - used to detect when a cached station needs re-parsing
+    :param data_file: path to the station's csv data file
+    :return: array of [size in bytes, modification time in ns]
+    """
+    stats = os.stat(data_file)
+    return np.array([stats.st_size, stats.st_mtime_ns], dtype=np.int64)
+
+
+def set_memory_cache_size(size: int):
+    """
+    Keeps the parsed data of the most recently used stations in memory as well as in the local cache folder, so a
+    long-running process does not re-read a station's cache file for every request
+    :param size: number of stations to keep in memory - 0 turns the memory cache off
+    """
+    global memory_cache_size
+    memory_cache_size = max(int(size), 0)
+    while len(_memory_cache) > memory_cache_size:
+        _memory_cache.popitem(last=False)
+
+
+def get_memory_cache_stations() -> list:
+    """
+    :return: cache paths of the stations held in the memory cache, least recently used first
+    """
+    return list(_memory_cache)
+
+
+def remember_wind_df(cache_path: str,
+                     signature: np.ndarray,
+                     wind_df: pd.DataFrame):
+    """
+    Adds a station to the memory cache, dropping the least recently used station when the cache is full
+    """
+    if memory_cache_size:
+        _memory_cache[cache_path] = (signature, wind_df)
+        _memory_cache.move_to_end(cache_path)
+        while len(_memory_cache) > memory_cache_size:
+            _memory_cache.popitem(last=False)
+
+
+def load_cached_wind_df(data_source: str,
+                        data_file: str,
+                        cache_dir: str = None):
+    """
+    Loads the parsed wind data for a station from the local cache if the source file is unchanged
+    :param data_source: Database identifier
+    :param data_file: path to the station's csv data file
+    :param cache_dir: local folder for cached station data
+    :return: DataFrame containing 'ws', 'wd', 'date' columns, or None if there is no valid cache entry
+    """
+    cache_path = get_cache_path(data_source, data_file, cache_dir)
+    if cache_path in _memory_cache:
+        signature, wind_df = _memory_cache[cache_path]
+        try:
+            if np.array_equal(signature, get_file_signature(data_file)):
+                _memory_cache.move_to_end(cache_path)
+                # a copy, so the caller cannot modify the cached frame
+                return wind_df.copy()
+        except OSError:
+            pass
+        del _memory_cache[cache_path]
+    if not os.path.isfile(cache_path):
+        return None
+    try:
+        with np.load(cache_path, allow_pickle=False) as cached:
+            if int(cached["version"]) != cache_version:
+                return None
+            signature = cached["signature"]
+            if not np.array_equal(signature, get_file_signature(data_file)):
+                return None
+            columns = [str(x) for x in cached["columns"]]
+            data = {
+                "ws": cached["ws"],
+                "wd": cached["wd"],
+                "date": cached["date"].view("datetime64[ns]")
+            }
+    except (OSError, ValueError, KeyError):
+        # corrupt or partially written cache file - fall back to parsing the source
+        return None
+    wind_df = pd.DataFrame({col: data[col] for col in columns})
+    if memory_cache_size:
+        remember_wind_df(cache_path, signature, wind_df)
+        return wind_df.copy()
+    return wind_df
+
+
+def save_cached_wind_df(wind_df: pd.DataFrame,
+                        data_source: str,
+                        data_file: str,
+                        cache_dir: str = None) -> bool:
+    """
+    Saves the parsed wind data for a station to the local cache as raw NumPy arrays
+    :param wind_df: DataFrame containing 'ws', 'wd', 'date' columns
+    :param data_source: Database identifier
+    :param data_file: path to the station's csv data file
+    :param cache_dir: local folder for cached station data
+    :return: True if the data was cached, False if the columns could not be stored as plain arrays
+    """
+    try:
+        ws = wind_df["ws"].to_numpy(dtype=np.float64)
+        wd = wind_df["wd"].to_numpy(dtype=np.float64)
+        date = wind_df["date"].to_numpy(dtype="datetime64[ns]").view(np.int64)
+    except (TypeError, ValueError):
+        return False
+
+    cache_path = get_cache_path(data_source, data_file, cache_dir)
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    temp_path = cache_path + f".{os.getpid()}.tmp"
+    with open(temp_path, "wb") as f:
+        np.savez(f,
+                 version=np.array(cache_version),
+                 signature=get_file_signature(data_file),
+                 columns=np.array(list(wind_df.columns)),
+                 ws=ws,
+                 wd=wd,
+                 date=date)
+    # replace in one step so a concurrent reader never sees a partial file
+    os.replace(temp_path, cache_path)
+    if memory_cache_size:
+        remember_wind_df(cache_path, get_file_signature(data_file), wind_df.copy())
+    return True
@@ -0,0 +1,146 @@
+import functools
+import numpy as np
+import pandas as pd
+
+daylight_labels = ["daylight", "nighttime"]
+
+# name of the optional column holding a precomputed daylight/nighttime classification
+daylight_column = "day_night"
+
+
+def get_utc_offset(longitude: float) -> float:
+    """
+    Estimates the local standard time offset from UTC for a station from its longitude
+    :param longitude: longitude of station in degrees
+    :return: offset from UTC in hours
+    """
+    return float(round(longitude / 15))
+
+
+def solar_position(dates: np.ndarray,
+                   longitude: float,
+                   utc_offset: float) -> (np.ndarray, np.ndarray):
+    """
+    Calculates the solar declination and equation of time for an array of local standard times using the NOAA
+    solar calculator equations - the same equations used by openair's cutDaylight
+    :param dates: array of datetime64 local standard times
+    :param longitude: longitude of station in degrees
+    :param utc_offset: offset of the local standard time from UTC in hours
+    :return: solar declination in degrees, equation of time in minutes
+    """
+    days = dates.astype("datetime64[s]").astype(np.int64) / 86400.0
+    julian_day = days + 2440587.5 - utc_offset / 24.0
+    jc = (julian_day - 2451545.0) / 36525.0
+
+    geom_mean_long = np.mod(280.46646 + jc * (36000.76983 + jc * 0.0003032), 360)
+    geom_mean_anom = 357.52911 + jc * (35999.05029 - 0.0001537 * jc)
+    eccent = 0.016708634 - jc * (0.000042037 + 0.0000001267 * jc)
+    anom_rad = np.radians(geom_mean_anom)
+    eq_of_centre = (np.sin(anom_rad) * (1.914602 - jc * (0.004817 + 0.000014 * jc))
+                    + np.sin(2 * anom_rad) * (0.019993 - 0.000101 * jc)
+                    + np.sin(3 * anom_rad) * 0.000289)
+    omega = np.radians(125.04 - 1934.136 * jc)
+    app_long = geom_mean_long + eq_of_centre - 0.00569 - 0.00478 * np.sin(omega)
+    mean_obliq = 23 + (26 + (21.448 - jc * (46.815 + jc * (0.00059 - jc * 0.001813))) / 60) / 60
+    obliq_corr = np.radians(mean_obliq + 0.00256 * np.cos(omega))
+
+    declination = np.degrees(np.arcsin(np.sin(obliq_corr) * np.sin(np.radians(app_long))))
+    var_y = np.tan(obliq_corr / 2) ** 2
+    long_rad = np.radians(geom_mean_long)
+    eq_of_time = 4 * np.degrees(var_y * np.sin(2 * long_rad)
+                                - 2 * eccent * np.sin(anom_rad)
+                                + 4 * eccent * var_y * np.sin(anom_rad) * np.cos(2 * long_rad)
+                                - 0.5 * var_y ** 2 * np.sin(4 * long_rad)
+                                - 1.25 * eccent ** 2 * np.sin(2 * anom_rad))
+    return declination, eq_of_time
+
+
+def sunrise_sunset(dates: np.ndarray,
+                   latitude: float,
+                   longitude: float,
+                   utc_offset: float) -> (np.ndarray, np.ndarray):
+    """
+    Calculates sunrise and sunset for an array of local standard times
+    :param dates: array of datetime64 local standard times
+    :param latitude: latitude of station in degrees
+    :param longitude: longitude of station in degrees
+    :param utc_offset: offset of the local standard time from UTC in hours
+    :return: sunrise and sunset as minutes after local midnight
+    """
+    declination, eq_of_time = solar_position(dates, longitude, utc_offset)
+    lat_rad = np.radians(latitude)
+    dec_rad = np.radians(declination)
+    cos_hour_angle = (np.cos(np.radians(90.833)) / (np.cos(lat_rad) * np.cos(dec_rad))
+                      - np.tan(lat_rad) * np.tan(dec_rad))
+    # clipping handles polar day (sun never sets) and polar night (sun never rises)
+    hour_angle = np.degrees(np.arccos(np.clip(cos_hour_angle, -1, 1)))
+    solar_noon = 720 - 4 * longitude - eq_of_time + utc_offset * 60
+    return solar_noon - 4 * hour_angle, solar_noon + 4 * hour_angle
+
+
+@functools.lru_cache(maxsize=512)
+def get_sunrise_table(latitude: float,
+                      longitude: float,
+                      year: int,
+                      utc_offset: float) -> (np.ndarray, np.ndarray):
+    """
+    Returns the sunrise and sunset times for every day of a year, calculated at local noon. Tables are cached per
+    (latitude, longitude, year) so the solar calculation is only done once per station and year
+    :param latitude: latitude of station in degrees
+    :param longitude: longitude of station in degrees
+    :param year: calendar year
+    :param utc_offset: offset of the local standard time from UTC in hours
+    :return: sunrise and sunset as minutes after local midnight, one value per day of the year
+    """
+    days = np.arange(f"{year}-01-01", f"{year + 1}-01-01", dtype="datetime64[D]")
+    sunrise, sunset = sunrise_sunset(days + np.timedelta64(12, "h"), latitude, longitude, utc_offset)
+    sunrise.flags.writeable = False
+    sunset.flags.writeable = False
+    return sunrise, sunset
+
+
+def classify_daylight(dates,
+                      latitude: float,
+                      longitude: float,
+                      utc_offset: float = None) -> np.ndarray:
+    """
+    Classifies each time as daylight or nighttime in one vectorised pass, using the cached sunrise/sunset tables
+    :param dates: array or Series of local standard times
+    :param latitude: latitude of station in degrees
+    :param longitude: longitude of station in degrees
+    :param utc_offset: offset of the local standard time from UTC in hours - estimated from the longitude if not set
+    :return: boolean array, True for daylight
+    """
+    if utc_offset is None:
+        utc_offset = get_utc_offset(longitude)
+    dates = np.asarray(pd.to_datetime(dates), dtype="datetime64[s]")
+    days = dates.astype("datetime64[D]")
+    years = dates.astype("datetime64[Y]")
+    minute_of_day = (dates - days).astype(np.int64) / 60.0
+    day_of_year = (days - years.astype("datetime64[D]")).astype(np.int64)
+
+    # join the tables for each year in the data so every row can be looked up with one index
+    unique_years = np.unique(years)
+    tables = [get_sunrise_table(float(latitude), float(longitude), int(year.astype(np.int64)) + 1970, float(utc_offset))
+              for year in unique_years]
+    table_starts = np.cumsum([0] + [len(x[0]) for x in tables[:-1]])
+    index = table_starts[np.searchsorted(unique_years, years)] + day_of_year if len(dates) else day_of_year
+    sunrise = np.concatenate([x[0] for x in tables]) if tables else np.array([])
+    sunset = np.concatenate([x[1] for x in tables]) if tables else np.array([])
+    return (minute_of_day > sunrise[index]) & (minute_of_day < sunset[index])
+
+
+def add_daylight_column(wind_df: pd.DataFrame,
+                        latitude: float,
+                        longitude: float) -> pd.DataFrame:
+    """
+    Adds a precomputed daylight/nighttime column so the renderers and frequency tables do not each repeat the solar
+    calculation
+    :param wind_df: data frame containing a 'date' column
+    :param latitude: latitude of station in degrees
+    :param longitude: longitude of station in degrees
+    :return: data frame with a categorical 'day_night' column
+    """
+    flags = classify_daylight(wind_df["date"], latitude, longitude)
+    day_night = pd.Categorical.from_codes(np.where(flags, 0, 1), categories=daylight_labels)
+    return wind_df.assign(**{daylight_column: day_night})
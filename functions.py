@@ -3,7 +3,12 @@ import numpy as np
 from __params__ import rename_bom_df_cols, cols_for_wind, cols_for_r
 import os
 import pathlib
+import shutil
 from checks import check_custom_inputs, raise_error
+from data_cache import load_cached_wind_df, save_cached_wind_df
+from station_catalogue import get_station_catalogue
+from timestamp_parsing import read_wind_csv
+from compact import compact_wind_df, get_wd_missing
 
 
 def get_stations_and_files(dir: str) -> pd.DataFrame:
@@ -12,7 +17,7 @@ def get_stations_and_files(dir: str) -> pd.DataFrame:
     :param dir: path of the AECOM database
     :return: pandas DataFrame
     """
-    sites_file = dir + "\\__station_list_complete.csv"
+    sites_file = os.path.join(dir, "__station_list_complete.csv")
     try:
         return pd.read_csv(sites_file)
     except FileNotFoundError:
@@ -24,24 +29,25 @@ def get_data_source(source: str,
                     station_id: str) -> str:
     """
     Creates and returns the path in string form for the specified station in AECOM database
+    Stations are looked up in the station catalogue (see station_catalogue.py), so the network share is only re-read when
+    the database has changed
     :param source: database identifier from GUI inputs - BOM or OEH etc.
     :param location: directory path for database
     :param station_id: name of station
     :return: string form of path to station's csv data file
     """
-    # Get the source data file from the network
-    if source == 'BOM':
-        data_file = location + "\\" + station_id + "_60min.csv"
-        if not os.path.isfile(data_file):
-            raise_error(f"Cannot find file for station {station_id} - check if valid", FileNotFoundError)
-    else:
-        station_list_df = get_stations_and_files(location)
-        if station_list_df.loc[station_list_df["Station Name"] == station_id].shape[0] == 0:
-            list_of_available_stations = station_list_df['Station Name'].tolist()
-            raise_error(f"The entered station does not exist in the {source} database - please select from {list_of_available_stations}",
-                        ValueError)
-        data_file = location + "\\" + station_list_df.loc[station_list_df["Station Name"] == station_id]["File Name"].iloc[0]
-    return data_file
+    return get_station_catalogue().get_data_file(source, location, station_id)
+
+
+def list_stations(source: str,
+                  location: str) -> list:
+    """
+    Lists all stations available in one of AECOM's databases
+    :param source: database identifier - BOM or OEH etc.
+    :param location: directory path for database
+    :return: list of station names or IDs
+    """
+    return get_station_catalogue().list_stations(source, location)
 
 
 def create_new_folder_for_output(output_folder: str,
@@ -52,32 +58,47 @@ def create_new_folder_for_output(output_folder: str,
     :param station: station name or ID
     :return: path to new folder in string form
     """
-    new_folder_path = output_folder + "\\" + station + "_output"
-    if not os.path.exists(new_folder_path):
-        os.makedirs(new_folder_path)
-    os.chdir(new_folder_path)
+    new_folder_path = os.path.join(output_folder, station + "_output")
+    os.makedirs(new_folder_path, exist_ok=True)
     return new_folder_path
 
 
 def import_data(data_source: str,
-                data_file: str) -> pd.DataFrame:
+                data_file: str,
+                use_cache: bool = True,
+                compact: bool = False) -> pd.DataFrame:
     """
     Imports the data from one of AECOM's databases
+    Parsed data is kept in a local cache and the csv file is only re-parsed when its size or modification time changes
     :param data_source: Database identifier
     :param data_file: path to file
+    :param use_cache: read from and write to the local station data cache
+    :param compact: return the data in the compact representation - see compact.py
     :return: DataFrame containing 'date', 'ws', 'wd' columns
     """
+    if use_cache:
+        cached_df = load_cached_wind_df(data_source, data_file)
+        if cached_df is not None:
+            return compact_wind_df(cached_df) if compact else cached_df
+
+    # only the wind columns are read, with the timestamps parsed using the format detected for the data source
     if data_source == 'BOM':
-        df = pd.read_csv(data_file, parse_dates=['Timestamp'], dayfirst=True)
+        bom_cols = {v: k for k, v in rename_bom_df_cols.items()}
+        df = read_wind_csv(data_file, data_source, bom_cols['Date'], [bom_cols['WS (m/s)'], bom_cols['WD (deg)']])
         df.rename(columns=rename_bom_df_cols, inplace=True)
         # convert from km/h to m/s
         df["WS (m/s)"] = df["WS (m/s)"] / 3.6
         wind_df = df[cols_for_wind].copy()
     else:
-        df = pd.read_csv(data_file, parse_dates=['Date'], dayfirst=True)
+        df = read_wind_csv(data_file, data_source, 'Date', ['WS (m/s)', 'WD (deg)'])
         wind_df = df[cols_for_wind].copy()
     wind_df.rename(columns=cols_for_r, inplace=True)
-    return wind_df
+    if use_cache:
+        try:
+            save_cached_wind_df(wind_df, data_source, data_file)
+        except OSError:
+            print("\nUnable to write to the local data cache - continuing without caching\n")
+    return compact_wind_df(wind_df) if compact else wind_df
 
 
 def replace_calms(df: pd.DataFrame,
@@ -93,22 +114,110 @@ def replace_calms(df: pd.DataFrame,
     return out_df
 
 
-def make_image_transparent(image_to_process: str):
+def get_transparent_path(image_path: str) -> str:
     """
-    Takes an images and converts white pixels to transparent
+    :param image_path: path to a wind rose image
+    :return: path of its transparent version, e.g. rose.png -> rose_transparent.png
+    """
+    base, extension = os.path.splitext(str(image_path))
+    return base + "_transparent" + extension
+
+
+def make_pixels_transparent(pixels: np.ndarray) -> np.ndarray:
+    """
+    Converts white pixels to transparent
+    :param pixels: RGBA image array - modified in place
+    :return: the image array
+    """
+    # a pixel is white when all four bands are 255 - set its alpha band to 0
+    white_mask = (pixels == 255).all(axis=2)
+    pixels[white_mask, 3] = 0
+    return pixels
+
+
+def save_transparent_image(image_to_process: str,
+                           transparent_image: str) -> str:
+    """
+    Saves a copy of a PNG image with white pixels converted to transparent
     :param image_to_process: path to image
+    :param transparent_image: path to save the transparent image to
+    :return: path to the transparent image
     """
     from PIL import Image
-    img = Image.open(image_to_process)
-    img = img.convert("RGBA")
-    pix_data = img.load()
-    width, height = img.size
-    for y in range(height):
-        for x in range(width):
-            if pix_data[x, y] == (255, 255, 255, 255):
-                pix_data[x, y] = (255, 255, 255, 0)
-    transparent_image = image_to_process.replace(".png", "_transparent.png")
-    img.save(transparent_image, "PNG")
+    with Image.open(image_to_process) as img:
+        pixels = np.array(img.convert("RGBA"))
+    Image.fromarray(make_pixels_transparent(pixels), "RGBA").save(transparent_image, "PNG")
+    return transparent_image
+
+
+def make_image_transparent(image_to_process: str) -> str:
+    """
+    Takes an images and converts white pixels to transparent
+    :param image_to_process: path to image
+    :return: path to the transparent image
+    """
+    return save_transparent_image(image_to_process, get_transparent_path(image_to_process))
+
+
+def is_vector_image(image_path: str) -> bool:
+    """
+    :param image_path: path to a wind rose image
+    :return: True for SVG and PDF images
+    """
+    return os.path.splitext(str(image_path))[1].lower() in (".svg", ".pdf")
+
+
+def add_white_background(svg: str) -> str:
+    """
+    Composites an SVG image onto white by adding a white rectangle behind everything else
+    :param svg: SVG document
+    :return: SVG document with a white background
+    """
+    start = svg.find("<svg")
+    end = svg.find(">", start) + 1
+    return svg[:end] + '\n<rect width="100%" height="100%" fill="white"/>' + svg[end:]
+
+
+def save_image_variants(local_image: str,
+                        image_path: str,
+                        transparent_image: str):
+    """
+    Saves the opaque and transparent versions of a wind rose rendered to a local file in one step, so neither version is
+    read back from the output folder. PNGs are rendered on white and the transparent version has its white pixels made
+    transparent. SVG and PDF images are rendered on a transparent background - the opaque SVG is composited onto white,
+    while a PDF page without a background already shows as white, so both PDF versions are the same document
+    :param local_image: path to the rendered image
+    :param image_path: output path of the opaque version
+    :param transparent_image: output path of the transparent version
+    """
+    if not is_vector_image(local_image):
+        shutil.copyfile(local_image, str(image_path))
+        save_transparent_image(local_image, str(transparent_image))
+        return
+    shutil.copyfile(local_image, str(transparent_image))
+    if str(local_image).lower().endswith(".svg"):
+        with open(local_image, encoding="utf-8") as f:
+            svg = f.read()
+        with open(str(image_path), "w", encoding="utf-8") as f:
+            f.write(add_white_background(svg))
+    else:
+        shutil.copyfile(local_image, str(image_path))
+
+
+def make_images_transparent(images_to_process: list,
+                            max_workers: int = None) -> list:
+    """
+    Converts white pixels to transparent for a list of images, processing the images in parallel
+    :param images_to_process: list of paths to images
+    :param max_workers: maximum number of worker threads - defaults to the ThreadPoolExecutor default
+    :return: list of paths to the transparent images, in the same order as the input list
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    if len(images_to_process) <= 1:
+        return [make_image_transparent(image) for image in images_to_process]
+    # PNG decoding/encoding and the NumPy mask release the GIL so threads run concurrently
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(make_image_transparent, images_to_process))
 
 
 def get_custom_data_period(date_string: str) -> list:
@@ -170,6 +279,21 @@ def get_rose_types_and_layouts(all_hours: bool,
     return roses, layouts
 
 
+def get_custom_period_bounds(data_period: str) -> (pd.Timestamp, pd.Timestamp):
+    """
+    Returns the first and last hour included in a custom data period - the end date is included up to 23:00
+    :param data_period: custom user data period
+    :return: start and end time stamps, both inclusive
+    """
+    dates = get_custom_data_period(data_period)
+    custom_start = dates[0]
+    if len(dates) == 1:
+        custom_end = custom_start + pd.to_timedelta('23H')
+    else:
+        custom_end = dates[1] + pd.to_timedelta('23H')
+    return custom_start, custom_end
+
+
 def slice_by_custom_dates(wind_df: pd.DataFrame,
                           data_period: str) -> pd.DataFrame:
     """
@@ -181,29 +305,40 @@ def slice_by_custom_dates(wind_df: pd.DataFrame,
     wind_start_year = wind_df["date"][0].year
     wind_end_year = wind_df["date"][len(wind_df.index) - 1].year
     if data_period:
-        dates = get_custom_data_period(data_period)
-        custom_start = dates[0]
-        if len(dates) == 1:
-            custom_end = custom_start + pd.to_timedelta('23H')
-        else:
-            custom_end = dates[1] + pd.to_timedelta('23H')
+        custom_start, custom_end = get_custom_period_bounds(data_period)
         mask = (wind_df["date"] >= custom_start) & (wind_df["date"] <= custom_end)
         wind_df = wind_df.loc[mask]
+        report_custom_period(wind_start_year, wind_end_year, custom_start, custom_end)
+    else:
+        print(f"\nThe processed wind data period is {wind_start_year} to {wind_end_year}\n")
+    return wind_df
 
-        if custom_end.year < wind_start_year:
-            raise_error(f'The custom dates are before the first data available ({wind_start_year})', ValueError)
-        if custom_start.year >= wind_start_year:
-            wind_start_year = custom_start.year
-        else:
-            print('\nThe custom start date is before the first data available - processing wind rose from'
-                  ' start of data availability\n')
-        if custom_end.year <= wind_end_year:
-            wind_end_year = custom_end.year
-        else:
-            print('\nThe custom end date is after the last data available - processing wind rose to end '
-                  'of data availability\n')
+
+def report_custom_period(wind_start_year: int,
+                         wind_end_year: int,
+                         custom_start: pd.Timestamp,
+                         custom_end: pd.Timestamp):
+    """
+    Checks a custom data period against the years of data available and prints the period that will be processed
+    :param wind_start_year: first year of the wind data
+    :param wind_end_year: last year of the wind data
+    :param custom_start: start of the custom data period
+    :param custom_end: end of the custom data period
+    :raise: ValueError if the custom data period ends before the data starts
+    """
+    if custom_end.year < wind_start_year:
+        raise_error(f'The custom dates are before the first data available ({wind_start_year})', ValueError)
+    if custom_start.year >= wind_start_year:
+        wind_start_year = custom_start.year
+    else:
+        print('\nThe custom start date is before the first data available - processing wind rose from'
+              ' start of data availability\n')
+    if custom_end.year <= wind_end_year:
+        wind_end_year = custom_end.year
+    else:
+        print('\nThe custom end date is after the last data available - processing wind rose to end '
+              'of data availability\n')
     print(f"\nThe processed wind data period is {wind_start_year} to {wind_end_year}\n")
-    return wind_df
 
 
 def parse_custom_hours(cust_hrs: str) -> list:
@@ -258,24 +393,70 @@ def slice_by_custom_hours(wind_df: pd.DataFrame,
     return filter_df_by_hours(wind_df, hour_list)
 
 
+def get_period_keys(dates: np.ndarray,
+                    period: str) -> np.ndarray:
+    """
+    Returns an integer key for each date that increases with time, so that sorted dates give sorted keys
+    :param dates: array of datetime64 dates
+    :param period: 'year', 'month' or 'season'
+    :return: array of integer period keys
+    """
+    months = dates.astype("datetime64[M]").astype(np.int64)
+    if period == 'year':
+        return months // 12
+    if period == 'month':
+        return months
+    if period == 'season':
+        # seasons are blocks of three months starting in December, so December is grouped with the following January
+        return (months + 1) // 3
+    raise_error(f"Period '{period}' not valid - must be 'year', 'month' or 'season'", ValueError)
+
+
+def get_period_label(key: int,
+                     period: str):
+    """
+    Converts an integer period key from get_period_keys to a readable label
+    :param key: integer period key
+    :param period: 'year', 'month' or 'season'
+    :return: year for 'year', (year, month) for 'month', (year, 'DJF'/'MAM'/'JJA'/'SON') for 'season'
+    """
+    if period == 'year':
+        return int(key) + 1970
+    if period == 'month':
+        return int(key) // 12 + 1970, int(key) % 12 + 1
+    first_month = int(key) * 3 - 1
+    return (first_month + 1) // 12 + 1970, ['DJF', 'MAM', 'JJA', 'SON'][(first_month + 1) % 12 // 3]
+
+
+def partition_by_period(df: pd.DataFrame,
+                        period: str = 'year') -> dict:
+    """
+    Splits a data frame into periods in a single pass - the period boundaries are found with a binary search on the sorted
+    dates and each partition is a slice of the input frame rather than a filtered copy
+    :param df: input data frame with a 'date' column
+    :param period: 'year', 'month' or 'season'
+    :return: dictionary of period label to data frame slice, in date order
+    """
+    if not df["date"].is_monotonic_increasing:
+        df = df.sort_values("date", kind="stable")
+    keys = get_period_keys(df["date"].to_numpy(), period)
+    unique_keys = np.unique(keys)
+    starts = np.searchsorted(keys, unique_keys, side='left')
+    ends = np.append(starts[1:], len(keys))
+    return {get_period_label(key, period): df.iloc[start:end] for key, start, end in zip(unique_keys, starts, ends)}
+
+
 def generate_annual_wind_dict(df: pd.DataFrame) -> dict:
     """
     Split data into annual data frames and place in dictionary
     :param df: input data frame
-    :return: dictionary of annual data frames
-    """
-    annual_wind_dict = {}
-    start_year = df["date"].iloc[0].year
-    end_year = df["date"].iloc[-1].year
-    import datetime as dt
-    for year in range(start_year, end_year + 1):
-        start_date = dt.datetime(year=year, month=1, day=1, hour=1)
-        end_date = dt.datetime(year=year, month=12, day=31, hour=23)
-        annual_df = pd.DataFrame(None)
-        annual_df = df.loc[df.date >= start_date]
-        annual_df = annual_df.loc[annual_df.date <= end_date]
-        annual_wind_dict[year] = annual_df
-    return annual_wind_dict
+    :return: dictionary of annual data frames, including empty frames for any years without data
+    """
+    annual_wind_dict = partition_by_period(df, 'year')
+    if not annual_wind_dict:
+        return {}
+    years = list(annual_wind_dict)
+    return {year: annual_wind_dict.get(year, df.iloc[0:0]) for year in range(years[0], years[-1] + 1)}
 
 
 def windrose_data_not_empty(df: pd.DataFrame,
@@ -291,7 +472,7 @@ def windrose_data_not_empty(df: pd.DataFrame,
     wd_all_missing_flags = df['wd'].mean() == -999
     empty = len(df) == 0
     ws_null = df['ws'].isna().sum() == df.shape[0]
-    wd_null = df["wd"].isna().sum() == df.shape[0]
+    wd_null = get_wd_missing(df["wd"]).sum() == df.shape[0]
 
     if ws_all_missing_flags or wd_all_missing_flags or empty or ws_null or wd_null:
         if raise_e:
@@ -302,13 +483,55 @@ def windrose_data_not_empty(df: pd.DataFrame,
         return True
 
 
+def get_column_index(col_letters: str) -> int:
+    """
+    Converts a spreadsheet-style alphabetic column identifier into a zero-based column index, e.g. 'a' -> 0, 'z' -> 25, 'aa' -> 26
+    :param col_letters: alphabetic column identifier from GUI
+    :raise: ValueError if the identifier contains characters other than letters
+    :return: zero-based column index
+    """
+    col_letters = str(col_letters).strip().lower()
+    if not col_letters.isalpha() or not col_letters.isascii():
+        raise_error(f"Column identifier '{col_letters}' is not valid - must be letters only, e.g. A or AB", ValueError)
+    index = 0
+    for letter in col_letters:
+        index = index * 26 + (ord(letter) - ord('a') + 1)
+    return index - 1
+
+
+def get_blank_csv_rows(file: str,
+                        header_lines: int) -> pd.Index:
+    """
+    Finds the rows of a CSV file in which every field is blank, e.g. ',,,' rows left at the end of a spreadsheet export
+    :param file: path to CSV file
+    :param header_lines: number of header rows before data begins in CSV file
+    :return: index of the blank rows, numbered as read by pd.read_csv with the same header_lines
+    """
+    csv_df = pd.read_csv(file, header=None, skiprows=header_lines, dtype=str)
+    return csv_df.index[csv_df.isna().all(axis=1)]
+
+
+def mask_aermod_missing_values(ws: np.ndarray,
+                               wd: np.ndarray):
+    """
+    Converts missing AERMOD values (i.e. 999 or 9999) to NaN in place
+    :param ws: array of wind speeds
+    :param wd: array of wind directions
+    """
+    with np.errstate(invalid='ignore'):
+        ws[ws > 100] = np.nan
+        wd[wd > 360] = np.nan
+
+
 def import_csv_data(file: str,
                     header_lines: int,
                     start_date: str,
                     start_hour: int,
                     num_hours: int,
                     ws_col: str,
-                    wd_col: str) -> pd.DataFrame:
+                    wd_col: str,
+                    chunk_size: int = None,
+                    compact: bool = False) -> pd.DataFrame:
     """
     Imports data from user selected CSV file
     IMPORTANT - this function generates a new date time index for the data and assumes that no hours are missing in the data.
@@ -320,52 +543,73 @@ def import_csv_data(file: str,
     :param num_hours: Total number of rows of data in CSV - not including header rows
     :param ws_col: alphabetic column identifier for WS data
     :param wd_col: alphabetic column identifier for WD data
+    :param chunk_size: optional number of rows to read at a time - reads the whole file at once if not set
+    :param compact: return the data in the compact representation - see compact.py
     :return: data frame containing wind data
     """
     # Convert the alphabetic cols provided in the GUI to numerical versions
-    col_list = np.arange(0, 25)
-    csv_col_dict = dict(zip(list('abcdefghijklmnopqrstuvwxyz'), np.arange(0, 25)))
-    ws_col = csv_col_dict.get(ws_col.lower())
-    wd_col = csv_col_dict.get(wd_col.lower())
+    ws_col = get_column_index(ws_col)
+    wd_col = get_column_index(wd_col)
 
     check_custom_inputs("header_lines", header_lines)
-    csv_working_df = pd.read_csv(file, header=None, skiprows=header_lines)
-    csv_working_df.dropna(how='all', axis=0, inplace=True)
-
-    # make wind df
-    csv_wind_df = pd.DataFrame()
     try:
         start_datetime = pd.to_datetime(start_date, dayfirst=True) + pd.Timedelta(hours=start_hour)
         csv_date_range = pd.date_range(start=start_datetime, periods=num_hours, freq='h')
     except Exception:
         raise_error("Check start date is in the correct format '1/1/2019'", ValueError)
-    else:
-        csv_wind_df['date'] = csv_date_range
+
+    # only the WS and WD columns are read, straight into float arrays
+    csv_cols = sorted({ws_col, wd_col})
+    ws = np.full(num_hours, np.nan)
+    wd = np.full(num_hours, np.nan)
+    rows_read = 0
+    blank_rows = None
     try:
-        csv_wind_df['ws'] = csv_working_df.iloc[:, ws_col].tolist()
-        csv_wind_df['wd'] = csv_working_df.iloc[:, wd_col].tolist()
-    except Exception:
+        reader = pd.read_csv(file, header=None, skiprows=header_lines, usecols=csv_cols,
+                             dtype={col: np.float64 for col in csv_cols}, chunksize=chunk_size)
+        chunks = reader if chunk_size else [reader]
+        for chunk in chunks:
+            # rows missing both WS and WD are only dropped when every other field is blank too - the other columns are
+            # only read when there are such rows
+            both_missing = chunk[ws_col].isna() & chunk[wd_col].isna()
+            if both_missing.any():
+                if blank_rows is None:
+                    blank_rows = get_blank_csv_rows(file, header_lines)
+                chunk = chunk.loc[~(both_missing & chunk.index.isin(blank_rows))]
+            n_rows = len(chunk)
+            if rows_read + n_rows > num_hours:
+                raise ValueError("more rows than hours")
+            ws[rows_read:rows_read + n_rows] = chunk[ws_col].to_numpy()
+            wd[rows_read:rows_read + n_rows] = chunk[wd_col].to_numpy()
+            rows_read += n_rows
+    except ValueError:
+        raise_error("Input number of hours does not match the length of the csv, or the WS/WD columns are not numeric", ValueError)
+    if rows_read != num_hours:
         raise_error("Input number of hours does not match the length of the csv", ValueError)
+
     # convert missing aermod values (i.e. 999 or 9999) to NaN
-    csv_wind_df.ws = csv_wind_df.apply(lambda x: np.nan if x['ws'] > 100 else x['ws'], axis=1)
-    csv_wind_df.wd = csv_wind_df.apply(lambda x: np.nan if x['wd'] > 360 else x['wd'], axis=1)
+    mask_aermod_missing_values(ws, wd)
 
-    return csv_wind_df
+    csv_df = pd.DataFrame({'date': csv_date_range, 'ws': ws, 'wd': wd})
+    return compact_wind_df(csv_df) if compact else csv_df
 
 
 def update_output_path(output_folder: pathlib.WindowsPath,
                        station_id: str,
                        rose_type: list,
-                       year_string: str) -> str:
+                       year_string: str,
+                       image_format: str = "png") -> str:
     """
-    Creates an output path to save the wind rose as a PNG image
+    Creates an output path to save the wind rose as an image
     :param output_folder: folder path
     :param station_id: station name or ID
     :param rose_type: Openair type of rose -e.g. 'season'
     :param year_string: Year string for annual wind roses - set to '' for all-data wind roses
+    :param image_format: 'png', 'svg' or 'pdf'
     :return: Full path to output file in string format
     """
-    output_file = str(output_folder) + "\\" + station_id + "_" + "_".join(rose_type) + "_" + year_string + ".png"
+    output_file = os.path.join(str(output_folder), station_id + "_" + "_".join(rose_type) + "_" + year_string + "." +
+                               image_format)
     return output_file
 
 
@@ -1,21 +1,82 @@
-from gooey import Gooey, GooeyParser
+import argparse
+import sys
+from __params__ import default_hours, default_ws_cats, default_grid, default_ray, default_calms, \
+    default_image_format, image_formats
 
-default_hours = '0-23'
-default_ws_cats = '0.5,1,2,3,4,5,7,10,15,20'
-default_grid = 10
-default_ray = 30
-default_calms = 0.5
+gooey_settings = dict(default_size=(1200,900),required_cols=4, optional_cols=4, program_name="Met data wind rose and chart maker",
+                      clear_before_run=True,
+                      image_dir=r'\\auntl1fp001/Groups/!ENV/Team_AQ/Modelling/+Support_Data/+BOM Data')
 
 
-@Gooey(default_size=(1200,900),required_cols=4, optional_cols=4, program_name="Met data wind rose and chart maker",
-       clear_before_run=True,
-       image_dir=r'\\auntl1fp001/Groups/!ENV/Team_AQ/Modelling/+Support_Data/+BOM Data')
-def parse_args():
+def without_gooey_options(add_argument):
+    """
+    Wraps an add_argument method so the options only meant for Gooey are ignored - the 'widget' and 'gooey_options'
+    arguments, and the metavar that Gooey uses as the label of each widget. Help text is shown as written, as in the GUI,
+    rather than formatted by argparse
+    """
+    def add_headless_argument(*args, widget=None, gooey_options=None, metavar=None, **kwargs):
+        if kwargs.get("help"):
+            kwargs["help"] = kwargs["help"].replace("%", "%%")
+        return add_argument(*args, **kwargs)
+    return add_headless_argument
+
+
+class HeadlessParser(argparse.ArgumentParser):
+    """
+    ArgumentParser that accepts and ignores the Gooey widget options, so the GUI's arguments can be parsed from the command
+    line without importing Gooey
+    """
+
+    def add_argument(self, *args, **kwargs):
+        return without_gooey_options(super().add_argument)(*args, **kwargs)
+
+    def add_argument_group(self, *args, gooey_options=None, **kwargs):
+        group = super().add_argument_group(*args, **kwargs)
+        group.add_argument = without_gooey_options(group.add_argument)
+        return group
+
+    def add_mutually_exclusive_group(self, gooey_options=None, **kwargs):
+        group = super().add_mutually_exclusive_group(**kwargs)
+        group.add_argument = without_gooey_options(group.add_argument)
+        return group
+
+
+def parse_args(argv: list = None):
+    """
+    Parses the wind rose options - with the Gooey GUI when the program is started without arguments, otherwise straight
+    from the command line, e.g. python main.py csv data.csv 1 1/1/2019 0 8760 A B -34 151 test, so headless runs and
+    --help do not import Gooey
+    :param argv: list of arguments, defaults to sys.argv
+    :return: parsed arguments
+    """
+    argv = sys.argv[1:] if argv is None else list(argv)
+    # the GUI runs the program again with the entered arguments and --ignore-gooey
+    argv = [x for x in argv if x != "--ignore-gooey"]
+    if argv:
+        parser = build_parser(HeadlessParser)
+        parser.add_argument('--validate_only', action='store_true',
+                            help="Check the inputs and exit without generating any wind roses - given before the command")
+        return parser.parse_args(argv)
+
+    from gooey import Gooey, GooeyParser
+
+    @Gooey(**gooey_settings)
+    def parse_gui_args():
+        return build_parser(GooeyParser).parse_args()
+    return parse_gui_args()
+
+
+def build_parser(parser_class):
+    """
+    Builds the parser for the wind rose options
+    :param parser_class: GooeyParser for the GUI or HeadlessParser for the command line
+    :return: parser
+    """
     # create GUI with input widgets
     prog_descrip = "Create wind roses from AECOM's met databases or selected csv file\n"
                    # "Create climate average charts (BoM data only)"
-    parser = GooeyParser(description=prog_descrip)
-    sub_parsers = parser.add_subparsers(help='commands', dest='command')
+    parser = parser_class(description=prog_descrip)
+    sub_parsers = parser.add_subparsers(help='commands', dest='command', required=True)
 
     #############################################################################################################################################
 
@@ -29,12 +90,28 @@ def parse_args():
                               widget="DirChooser")
     station_grp.add_argument('latitude', metavar="Latitude", help='Latitude of station in degrees, e.g. -27', type=float, default=-34)
     station_grp.add_argument('longitude', metavar="Longitude", help='Longitude of station in degrees, e.g. 153', type=float, default=151)
+    station_grp.add_argument('--backend', metavar="Rendering backend", help='Render the wind roses with R openair or matplotlib',
+                             widget='Dropdown', choices=['R', 'matplotlib'], default='R')
+    station_grp.add_argument('--render_workers', metavar="Render workers",
+                             help='Number of processes to render the wind roses in parallel - e.g. 4', type=int, default=1)
+    station_grp.add_argument('--compact', metavar="Compact memory", help='Hold the wind data in compact float32/int16 columns '
+                             '- for long 1-minute records', widget="CheckBox", action='store_true')
+    station_grp.add_argument('--image_format', metavar="Image format", help='Save the wind roses as PNG, SVG or PDF',
+                             widget='Dropdown', choices=image_formats, default=default_image_format)
+    station_grp.add_argument('--render_cache', metavar="Reuse unchanged roses", help='Copy wind roses rendered before from '
+                             'the same data and options instead of rendering them again', widget="CheckBox",
+                             action='store_true')
+    station_grp.add_argument('--profile', metavar="Profile run", help='Save the time and memory used by each stage next to '
+                             'the wind roses', widget="CheckBox", action='store_true')
 
     date_options_grp = database_tab.add_argument_group("Date options", "Select an optional date range an/or subset of hours",
                                                        gooey_options={"show_border": True, "columns": 2})
     date_options_grp.add_argument('--data_period', metavar="Data period", help="Optional start and end date e.g. 1/1/2019-31/12/2019", type=str)
     date_options_grp.add_argument('--cust_hours', metavar="Selected hours", help="Subset of hours or hour range e.g. 15 or 0-13 or 0-6,18-23",
                                   type=str, default=default_hours)
+    date_options_grp.add_argument('--resample', metavar="Averaging interval",
+                                  help="Optional interval to average sub-hourly data into while it is read - e.g. 1h or 10min",
+                                  type=str)
 
     wr_options_grp = database_tab.add_argument_group("Wind rose options", "Customise the wind roses",
                                                      gooey_options={"show_border": True, "columns": 6})
@@ -66,6 +143,18 @@ def parse_args():
     bom_outputs_grp.add_argument('--transparent', metavar='Save transparent images',
                              help='This will save transparent versions of all wind roses in addition to the default opaque versions',
                              action='store_true')
+    bom_outputs_grp.add_argument('--save_tables', metavar='Save frequency tables',
+                                 help='Save the wind rose frequency tables as CSV and JSON files next to each image',
+                                 widget="CheckBox", action='store_true')
+    bom_outputs_grp.add_argument('--stats_only', metavar='Frequency tables only',
+                                 help='Only save the frequency tables - no wind rose images are generated', widget="CheckBox",
+                                 action='store_true')
+    bom_outputs_grp.add_argument('--use_cube', metavar='Use cached wind cube',
+                                 help='Produce the tables and matplotlib wind roses from the station\'s cached count cube '
+                                      'instead of re-reading the data', widget="CheckBox", action='store_true')
+    bom_outputs_grp.add_argument('--use_store', metavar='Use binary station store',
+                                 help='Read the station from its binary store, if one has been built with station_store.py',
+                                 widget="CheckBox", action='store_true')
 
     #############################################################################################################################################
 
@@ -82,6 +171,8 @@ def parse_args():
     inputs_grp.add_argument('latitude', metavar="Latitude", help='Latitude of station in degrees, e.g. -27', type=float)
     inputs_grp.add_argument('longitude', metavar="Longitude", help='Longitude of station in degrees, e.g. 153', type=float)
     inputs_grp.add_argument('prefix', metavar="Prefix", help="Text prefix for wind rose image outputs", type=str)
+    inputs_grp.add_argument('--chunk_size', metavar="Chunk size", help='Optional number of rows to read at a time for very large csv files',
+                            type=int)
 
     wr_grp = csv_tab.add_argument_group("CSV file parameters", gooey_options={"show_border": True, "columns": 4})
     wr_grp.add_argument('--data_period', metavar="Data period", help="Optional start and end date e.g. 1/1/2019-31/12/2019", type=str)
@@ -99,6 +190,18 @@ def parse_args():
                                                         "should match min wind speed category", type=float, default=default_calms)
     wr_grp.add_argument('--max_freq', metavar="Max freq", help="Max frequency circle - e.g. 40 - "
                                                  "default is automatic", type=int)
+    wr_grp.add_argument('--backend', metavar="Rendering backend", help='Render the wind roses with R openair or matplotlib',
+                        widget='Dropdown', choices=['R', 'matplotlib'], default='R')
+    wr_grp.add_argument('--render_workers', metavar="Render workers",
+                        help='Number of processes to render the wind roses in parallel - e.g. 4', type=int, default=1)
+    wr_grp.add_argument('--compact', metavar="Compact memory", help='Hold the wind data in compact float32/int16 columns '
+                        '- for long 1-minute records', widget="CheckBox", action='store_true')
+    wr_grp.add_argument('--image_format', metavar="Image format", help='Save the wind roses as PNG, SVG or PDF',
+                        widget='Dropdown', choices=image_formats, default=default_image_format)
+    wr_grp.add_argument('--render_cache', metavar="Reuse unchanged roses", help='Copy wind roses rendered before from '
+                        'the same data and options instead of rendering them again', widget="CheckBox", action='store_true')
+    wr_grp.add_argument('--profile', metavar="Profile run", help='Save the time and memory used by each stage next to '
+                        'the wind roses', widget="CheckBox", action='store_true')
     wr_grp.add_argument('--output_folder', metavar="Output folder", help='Specify optional output folder - default is same location as csv file', type=str,
                                widget="DirChooser")
 
@@ -115,6 +218,11 @@ def parse_args():
     outputs_grp.add_argument('--transparent', metavar='Save transparent images',
                              help='This will save transparent versions of all wind roses in addition to the default opaque versions',
                              action='store_true')
+    outputs_grp.add_argument('--save_tables', metavar='Save frequency tables',
+                             help='Save the wind rose frequency tables as CSV and JSON files next to each image',
+                             widget="CheckBox", action='store_true')
+    outputs_grp.add_argument('--stats_only', metavar='Frequency tables only',
+                             help='Only save the frequency tables - no wind rose images are generated', widget="CheckBox",
+                             action='store_true')
 
-    args = parser.parse_args()
-    return args
\ No newline at end of file
+    return parser
\ No newline at end of file
@@ -1,13 +1,25 @@
 from gui import parse_args
-from functions import get_rose_types_and_layouts
+from checks import check_wind_rose_inputs
 
-if __name__ == "__main__":
 
-    prog = parse_args()
+def main(argv: list = None):
+    """
+    Runs the wind rose tool - with the GUI when started without arguments, otherwise headless from the command line
+    The inputs are checked before the wind rose pipeline is imported, so --help, --validate_only and invalid runs do not
+    import pandas, R, Gooey or PIL
+    :param argv: list of arguments, defaults to sys.argv
+    """
+    prog = parse_args(argv)
+    check_wind_rose_inputs(prog.latitude, prog.longitude, prog.grid_spacing, prog.ray_angle, prog.wind_speed_categories,
+                           prog.calms_threshold, prog.max_freq)
+    if getattr(prog, "validate_only", False):
+        print("Inputs are valid")
+        return
 
-    if prog.command == 'BoM_OEH_DES_EPAV_Station':
-        from main_wind_rose_function import windrose_from_data
+    from functions import get_rose_types_and_layouts
+    from main_wind_rose_function import windrose_from_data
 
+    if prog.command == 'BoM_OEH_DES_EPAV_Station':
         rose_types, rose_layouts = get_rose_types_and_layouts(
             prog.all_hours,
             prog.seasons,
@@ -33,13 +45,22 @@ if __name__ == "__main__":
             rose_layouts=rose_layouts,
             annual=prog.annual,
             save_transparent=prog.transparent,
+            save_tables=prog.save_tables,
+            stats_only=prog.stats_only,
+            backend=prog.backend,
+            render_workers=prog.render_workers,
+            compact=prog.compact,
+            profile=prog.profile,
+            render_cache=prog.render_cache,
+            image_format=prog.image_format,
+            use_cube=prog.use_cube,
+            use_store=prog.use_store,
+            resample=prog.resample,
             database_source=True,
             station_id=prog.station_id
         )
 
     if prog.command == 'csv':
-        from main_wind_rose_function import windrose_from_data
-
         rose_types, rose_layouts = get_rose_types_and_layouts(
             prog.all_hours,
             prog.seasons,
@@ -65,6 +86,14 @@ if __name__ == "__main__":
             rose_layouts=rose_layouts,
             annual=prog.annual,
             save_transparent=prog.transparent,
+            save_tables=prog.save_tables,
+            stats_only=prog.stats_only,
+            backend=prog.backend,
+            render_workers=prog.render_workers,
+            compact=prog.compact,
+            profile=prog.profile,
+            render_cache=prog.render_cache,
+            image_format=prog.image_format,
             database_source=False,
             csv_file=prog.csv_file,
             header_lines=prog.header_lines,
@@ -73,6 +102,10 @@ if __name__ == "__main__":
             num_hours=prog.num_hours,
             ws_col=prog.WS_column,
             wd_col=prog.WD_column,
+            chunk_size=prog.chunk_size,
 
         )
 
+
+if __name__ == "__main__":
+    main()
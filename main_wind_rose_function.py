@@ -1,13 +1,306 @@
-import math
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
 from __params__ import data_source_dict, r_type_size_dict
-from checks import check_lat_long, check_custom_inputs, check_calms_threshold, check_and_get_ws_cat
+from checks import check_wind_rose_inputs, raise_error
 from functions import import_data, get_data_source, create_new_folder_for_output, \
-    slice_by_custom_dates, slice_by_custom_hours, generate_annual_wind_dict, make_image_transparent, \
-    replace_calms, windrose_data_not_empty, import_csv_data, update_output_path
-from rpy2_windrose import Rpy2WindRose
+    generate_annual_wind_dict, get_transparent_path, windrose_data_not_empty, import_csv_data, update_output_path, \
+    parse_custom_hours
+from windrose_frequencies import calculate_windrose_frequencies, write_frequency_tables
+from daylight import add_daylight_column
+from wind_cube import get_cube_period, load_or_build_wind_cube
+from station_store import open_station_store
+from wind_query import WindQuery
+from resampler import import_data_resampled
+from profiler import profile_run, profile_stage, get_profiler
+from render_cache import get_render_key, get_render_cache
 
+# wind data held by each rendering worker process - see init_render_worker
+_worker_data = {}
 
+
+def get_wind_rose_class(backend: str):
+    """
+    Returns the wind rose class for the selected rendering backend - the backend modules are only imported when selected
+    :param backend: 'R' for R's openair via Rpy2WindRose or 'matplotlib' for MplWindRose
+    :return: wind rose class
+    """
+    if str(backend).lower() == "matplotlib":
+        from mpl_windrose import MplWindRose
+        return MplWindRose
+    from rpy2_windrose import Rpy2WindRose
+    return Rpy2WindRose
+
+
+def init_render_worker(warm_r: bool,
+                       wind_df=None):
+    """
+    Runs once in each rendering worker process - warms up one R runtime per worker and keeps the station's wind data so it
+    is only sent to each worker once
+    :param warm_r: True if the wind roses are rendered with R
+    :param wind_df: optional station data frame that jobs without their own data are rendered from
+    """
+    if wind_df is not None:
+        _worker_data["wind_df"] = wind_df
+        _worker_data["annual_wind_dict"] = None
+    if warm_r:
+        try:
+            from r_runtime import get_r_runtime
+            get_r_runtime()
+        except Exception as e:
+            # leave the error to be reported against each job rather than breaking the pool
+            print(f"R runtime could not be started in worker {os.getpid()}: {e}")
+
+
+def get_worker_data(year):
+    """
+    Returns the wind data for a job from the data sent to this worker process
+    :param year: year of an annual wind rose, or None for all data
+    :return: wind data frame
+    """
+    if year is None:
+        return _worker_data["wind_df"]
+    if _worker_data["annual_wind_dict"] is None:
+        _worker_data["annual_wind_dict"] = generate_annual_wind_dict(_worker_data["wind_df"])
+    return _worker_data["annual_wind_dict"][year]
+
+
+def render_wind_rose(job: dict,
+                     data=None) -> str:
+    """
+    Renders a single wind rose job - a rose type and year with all the wind rose attributes to set
+    Jobs with 'render_cache' set are copied from the render cache when an identical wind rose has been rendered before, and
+    jobs with 'transparent' set also save a transparent version from the same render
+    :param job: dictionary with 'year', 'backend', 'save_table', 'render_cache', 'transparent' and 'attributes' keys
+    :param data: wind data frame for the job - taken from the worker's data if not provided
+    :return: path to the rendered wind rose
+    """
+    if data is None:
+        data = get_worker_data(job["year"])
+    attributes = job["attributes"]
+    name = "_".join(attributes["rose_type"]) + ("" if job["year"] is None else f" {job['year']}")
+    transparent_path = get_transparent_path(attributes["png_file_path"]) if job.get("transparent") else None
+    render_key = get_render_key(data, job["backend"], attributes) if job.get("render_cache") else None
+    if render_key is not None and get_render_cache().fetch(render_key, attributes["png_file_path"], transparent_path):
+        print(f"Copied {name} windrose from the render cache")
+    else:
+        with profile_stage(f"render {name}", len(data)):
+            wind_rose = get_wind_rose_class(job["backend"])(data=data)
+            for attr_name, value in attributes.items():
+                setattr(wind_rose, attr_name, value)
+            wind_rose.transparent_file_path = transparent_path
+            wind_rose.create_wind_rose()
+        if render_key is not None:
+            get_render_cache().store(render_key, attributes["png_file_path"], transparent_path)
+    if job["save_table"]:
+        save_job_table(job, data)
+    return attributes["png_file_path"]
+
+
+def save_job_table(job: dict,
+                   data):
+    """
+    Saves the frequency table of a wind rose job next to its wind rose
+    :param job: job dictionary - see render_wind_rose
+    :param data: wind data frame for the job
+    """
+    attributes = job["attributes"]
+    name = "_".join(attributes["rose_type"]) + ("" if job["year"] is None else f" {job['year']}")
+    with profile_stage(f"frequency table {name}", len(data)):
+        table = calculate_windrose_frequencies(data, attributes["rose_type"], attributes["ray_angle"],
+                                               attributes["categories"], attributes["latitude"], attributes["longitude"])
+        write_frequency_tables(table, attributes["png_file_path"])
+
+
+def render_wind_roses_in_r(jobs: list,
+                           wind_df,
+                           annual_wind_dict: dict) -> list:
+    """
+    Renders a list of R wind rose jobs with one round trip to R - the station data is sent to R once and every rose type and
+    year is rendered from it inside R (see Rpy2WindRose.create_wind_roses)
+    Jobs are copied from the render cache and their frequency tables saved as in render_wind_rose
+    :param jobs: list of job dictionaries for the R backend - see render_wind_rose
+    :param wind_df: station wind data frame
+    :param annual_wind_dict: dictionary of annual wind data frames
+    :return: list of paths to the rendered wind roses, in job order
+    """
+    batch = []
+    for job in jobs:
+        data = wind_df if job["year"] is None else annual_wind_dict[job["year"]]
+        attributes = job["attributes"]
+        transparent_path = get_transparent_path(attributes["png_file_path"]) if job.get("transparent") else None
+        render_key = get_render_key(data, job["backend"], attributes) if job.get("render_cache") else None
+        if render_key is not None and get_render_cache().fetch(render_key, attributes["png_file_path"], transparent_path):
+            name = "_".join(attributes["rose_type"]) + ("" if job["year"] is None else f" {job['year']}")
+            print(f"Copied {name} windrose from the render cache")
+        else:
+            batch.append((job, transparent_path, render_key))
+
+    if batch:
+        with profile_stage(f"render {len(batch)} windroses in R", len(wind_df)):
+            wind_rose = get_wind_rose_class(batch[0][0]["backend"])(data=wind_df)
+            # the attributes shared by every job are set on the wind rose, the rest are passed with each job
+            for attr_name, value in batch[0][0]["attributes"].items():
+                setattr(wind_rose, attr_name, value)
+            wind_rose.create_wind_roses([dict(job["attributes"], year=job["year"], transparent_file_path=transparent_path)
+                                         for job, transparent_path, _ in batch])
+        for job, transparent_path, render_key in batch:
+            if render_key is not None:
+                get_render_cache().store(render_key, job["attributes"]["png_file_path"], transparent_path)
+
+    for job in jobs:
+        if job["save_table"]:
+            save_job_table(job, wind_df if job["year"] is None else annual_wind_dict[job["year"]])
+    return [job["attributes"]["png_file_path"] for job in jobs]
+
+
+def render_jobs(jobs: list,
+                wind_df,
+                annual_wind_dict: dict,
+                render_workers: int = None,
+                transparent_jobs: list = None) -> (list, list):
+    """
+    Renders a list of wind rose jobs, either one after another or spread over a pool of worker processes - R jobs rendered
+    in this process are rendered as one batch in R
+    Transparent versions are saved by the renderer, from the same render as the wind rose
+    :param jobs: list of job dictionaries - see render_wind_rose
+    :param wind_df: station wind data frame
+    :param annual_wind_dict: dictionary of annual wind data frames
+    :param render_workers: number of worker processes - jobs are rendered in this process if not set or 1
+    :param transparent_jobs: indexes of the jobs to also save a transparent version of
+    :return: list of wind rose paths and list of transparent wind rose paths, both in job order
+    """
+    transparent_jobs = set(transparent_jobs or [])
+    jobs = [dict(job, transparent=i in transparent_jobs) for i, job in enumerate(jobs)]
+    images = [None] * len(jobs)
+    transparent_images = {}
+
+    def job_finished(i):
+        job = jobs[i]
+        name = "_".join(job["attributes"]["rose_type"])
+        print(f"\nGenerated {name} windrose" + (f" for {job['year']}" if job["year"] is not None else "") + "\n")
+        if i in transparent_jobs:
+            transparent_images[i] = get_transparent_path(images[i])
+
+    if (not render_workers or render_workers <= 1) and len(jobs) > 1 and all(job["backend"] == "R" for job in jobs):
+        # the station data is sent to R once for all the rose types and years
+        images = render_wind_roses_in_r(jobs, wind_df, annual_wind_dict)
+        for i in range(len(jobs)):
+            job_finished(i)
+    elif not render_workers or render_workers <= 1:
+        for i, job in enumerate(jobs):
+            data = wind_df if job["year"] is None else annual_wind_dict[job["year"]]
+            images[i] = render_wind_rose(job, data)
+            job_finished(i)
+    else:
+        # the renders are profiled as a whole, as the worker processes are not profiled
+        warm_r = any(job["backend"] == "R" for job in jobs)
+        with profile_stage(f"render {len(jobs)} jobs in {render_workers} workers"):
+            with ProcessPoolExecutor(max_workers=render_workers,
+                                     initializer=init_render_worker,
+                                     initargs=(warm_r, wind_df)) as executor:
+                futures = {executor.submit(render_wind_rose, job): i for i, job in enumerate(jobs)}
+                for future in as_completed(futures):
+                    i = futures[future]
+                    images[i] = future.result()
+                    job_finished(i)
+
+    return images, [transparent_images[i] for i in sorted(transparent_images)]
+
+
+def get_render_jobs(rose_types: list,
+                    rose_layouts: list,
+                    years: list,
+                    backend: str,
+                    save_tables: bool,
+                    output_folder: Path,
+                    station_id: str,
+                    attributes: dict,
+                    render_cache: bool = False,
+                    image_format: str = "png") -> list:
+    """
+    Creates a job for each rose type, for all data and each year
+    :param rose_types: list of types of openair roses to be generated
+    :param rose_layouts: list of layouts to accompany each rose type
+    :param years: list of years to generate annual wind roses for
+    :param backend: 'R' or 'matplotlib' rendering backend
+    :param save_tables: save the frequency table next to each wind rose
+    :param output_folder: path to wind rose output location
+    :param station_id: station name, including any file prefix
+    :param attributes: wind rose attributes shared by every job
+    :param render_cache: reuse unchanged wind roses from the render cache - see render_cache.py
+    :param image_format: 'png', 'svg' or 'pdf'
+    :return: list of job dictionaries - see render_wind_rose
+    """
+    jobs = []
+    for r_type, layout in zip(rose_types, rose_layouts):
+        for year in [None] + list(years):
+            year_string = 'all_data' if year is None else str(year)
+            job_attributes = dict(
+                attributes,
+                station=station_id,
+                rose_type=r_type,
+                rose_layout=layout,
+                width=r_type_size_dict.get("_".join(r_type))[0],
+                height=r_type_size_dict.get("_".join(r_type))[1],
+                year_string=year_string,
+                png_file_path=update_output_path(output_folder, station_id, r_type, year_string, image_format)
+            )
+            jobs.append({"year": year, "backend": backend, "save_table": bool(save_tables), "render_cache": bool(render_cache),
+                         "attributes": job_attributes})
+    return jobs
+
+
+def render_jobs_from_cube(jobs: list,
+                          cube,
+                          calms_threshold: float,
+                          hours: list = None,
+                          period: tuple = None,
+                          stats_only: bool = False,
+                          transparent_jobs: list = None) -> list:
+    """
+    Produces the frequency tables, and the wind roses unless stats_only is set, for a list of jobs from a station's wind cube
+    The station data is not re-read or re-sliced - the wind roses are rendered from the tables with the matplotlib backend
+    :param jobs: list of job dictionaries - see render_wind_rose
+    :param cube: station WindCube
+    :param calms_threshold: threshold for calm winds in m/s
+    :param hours: optional list of hours to include
+    :param period: optional month range from get_cube_period
+    :param stats_only: only save the frequency tables
+    :param transparent_jobs: indexes of the jobs to also save a transparent version of
+    :return: list of paths to the output files
+    """
+    transparent_jobs = set(transparent_jobs or [])
+    outputs = []
+    transparent_images = []
+    for i, job in enumerate(jobs):
+        attributes = job["attributes"]
+        table = cube.frequency_table(attributes["rose_type"], attributes["ray_angle"], attributes["categories"],
+                                     calms_threshold, hours, None if job["year"] is None else [job["year"]], period)
+        if not table["count"].any():
+            continue
+        name = "_".join(attributes["rose_type"])
+        for_year = f" for {job['year']}" if job["year"] is not None else ""
+        if stats_only:
+            outputs.extend(write_frequency_tables(table, attributes["png_file_path"]))
+            print(f"\nGenerated {name} frequency tables{for_year}\n")
+            continue
+        wind_rose = get_wind_rose_class("matplotlib")(data=None)
+        for attr_name, value in attributes.items():
+            setattr(wind_rose, attr_name, value)
+        wind_rose.frequency_table = table
+        wind_rose.transparent_file_path = get_transparent_path(wind_rose.png_file_path) if i in transparent_jobs else None
+        wind_rose.create_wind_rose()
+        if job["save_table"]:
+            write_frequency_tables(table, attributes["png_file_path"])
+        outputs.append(wind_rose.png_file_path)
+        print(f"\nGenerated {name} windrose{for_year}\n")
+        if i in transparent_jobs:
+            transparent_images.append(wind_rose.transparent_file_path)
+    return outputs + transparent_images
+
+
+@profile_run
 def windrose_from_data(
         data_source,
         output_folder,
@@ -45,28 +338,85 @@ def windrose_from_data(
     :param rose_layouts: list of layouts to accompany each rose type
     :param annual: controls whether to output annual wind roses or not
     :param save_transparent: controls whether to save transparent version of the default all-data wind roses
-    :return: None
+    :param kwargs: save_tables - save the wind rose frequency tables as CSV/JSON next to each PNG
+                   stats_only - only save the frequency tables, without rendering the wind roses in R
+                   backend - 'R' (default) or 'matplotlib' rendering backend
+                   render_workers - number of worker processes to render the rose types and annual roses in parallel
+                   use_cube - answer database station runs from the station's cached wind count cube (see wind_cube.py)
+                              when only the tables are saved or the matplotlib backend is used, and the ray angle,
+                              categories and calms threshold line up with the cube bins
+                   use_store - read database stations from their binary store (see station_store.py) where one is up to
+                               date, reading only the rows in the data period - not with resample
+                   compact - hold the wind data as float32 'ws', int16 'wd' and datetime64[s] 'date' (see compact.py)
+                   resample - interval to average sub-hourly database data into while it is read, e.g. '1h' (see
+                              resampler.py) - also used to build the wind cube
+                   profile - record the time, CPU time, peak memory and rows of each stage and save the report next to the
+                             wind roses as <station>_profile.json and .csv (see profiler.py)
+                   image_format - 'png' (default), 'svg' or 'pdf' - transparent versions of every format are saved from
+                                  the same render as the wind rose
+                   render_cache - copy wind roses that have been rendered before from identical data and options from the
+                                  render cache instead of rendering them again (see render_cache.py)
+                   data_location - directory of the database, in place of the path in __params__ (see service.py)
+    :return: list of paths to the output files
     """
 
     station_id = kwargs.get("station_id", "")
 
     # Perform checks on inputs upfront
-    check_lat_long(lat, long)
-    check_custom_inputs("grid_spacing", grid_spacing)
-    check_custom_inputs("ray_angle", int(math.floor(ray_angle)))
-    ws_categories = check_and_get_ws_cat(ws_categories)
-    check_calms_threshold(ws_categories[0], calms_threshold)
-    if max_freq or max_freq == 0:
-        check_custom_inputs("max_freq", max_freq)
-    else:
-        max_freq = "NULL"
+    ws_categories, max_freq = check_wind_rose_inputs(lat, long, grid_spacing, ray_angle, ws_categories, calms_threshold,
+                                                     max_freq)
+    if kwargs.get("use_store") and kwargs.get("resample"):
+        # the store holds the data as recorded, so it would bypass the averaging
+        raise_error("The binary station store cannot be used with a resampling interval - drop use_store or resample",
+                    ValueError)
 
     if kwargs.get("database_source"):
         # Data is located in one of AECOM's databases
-        data_location = data_source_dict.get(data_source)
-        data_file = get_data_source(data_source, data_location, station_id)
+        data_location = kwargs.get("data_location") or data_source_dict.get(data_source)
+        with profile_stage("locate station"):
+            data_file = get_data_source(data_source, data_location, station_id)
         new_output_folder = Path(create_new_folder_for_output(output_folder, station_id))
-        wind_df = import_data(data_source, data_file)
+        if get_profiler():
+            get_profiler().set_report_path(new_output_folder, file_prefix + "_" + station_id if file_prefix else station_id)
+        cube_period = get_cube_period(data_period)
+        cube = None
+        if kwargs.get("use_cube") and (kwargs.get("stats_only") or kwargs.get("backend") == "matplotlib") \
+                and cube_period is not False:
+            with profile_stage("load wind cube"):
+                cube = load_or_build_wind_cube(data_source, data_file, lat, long, resample=kwargs.get("resample"))
+            # bins that do not line up with the cube's are answered from the station data instead
+            if not cube.is_exact_for(ray_angle, ws_categories, calms_threshold):
+                cube = None
+        if cube is not None:
+            if file_prefix:
+                station_id = file_prefix + "_" + station_id
+            jobs = get_render_jobs(rose_types, rose_layouts, cube.get_years() if annual else [], "matplotlib",
+                                   kwargs.get("save_tables"), new_output_folder, station_id,
+                                   dict(latitude=lat, longitude=long, categories=ws_categories, grid=grid_spacing,
+                                        ray_angle=ray_angle, max_frequency=max_freq),
+                                   image_format=kwargs.get("image_format") or "png")
+            transparent_jobs = [i for i, job in enumerate(jobs) if save_transparent and job["attributes"]["rose_type"] == ['default']]
+            return render_jobs_from_cube(jobs, cube, calms_threshold,
+                                         parse_custom_hours(selected_hours) if selected_hours else None, cube_period,
+                                         kwargs.get("stats_only"), transparent_jobs)
+        store = open_station_store(data_source, data_file) if kwargs.get("use_store") else None
+        if store is not None:
+            with profile_stage("read station store") as stage:
+                wind_df = store.read_period(data_period, kwargs.get("compact", False))
+                stage["rows"] = len(wind_df)
+            if wind_df.empty:
+                raise_error("The custom dates are outside the data available", ValueError)
+            # the store has already read only the rows in the data period
+            data_period = None
+        elif kwargs.get("resample"):
+            with profile_stage("import and resample data") as stage:
+                wind_df = import_data_resampled(data_source, data_file, kwargs.get("resample"),
+                                                compact=kwargs.get("compact", False))
+                stage["rows"] = len(wind_df)
+        else:
+            with profile_stage("import data") as stage:
+                wind_df = import_data(data_source, data_file, compact=kwargs.get("compact", False))
+                stage["rows"] = len(wind_df)
     else:
         # Data is via custom CSV file
         data_file = Path(kwargs.get("csv_file"))
@@ -74,12 +424,23 @@ def windrose_from_data(
             new_output_folder = Path(output_folder)
         else:
             new_output_folder = Path(data_file).parent
-        wind_df = import_csv_data(data_file, kwargs.get("header_lines"), kwargs.get("start_date"), kwargs.get("start_hour"),
-                                  kwargs.get("num_hours"), kwargs.get("ws_col"), kwargs.get("wd_col"))
+        if get_profiler():
+            get_profiler().set_report_path(new_output_folder, file_prefix + "_" + data_file.stem if file_prefix
+                                           else data_file.stem)
+        with profile_stage("import csv data") as stage:
+            wind_df = import_csv_data(data_file, kwargs.get("header_lines"), kwargs.get("start_date"),
+                                      kwargs.get("start_hour"), kwargs.get("num_hours"), kwargs.get("ws_col"),
+                                      kwargs.get("wd_col"), chunk_size=kwargs.get("chunk_size"),
+                                      compact=kwargs.get("compact", False))
+            stage["rows"] = len(wind_df)
 
-    wind_df = slice_by_custom_dates(wind_df, data_period)
-    wind_df = slice_by_custom_hours(wind_df, selected_hours)
-    wind_df = replace_calms(wind_df, calms_threshold)
+    # date period, hours and calms applied in one pass, without modifying the imported data
+    with profile_stage("dates, hours and calms", len(wind_df)):
+        wind_df = WindQuery(wind_df).dates(data_period).hours(selected_hours).calms(calms_threshold).run()
+    if any("daylight" in r_type for r_type in rose_types):
+        # classify daylight once for the station rather than once per rose
+        with profile_stage("daylight", len(wind_df)):
+            wind_df = add_daylight_column(wind_df, lat, long)
 
     if windrose_data_not_empty(wind_df, True):
 
@@ -88,41 +449,33 @@ def windrose_from_data(
 
         annual_wind_dict = {}
         if annual:
-            annual_wind_dict = generate_annual_wind_dict(wind_df)
-
-        for r_type, layout in zip(rose_types, rose_layouts):
-            wind_rose = Rpy2WindRose(data=wind_df)
-            wind_rose.latitude = lat
-            wind_rose.longitude = long
-            wind_rose.station = station_id
-            wind_rose.categories = ws_categories
-            wind_rose.grid = grid_spacing
-            wind_rose.ray_angle = ray_angle
-            wind_rose.max_frequency = max_freq
-            wind_rose.rose_type = r_type
-            wind_rose.rose_layout = layout
-            wind_rose.width = r_type_size_dict.get("_".join(r_type))[0]
-            wind_rose.height = r_type_size_dict.get("_".join(r_type))[1]
-            wind_rose.year_string = 'all_data'
-
-            wind_rose.png_file_path = update_output_path(new_output_folder, wind_rose.station, wind_rose.rose_type, wind_rose.year_string)
-
-            wind_rose.create_wind_rose()
-            print("\nGenerated " + "_".join(wind_rose.rose_type) + " windrose\n")
+            with profile_stage("annual split", len(wind_df)):
+                annual_wind_dict = generate_annual_wind_dict(wind_df)
 
-            images = [wind_rose.png_file_path]
+        outputs = []
+        save_tables = kwargs.get("save_tables") or kwargs.get("stats_only")
+        if kwargs.get("stats_only"):
+            for r_type in rose_types:
+                for year, wind_data in [('all_data', wind_df)] + list(annual_wind_dict.items()):
+                    if windrose_data_not_empty(wind_data, False):
+                        output_path = update_output_path(new_output_folder, station_id, r_type, str(year))
+                        with profile_stage(f"frequency table {'_'.join(r_type)} {year}", len(wind_data)):
+                            table = calculate_windrose_frequencies(wind_data, r_type, ray_angle, ws_categories, lat, long)
+                            outputs.extend(write_frequency_tables(table, output_path))
+                print("\nGenerated " + "_".join(r_type) + " frequency tables\n")
+            return outputs
 
-            for year, wind_data in annual_wind_dict.items():
-                if windrose_data_not_empty(wind_data, False):
-                    print(f"Generating wind rose for {year}")
-                    wind_rose.data = wind_data
-                    wind_rose.year_string = str(year)
-                    wind_rose.png_file_path = update_output_path(new_output_folder, wind_rose.station, wind_rose.rose_type, wind_rose.year_string)
-                    wind_rose.create_wind_rose()
-                    images.append(wind_rose.png_file_path)
+        years = [year for year in annual_wind_dict if windrose_data_not_empty(annual_wind_dict[year], False)]
+        jobs = get_render_jobs(rose_types, rose_layouts, years, kwargs.get("backend", "R"), save_tables, new_output_folder,
+                               station_id, dict(latitude=lat, longitude=long, categories=ws_categories, grid=grid_spacing,
+                                                ray_angle=ray_angle, max_frequency=max_freq),
+                               kwargs.get("render_cache"), kwargs.get("image_format") or "png")
 
-            if save_transparent:
-                for image in images:
-                    if "default" in image:  # only default 'all-hours' wind roses are saved as transparent versions
-                        make_image_transparent(image)
+        # only default 'all-hours' wind roses are saved as transparent versions
+        transparent_jobs = [i for i, job in enumerate(jobs) if save_transparent and job["attributes"]["rose_type"] == ['default']]
+        images, transparent_images = render_jobs(jobs, wind_df, annual_wind_dict, kwargs.get("render_workers"),
+                                                 transparent_jobs)
+        outputs.extend(images)
+        outputs.extend(transparent_images)
 
+        return outputs
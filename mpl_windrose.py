@@ -0,0 +1,165 @@
+import os
+import tempfile
+import numpy as np
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from windrose_frequencies import calculate_windrose_frequencies
+from functions import is_vector_image, make_pixels_transparent, save_image_variants
+
+
+class MplWindRose:
+    """
+    Class to create windrose objects rendered with matplotlib's Agg backend instead of R's openair. Has the same attributes as
+    Rpy2WindRose so either class can be used by windrose_from_data - see rpy2_windrose.py for a description of each attribute.
+    The binned frequencies are calculated by windrose_frequencies.calculate_windrose_frequencies, unless a precomputed table
+    is set in 'self.frequency_table' (e.g. from a WindCube), in which case 'self.data' is not used
+
+    Functions:
+        create_wind_rose(self) -> None
+            Generates the wind rose and saves it as a PNG file to the specified path location in 'self.png_file_path', and a
+            transparent version to 'self.transparent_file_path' if set
+    """
+
+    def __init__(self, data):
+        """
+        Generates an instance of the class MplWindRose with the same defaults as Rpy2WindRose
+        :param data: a pandas dataframe object with 3 columns - 'date', 'ws', 'wd'
+        """
+        self.data = data
+        self.latitude = -34
+        self.longitude = 151
+        self.station = 'station'
+        self.categories = [0.5, 1, 2, 3, 4, 5, 7, 10, 15, 20]
+        self.grid = 10
+        self.ray_angle = 30
+        self.max_frequency = "Null"
+        self.rose_type = ["default"]
+        self.rose_layout = [1, 2]
+        self.year_string = ""
+        self.png_file_path = "wind_rose.png"
+        self.transparent_file_path = None
+        self.image_name = ""
+        self.width = 1000
+        self.height = 1000
+        self.paddle = False
+        self.key_position = "right"
+        self.fontsize = 25
+        self.colours = "default"
+        self.offset = 10
+        self.hemisphere = "southern"
+        self.border = "black"
+        self.seg = 0.6
+        self.frequency_table = None
+
+    def get_colours(self, n_colours: int) -> list:
+        """
+        Returns the fill colour for each wind speed interval
+        :param n_colours: number of wind speed intervals
+        :return: list of colours
+        """
+        from matplotlib import colormaps
+        if isinstance(self.colours, (list, tuple)):
+            return list(self.colours)[:n_colours]
+        cmap_name = "viridis" if self.colours == "default" else self.colours
+        return [colormaps[cmap_name](x) for x in np.linspace(0, 1, n_colours)]
+
+    def get_max_frequency(self, table, interval_cols: list) -> float:
+        """
+        Returns the radial axis limit - the user's max frequency or the largest sector total rounded up to the grid interval
+        """
+        if self.max_frequency not in ("Null", "NULL", None):
+            return float(self.max_frequency)
+        max_total = float(table[interval_cols].sum(axis=1).max()) if len(table) else 0
+        return max(self.grid, self.grid * np.ceil(max_total / self.grid))
+
+    def get_panels(self, table) -> list:
+        """
+        Splits the frequency table into panels, ordered like openair's lattice layout with the first type varying fastest
+        :return: list of (panel title, panel table) tuples
+        """
+        type_cols = [x for x in self.rose_type if x != "default"]
+        if not type_cols:
+            return [("", table)]
+        label_orders = [list(table[col].unique()) for col in type_cols]
+        panels = []
+        for panel_name, panel_table in table.groupby(type_cols, sort=False):
+            panel_name = panel_name if isinstance(panel_name, tuple) else (panel_name,)
+            order = tuple(label_orders[i].index(panel_name[i]) for i in reversed(range(len(type_cols))))
+            panels.append((order, " / ".join(panel_name), panel_table))
+        return [(name, panel_table) for order, name, panel_table in sorted(panels, key=lambda x: x[0])]
+
+    def draw_panel(self, ax, panel_table, interval_cols: list, colours: list, max_freq: float, title: str):
+        """
+        Draws the stacked wind rose for one panel onto a polar axes
+        """
+        ax.set_theta_zero_location("N")
+        ax.set_theta_direction(-1)
+        ax.set_rorigin(-max_freq * self.offset / 100)
+        ax.set_ylim(0, max_freq)
+
+        theta = np.radians(panel_table["wd"].to_numpy())
+        bottom = np.zeros(len(panel_table))
+        base_width = np.radians(self.ray_angle) * self.seg
+        for i, (col, colour) in enumerate(zip(interval_cols, colours)):
+            width = base_width * (i + 1) / len(interval_cols) if self.paddle else base_width
+            heights = panel_table[col].to_numpy()
+            ax.bar(theta, heights, width=width, bottom=bottom, color=colour, edgecolor=self.border, linewidth=0.5,
+                   label=col)
+            bottom = bottom + heights
+
+        ax.set_rgrids(np.arange(self.grid, max_freq + self.grid / 2, self.grid),
+                      labels=[f"{x:g}%" for x in np.arange(self.grid, max_freq + self.grid / 2, self.grid)],
+                      fontsize=self.fontsize * 0.5)
+        ax.set_thetagrids([0, 90, 180, 270], labels=["N", "E", "S", "W"], fontsize=self.fontsize * 0.6)
+        calm = panel_table["calm"].iloc[0] if len(panel_table) else 0
+        ax.set_title(title, fontsize=self.fontsize * 0.6)
+        ax.text(np.radians(135), max_freq, f"calm = {calm:.1f}%", fontsize=self.fontsize * 0.45, ha="left", va="top")
+
+    def create_wind_rose(self):
+        """
+        This function generates the wind rose and saves it as a PNG file to path specified in self.png_file_path
+        """
+        table = self.frequency_table
+        if table is None:
+            table = calculate_windrose_frequencies(self.data, list(self.rose_type), self.ray_angle, list(self.categories),
+                                                   self.latitude, self.longitude, self.hemisphere)
+        interval_cols = [x for x in table.columns if " to " in x]
+        colours = self.get_colours(len(interval_cols))
+        max_freq = self.get_max_frequency(table, interval_cols)
+
+        n_cols, n_rows = self.rose_layout[0], self.rose_layout[1]
+        figure = Figure(figsize=(self.width / 100, self.height / 100), dpi=100)
+        FigureCanvasAgg(figure)
+        for i, (panel_name, panel_table) in enumerate(self.get_panels(table)):
+            if i >= n_cols * n_rows:
+                break
+            ax = figure.add_subplot(n_rows, n_cols, i + 1, projection="polar")
+            self.draw_panel(ax, panel_table, interval_cols, colours, max_freq, panel_name)
+
+        handles, labels = figure.axes[0].get_legend_handles_labels()
+        legend_loc = {"right": "center right", "left": "center left", "top": "upper center", "bottom": "lower center"}
+        figure.legend(handles[::-1], labels[::-1], loc=legend_loc.get(self.key_position, "center right"),
+                      title="(m/s)", fontsize=self.fontsize * 0.45, title_fontsize=self.fontsize * 0.5)
+        figure.text(0.5, 0.01, "Frequency of counts by wind direction (%)", ha="center", fontsize=self.fontsize * 0.5)
+        figure.subplots_adjust(left=0.05, right=0.82 if self.key_position == "right" else 0.95, top=0.92, bottom=0.08,
+                               wspace=0.35, hspace=0.35)
+        image_path = str(self.png_file_path)
+        image_format = os.path.splitext(image_path)[1][1:].lower() if is_vector_image(image_path) else "png"
+        if self.transparent_file_path is None:
+            figure.savefig(image_path, format=image_format, facecolor="white")
+        elif image_format == "png":
+            # both versions are encoded straight from the rendered pixels
+            from PIL import Image
+            figure.set_facecolor("white")
+            figure.canvas.draw()
+            pixels = np.array(figure.canvas.buffer_rgba())
+            Image.fromarray(pixels, "RGBA").save(image_path, "PNG")
+            Image.fromarray(make_pixels_transparent(pixels), "RGBA").save(str(self.transparent_file_path), "PNG")
+        else:
+            handle, local_image = tempfile.mkstemp(suffix="." + image_format)
+            os.close(handle)
+            try:
+                figure.savefig(local_image, format=image_format, transparent=True)
+                save_image_variants(local_image, image_path, self.transparent_file_path)
+            finally:
+                os.remove(local_image)
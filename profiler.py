@@ -0,0 +1,179 @@
+import csv
+import functools
+import json
+import os
+import re
+import sys
+import time
+from contextlib import contextmanager
+
+# columns of the profile reports
+report_fields = ["stage", "depth", "start_seconds", "wall_seconds", "cpu_seconds", "peak_rss_mb", "rows"]
+
+_profiler = None
+
+
+def get_peak_rss_mb():
+    """
+    Returns the peak resident memory of this process in MB - since the last reset_peak_rss where the platform allows it
+    :return: peak memory in MB, or None if it cannot be measured on this platform
+    """
+    try:
+        with open("/proc/self/status") as f:
+            return int(re.search(r"VmHWM:\s+(\d+)", f.read()).group(1)) / 1024
+    except (OSError, AttributeError):
+        pass
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+    except ImportError:
+        pass
+    try:
+        import psutil
+        return psutil.Process().memory_info().peak_wset / 1024 / 1024
+    except (ImportError, AttributeError):
+        return None
+
+
+def reset_peak_rss() -> bool:
+    """
+    Resets the peak resident memory to the current resident memory, so the peak of each stage can be measured - Linux only
+    :return: True if the peak was reset, False if the peak can only be measured over the life of the process
+    """
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+class StageProfiler:
+    """
+    Records the wall time, CPU time, peak resident memory and row count of each stage of a wind rose run. Stages can be nested,
+    e.g. the R conversion inside a wind rose render, and the peak memory of an outer stage includes its inner stages.
+    CPU time is the CPU time of this process, so stages run in rendering worker processes are only recorded as a whole
+
+    Functions:
+        stage(self, name, rows) -> dict
+            Context manager that records one stage - the yielded record's 'rows' can be set inside the stage
+        set_report_path(self, output_folder, name)
+            Sets where write_report saves the reports
+        write_report(self) -> list
+            Saves the records as JSON and CSV files
+    """
+
+    def __init__(self):
+        self.records = []
+        self.open_records = []
+        self.start = time.perf_counter()
+        self.per_stage_peak = reset_peak_rss()
+        self.report_path = None
+
+    def update_open_peaks(self):
+        peak = get_peak_rss_mb()
+        if peak is not None:
+            for record in self.open_records:
+                record["peak_rss_mb"] = max(record["peak_rss_mb"] or 0, peak)
+
+    @contextmanager
+    def stage(self, name: str, rows: int = None):
+        """
+        :param name: stage name
+        :param rows: number of rows of wind data the stage works on, if known up front
+        """
+        # the peak is reset for each stage, so the peak so far is kept by the stages it is nested in
+        self.update_open_peaks()
+        if self.per_stage_peak:
+            reset_peak_rss()
+        record = {"stage": name, "depth": len(self.open_records), "start_seconds": time.perf_counter() - self.start,
+                  "wall_seconds": None, "cpu_seconds": None, "peak_rss_mb": None, "rows": rows}
+        self.records.append(record)
+        self.open_records.append(record)
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        try:
+            yield record
+        finally:
+            record["wall_seconds"] = time.perf_counter() - wall_start
+            record["cpu_seconds"] = time.process_time() - cpu_start
+            self.update_open_peaks()
+            self.open_records.pop()
+
+    def set_report_path(self,
+                        output_folder,
+                        name: str):
+        """
+        :param output_folder: folder the wind roses are saved to
+        :param name: station name, used to name the reports
+        """
+        self.report_path = os.path.join(str(output_folder), f"{name}_profile")
+
+    def write_report(self) -> list:
+        """
+        Saves the records next to the wind roses, as <station>_profile.json and <station>_profile.csv
+        :return: list of paths to the reports, empty if no report path was set
+        """
+        if self.report_path is None:
+            return []
+        os.makedirs(os.path.dirname(self.report_path) or ".", exist_ok=True)
+        with open(self.report_path + ".json", "w") as f:
+            json.dump({"per_stage_peak_rss": self.per_stage_peak, "stages": self.records}, f, indent=2)
+        with open(self.report_path + ".csv", "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=report_fields)
+            writer.writeheader()
+            writer.writerows(self.records)
+        return [self.report_path + ".json", self.report_path + ".csv"]
+
+
+def get_profiler():
+    """
+    :return: the StageProfiler of the run being profiled in this process, or None
+    """
+    return _profiler
+
+
+@contextmanager
+def profile_stage(name: str, rows: int = None):
+    """
+    Records a stage with the active profiler - does nothing if the run is not being profiled
+    :param name: stage name
+    :param rows: number of rows of wind data the stage works on, if known up front
+    :return: the stage record, whose 'rows' can be set inside the stage
+    """
+    if _profiler is None:
+        yield {}
+        return
+    with _profiler.stage(name, rows) as record:
+        yield record
+
+
+def profile_run(func):
+    """
+    Decorator for windrose_from_data - profiles the run when it is called with profile=True and saves the report once the
+    run has finished, or failed, and prints a summary of the stages
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        global _profiler
+        if not kwargs.get("profile") or _profiler is not None:
+            return func(*args, **kwargs)
+        _profiler = StageProfiler()
+        try:
+            with _profiler.stage("total"):
+                return func(*args, **kwargs)
+        finally:
+            profiler, _profiler = _profiler, None
+            print_profile(profiler)
+            for report in profiler.write_report():
+                print(f"Profile saved to {report}")
+    return wrapper
+
+
+def print_profile(profiler: StageProfiler):
+    print("\nProfile:")
+    for record in profiler.records:
+        peak = f"{record['peak_rss_mb']:8.0f} MB" if record["peak_rss_mb"] is not None else "     n/a"
+        rows = f"{record['rows']:12,d} rows" if record["rows"] is not None else ""
+        print(f"    {'  ' * record['depth']}{record['stage']:{36 - 2 * record['depth']}s} {record['wall_seconds']:8.2f} s "
+              f"wall {record['cpu_seconds']:8.2f} s CPU {peak} {rows}")
@@ -0,0 +1,68 @@
+import time
+import rpy2.robjects as ro
+from rpy2.robjects.packages import importr
+
+# R function that renders a batch of wind roses from one data frame - each job is subset by year and rendered inside R,
+# so the station data only crosses from Python to R once (see Rpy2WindRose.create_wind_roses)
+render_batch_source = """
+function(mydata, jobs, options) {
+    years <- as.POSIXlt(mydata$date)$year + 1900
+    files <- character(0)
+    for (job in jobs) {
+        data <- if (is.na(job$year)) mydata else mydata[which(years == job$year), , drop = FALSE]
+        if (job$device == "svg") {
+            grDevices::svg(job$file, width = job$width / 72, height = job$height / 72, bg = job$bg)
+        } else if (job$device == "pdf") {
+            grDevices::pdf(job$file, width = job$width / 72, height = job$height / 72, bg = job$bg)
+        } else {
+            grDevices::png(job$file, width = job$width, height = job$height, bg = job$bg)
+        }
+        tryCatch(do.call(openair::windRose, c(list(mydata = data, type = job$type, layout = job$layout), options)),
+                 finally = grDevices::dev.off())
+        files <- c(files, job$file)
+    }
+    files
+}
+"""
+
+
+class RRuntime:
+    """
+    Holds the R packages used to generate wind roses so they are only loaded once per process
+
+    Attributes:
+        base: R 'base' package
+        grdevices: R 'grDevices' package
+        openair: R 'openair' package
+        render_batch: R function
+            Renders a list of wind rose jobs from one R data frame - see render_batch_source
+        warmup_seconds: float
+            Time taken to load the R packages
+    """
+
+    def __init__(self):
+        """
+        Loads the R packages - this is the slow 'cold start' of R. The pandas converter is not activated, as the wind data
+        is sent to R by r_transfer.wind_df_to_r
+        """
+        start = time.perf_counter()
+        self.base = importr("base")
+        self.grdevices = importr("grDevices")
+        self.openair = importr("openair")
+        self.render_batch = ro.r(render_batch_source)
+        self.warmup_seconds = time.perf_counter() - start
+
+
+_r_runtime = None
+
+
+def get_r_runtime() -> RRuntime:
+    """
+    Returns the R runtime for this process, loading the R packages on the first call only
+    :return: shared RRuntime object
+    """
+    global _r_runtime
+    if _r_runtime is None:
+        _r_runtime = RRuntime()
+        print(f"\nR runtime warm-up took {_r_runtime.warmup_seconds:.2f} s\n")
+    return _r_runtime
@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+import rpy2.rinterface as ri
+from compact import get_wd_values
+
+# R's NA_integer_
+r_na_integer = np.iinfo(np.int32).min
+
+
+def to_r_numeric(values: np.ndarray):
+    """
+    Builds an R numeric vector with a single copy of a float64 buffer - NaN values are treated as missing by openair
+    :param values: array of numbers
+    :return: R numeric vector
+    """
+    return ri.FloatSexpVector.from_memoryview(memoryview(np.ascontiguousarray(values, dtype=np.float64)))
+
+
+def to_r_posixct(dates: np.ndarray):
+    """
+    Builds an R POSIXct vector from datetime64 values of any unit. The timezone is UTC, so R sees the same clock times as
+    the naive timestamps in Python whatever the local timezone of the machine. The naive timestamps are station local times,
+    so openair's own daylight calculation would be out by the station's UTC offset - daylight types use the precomputed
+    'day_night' column instead (see Rpy2WindRose.get_type_names)
+    :param dates: array of datetime64 values
+    :return: R POSIXct vector
+    """
+    seconds = dates.astype("datetime64[s]").astype(np.int64).astype(np.float64)
+    seconds[np.isnat(dates)] = np.nan
+    r_dates = to_r_numeric(seconds)
+    r_dates.do_slot_assign("class", ri.StrSexpVector(["POSIXct", "POSIXt"]))
+    r_dates.do_slot_assign("tzone", ri.StrSexpVector(["UTC"]))
+    return r_dates
+
+
+def to_r_factor(values: pd.Categorical):
+    """
+    Builds an R factor from a pandas categorical
+    :param values: categorical values
+    :return: R factor
+    """
+    codes = values.codes.astype(np.int32) + 1
+    codes[values.codes < 0] = r_na_integer
+    r_factor = ri.IntSexpVector.from_memoryview(memoryview(codes))
+    r_factor.do_slot_assign("levels", ri.StrSexpVector([str(x) for x in values.categories]))
+    r_factor.do_slot_assign("class", ri.StrSexpVector(["factor"]))
+    return r_factor
+
+
+def wind_df_to_r(wind_df: pd.DataFrame,
+                 type_columns: list = None):
+    """
+    Builds the R data frame for openair straight from the NumPy buffers of a wind data frame, in either the standard or the
+    compact representation - each column is copied once into R memory and the Python frame is not modified
+    :param wind_df: data frame containing 'date', 'ws', 'wd' columns
+    :param type_columns: other columns openair needs, e.g. the precomputed 'day_night' column
+    :return: R data frame with only the 'date', 'ws' and 'wd' columns and the type columns
+    """
+    columns = {
+        "date": to_r_posixct(wind_df["date"].to_numpy()),
+        "ws": to_r_numeric(wind_df["ws"].to_numpy()),
+        "wd": to_r_numeric(get_wd_values(wind_df["wd"]))
+    }
+    for col in type_columns or []:
+        values = wind_df[col]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            columns[col] = to_r_factor(values.array)
+        else:
+            columns[col] = ri.StrSexpVector(values.astype(str).tolist())
+
+    # the data frame is a list of the column vectors with R's compact row names, c(NA, -n)
+    r_df = ri.ListSexpVector(list(columns.values()))
+    r_df.do_slot_assign("names", ri.StrSexpVector(list(columns)))
+    r_df.do_slot_assign("row.names", ri.IntSexpVector([r_na_integer, -len(wind_df)]))
+    r_df.do_slot_assign("class", ri.StrSexpVector(["data.frame"]))
+    return r_df
@@ -0,0 +1,178 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+import numpy as np
+import pandas as pd
+import data_cache
+
+# bump when a change to the rendering would make cached images out of date
+render_cache_version = 1
+
+# wind rose attributes that name the output rather than change the image
+output_attributes = {"png_file_path", "image_name", "station"}
+
+_render_cache = None
+
+
+def get_data_digest(data: pd.DataFrame) -> str:
+    """
+    Hashes the contents of a wind data frame - column names, dtypes and values
+    :param data: wind data frame as passed to the wind rose class
+    :return: hex digest
+    """
+    digest = hashlib.blake2b(digest_size=20)
+    digest.update(str(len(data)).encode())
+    for col in data.columns:
+        values = data[col]
+        digest.update(f"{col}|{values.dtype}".encode())
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            digest.update(json.dumps([str(x) for x in values.cat.categories]).encode())
+            values = values.cat.codes
+        array = values.to_numpy()
+        if array.dtype == object:
+            array = pd.util.hash_pandas_object(values, index=False).to_numpy()
+        digest.update(np.ascontiguousarray(array).view(np.uint8))
+    return digest.hexdigest()
+
+
+def get_render_key(data: pd.DataFrame,
+                   backend: str,
+                   attributes: dict) -> str:
+    """
+    Returns the content address of a wind rose - a hash of the data with every attribute that changes the image
+    :param data: wind data frame the rose is rendered from
+    :param backend: 'R' or 'matplotlib' rendering backend
+    :param attributes: wind rose attributes - categories, grid, ray_angle, max_frequency, rose_type, layout, size etc.
+    :return: hex digest
+    """
+    parameters = {name: value for name, value in attributes.items() if name not in output_attributes}
+    image_format = os.path.splitext(str(attributes.get("png_file_path", "")))[1].lower()
+    key = json.dumps({"version": render_cache_version, "backend": str(backend), "format": image_format,
+                      "data": get_data_digest(data), "attributes": parameters}, sort_keys=True, default=str)
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+class RenderCache:
+    """
+    Content-addressed cache of rendered wind roses, kept in the local cache folder. Each image is stored under its render key,
+    with one manifest entry per key, so an unchanged wind rose is copied from the cache instead of being rendered again
+
+    Functions:
+        fetch(self, key, png_file_path, transparent_file_path) -> bool
+            Copies a cached wind rose, and optionally its transparent version, to the output paths
+        store(self, key, png_file_path, transparent_file_path)
+            Adds a rendered wind rose, and optionally its transparent version, to the cache
+    """
+
+    def __init__(self, cache_dir: str = None):
+        """
+        :param cache_dir: folder for the cached images - defaults to 'renders' in the local cache folder
+        """
+        self.cache_dir = cache_dir or os.path.join(data_cache.local_cache_dir, "renders")
+        self.manifest_path = os.path.join(self.cache_dir, "manifest.json")
+        self.manifest = {}
+        self.manifest_mtime = None
+
+    def load_manifest(self) -> dict:
+        """
+        :return: dictionary of render key to manifest entry - re-read when another process has updated the manifest
+        """
+        try:
+            mtime = os.stat(self.manifest_path).st_mtime_ns
+        except OSError:
+            return self.manifest
+        if mtime != self.manifest_mtime:
+            try:
+                with open(self.manifest_path) as f:
+                    self.manifest = json.load(f)
+                self.manifest_mtime = mtime
+            except (OSError, ValueError):
+                pass
+        return self.manifest
+
+    def get_image_path(self, key: str, extension: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], key + extension)
+
+    def fetch(self,
+              key: str,
+              png_file_path,
+              transparent_file_path=None) -> bool:
+        """
+        :param key: render key - see get_render_key
+        :param png_file_path: output path to copy the cached wind rose to
+        :param transparent_file_path: optional output path to copy the cached transparent version to
+        :return: True if the wind rose, and the transparent version if requested, were found in the cache and copied
+        """
+        entry = self.load_manifest().get(key)
+        if entry is None or (transparent_file_path is not None and "transparent_file" not in entry):
+            return False
+        copies = [(entry["file"], entry["bytes"], png_file_path)]
+        if transparent_file_path is not None:
+            copies.append((entry["transparent_file"], entry["transparent_bytes"], transparent_file_path))
+        try:
+            for file, size, output_path in copies:
+                image_path = os.path.join(self.cache_dir, file)
+                if os.path.getsize(image_path) != size:
+                    return False
+                # copied rather than linked, so a later render to the output path cannot change the cached image
+                shutil.copyfile(image_path, str(output_path))
+        except OSError:
+            return False
+        return True
+
+    def add_image(self,
+                  image_path: str,
+                  key: str) -> (str, int):
+        """
+        Copies an image into the cache
+        :return: path of the cached image relative to the cache folder, size in bytes
+        """
+        cached_path = self.get_image_path(key, os.path.splitext(str(image_path))[1])
+        os.makedirs(os.path.dirname(cached_path), exist_ok=True)
+        temp_path = cached_path + f".{os.getpid()}.tmp"
+        shutil.copyfile(str(image_path), temp_path)
+        os.replace(temp_path, cached_path)
+        return os.path.relpath(cached_path, self.cache_dir), os.path.getsize(cached_path)
+
+    def store(self,
+              key: str,
+              png_file_path,
+              transparent_file_path=None):
+        """
+        Copies a rendered wind rose into the cache and records it in the manifest
+        :param key: render key - see get_render_key
+        :param png_file_path: path to the rendered wind rose
+        :param transparent_file_path: optional path to its transparent version
+        """
+        try:
+            file, size = self.add_image(png_file_path, key)
+            # merged with the latest manifest, as other processes may be adding to it
+            manifest = dict(self.load_manifest())
+            entry = dict(manifest.get(key, {}), file=file, bytes=size, source=os.path.basename(str(png_file_path)),
+                         created=time.strftime("%Y-%m-%dT%H:%M:%S"))
+            if transparent_file_path is not None:
+                entry["transparent_file"], entry["transparent_bytes"] = self.add_image(transparent_file_path,
+                                                                                       key + "_transparent")
+            manifest[key] = entry
+            temp_path = self.manifest_path + f".{os.getpid()}.tmp"
+            with open(temp_path, "w") as f:
+                json.dump(manifest, f)
+            os.replace(temp_path, self.manifest_path)
+            self.manifest = manifest
+            self.manifest_mtime = os.stat(self.manifest_path).st_mtime_ns
+        except OSError:
+            print("\nUnable to write to the render cache - continuing without caching\n")
+
+
+def get_render_cache() -> RenderCache:
+    """
+    Returns the render cache for this process, for the current local cache folder
+    :return: shared RenderCache object
+    """
+    global _render_cache
+    cache_dir = os.path.join(data_cache.local_cache_dir, "renders")
+    if _render_cache is None or _render_cache.cache_dir != cache_dir:
+        _render_cache = RenderCache(cache_dir)
+    return _render_cache
@@ -0,0 +1,188 @@
+import numpy as np
+import pandas as pd
+from __params__ import rename_bom_df_cols, cols_for_r
+from data_cache import load_cached_wind_df, save_cached_wind_df
+from timestamp_parsing import get_source_format, parse_timestamps, sample_rows
+from checks import raise_error
+from compact import compact_wind_df, get_wd_values
+
+# running sums kept for each interval - scalar wind speed sum and count, wind vector sums and count
+n_sums = 5
+
+
+class WindResampler:
+    """
+    Streaming vector average of sub-hourly wind data into fixed intervals, e.g. 1-minute data into hourly values
+    Chunks of data are added in date order and each completed interval is returned as soon as a later interval starts, so
+    only the running sums of the last, possibly partial, interval are carried between chunks
+    Wind speed is the scalar mean and wind direction is the direction of the mean wind vector, as in openair's timeAverage.
+    Intervals are labelled by their start time
+
+    Functions:
+        add(self, chunk) -> pd.DataFrame
+            Adds a chunk of data and returns the intervals completed by it
+        flush(self) -> pd.DataFrame
+            Returns the last interval once all chunks have been added
+    """
+
+    def __init__(self, interval: str = "1h"):
+        """
+        :param interval: pandas time interval to average over, e.g. '1h' or '10min'
+        """
+        try:
+            self.interval_seconds = int(pd.Timedelta(interval).total_seconds())
+        except ValueError:
+            self.interval_seconds = 0
+        if self.interval_seconds <= 0:
+            raise_error(f"Averaging interval {interval} is not a whole number of seconds - e.g. 1h or 10min", ValueError)
+        self.interval = interval
+        self.carry_key = None
+        self.carry_sums = None
+
+    def get_interval_sums(self, chunk: pd.DataFrame) -> (np.ndarray, np.ndarray):
+        """
+        Sums each interval in a chunk
+        :param chunk: data frame containing 'ws', 'wd', 'date' columns, sorted by date
+        :return: array of interval keys (start times in interval units since the epoch), array of sums with one row per key
+        """
+        dates = chunk["date"].to_numpy(dtype="datetime64[s]")
+        valid_date = ~np.isnat(dates)
+        ws = chunk["ws"].to_numpy(dtype=np.float64)[valid_date]
+        wd = get_wd_values(chunk["wd"])[valid_date]
+        keys = dates[valid_date].astype(np.int64) // self.interval_seconds
+        unique_keys, index = np.unique(keys, return_inverse=True)
+
+        valid_ws = ~np.isnan(ws)
+        valid_vector = valid_ws & ~np.isnan(wd)
+        radians = np.radians(np.where(valid_vector, wd, 0))
+        ws_vector = np.where(valid_vector, ws, 0)
+        sums = np.empty((len(unique_keys), n_sums))
+        sums[:, 0] = np.bincount(index, weights=np.where(valid_ws, ws, 0), minlength=len(unique_keys))
+        sums[:, 1] = np.bincount(index, weights=valid_ws, minlength=len(unique_keys))
+        sums[:, 2] = np.bincount(index, weights=ws_vector * np.sin(radians), minlength=len(unique_keys))
+        sums[:, 3] = np.bincount(index, weights=ws_vector * np.cos(radians), minlength=len(unique_keys))
+        sums[:, 4] = np.bincount(index, weights=valid_vector, minlength=len(unique_keys))
+        return unique_keys, sums
+
+    def to_wind_df(self,
+                   keys: np.ndarray,
+                   sums: np.ndarray) -> pd.DataFrame:
+        """
+        Converts interval sums to averaged wind data
+        :return: DataFrame containing 'ws', 'wd', 'date' columns, one row per interval
+        """
+        with np.errstate(invalid="ignore", divide="ignore"):
+            ws = sums[:, 0] / sums[:, 1]
+            wd = np.degrees(np.arctan2(sums[:, 2], sums[:, 3]))
+        wd = np.where(wd <= 0, wd + 360, wd)
+        wd[sums[:, 4] == 0] = np.nan
+        dates = (keys * self.interval_seconds).astype("datetime64[s]").astype("datetime64[ns]")
+        return pd.DataFrame({"ws": ws, "wd": wd, "date": dates})
+
+    def add(self, chunk: pd.DataFrame) -> pd.DataFrame:
+        """
+        Adds a chunk of data - chunks must be added in date order
+        :param chunk: data frame containing 'ws', 'wd', 'date' columns, sorted by date
+        :raise: ValueError if the chunk starts before the last interval of the previous chunk
+        :return: averaged data for the intervals completed by this chunk
+        """
+        keys, sums = self.get_interval_sums(chunk)
+        if len(keys) == 0:
+            return self.to_wind_df(keys, sums)
+        if self.carry_key is not None and keys[0] < self.carry_key:
+            # the earlier intervals have already been returned, so they would be out of order or returned twice
+            start, last = [np.datetime64(int(x) * self.interval_seconds, "s") for x in (keys[0], self.carry_key)]
+            raise_error(f"Wind data is not in date order - a chunk starting in the interval at {start} follows data up "
+                        f"to the interval at {last}", ValueError)
+        if self.carry_key is not None:
+            if keys[0] == self.carry_key:
+                # the interval left open by the last chunk continues into this one
+                sums[0] += self.carry_sums
+            else:
+                keys = np.insert(keys, 0, self.carry_key)
+                sums = np.vstack([self.carry_sums, sums])
+        self.carry_key, self.carry_sums = keys[-1], sums[-1].copy()
+        return self.to_wind_df(keys[:-1], sums[:-1])
+
+    def flush(self) -> pd.DataFrame:
+        """
+        :return: averaged data for the last interval, once all chunks have been added
+        """
+        if self.carry_key is None:
+            return self.to_wind_df(np.empty(0, dtype=np.int64), np.empty((0, n_sums)))
+        keys, sums = np.array([self.carry_key]), self.carry_sums[None, :]
+        self.carry_key, self.carry_sums = None, None
+        return self.to_wind_df(keys, sums)
+
+
+def iter_source_chunks(data_source: str,
+                       data_file: str,
+                       chunk_size: int = 500000):
+    """
+    Reads the wind columns of a station csv file in chunks, in the layout returned by import_data
+    :param data_source: Database identifier - BOM or OEH etc.
+    :param data_file: path to the station's csv data file
+    :param chunk_size: number of rows to read at a time
+    :return: generator of data frames containing 'ws', 'wd', 'date' columns
+    """
+    source_cols = {v: k for k, v in rename_bom_df_cols.items()} if data_source == 'BOM' else \
+        {'Date': 'Date', 'WS (m/s)': 'WS (m/s)', 'WD (deg)': 'WD (deg)'}
+    date_col = source_cols['Date']
+    samples = pd.read_csv(data_file, usecols=[date_col], dtype=str, nrows=sample_rows)[date_col]
+    timestamp_format = get_source_format(data_source, samples)
+    reader = pd.read_csv(data_file, usecols=list(source_cols.values()), dtype={date_col: str}, chunksize=chunk_size)
+    for chunk in reader:
+        ws = chunk[source_cols['WS (m/s)']].to_numpy(dtype=np.float64)
+        if data_source == 'BOM':
+            # convert from km/h to m/s
+            ws = ws / 3.6
+        yield pd.DataFrame({cols_for_r['WS (m/s)']: ws,
+                            cols_for_r['WD (deg)']: chunk[source_cols['WD (deg)']].to_numpy(dtype=np.float64),
+                            cols_for_r['Date']: parse_timestamps(chunk[date_col], timestamp_format).to_numpy()})
+
+
+def resample_chunks(chunks,
+                    interval: str = "1h"):
+    """
+    Vector averages a stream of wind data chunks into fixed intervals
+    :param chunks: iterable of data frames containing 'ws', 'wd', 'date' columns, in date order
+    :param interval: pandas time interval to average over
+    :return: generator of averaged data frames
+    """
+    resampler = WindResampler(interval)
+    for chunk in chunks:
+        averaged = resampler.add(chunk)
+        if len(averaged):
+            yield averaged
+    yield resampler.flush()
+
+
+def import_data_resampled(data_source: str,
+                          data_file: str,
+                          interval: str = "1h",
+                          chunk_size: int = 500000,
+                          use_cache: bool = True,
+                          compact: bool = False) -> pd.DataFrame:
+    """
+    Imports sub-hourly data from one of AECOM's databases, averaged into intervals while it is read, so memory use depends
+    on the length of the averaged record rather than the size of the file
+    The averaged data is kept in the local data cache, separately for each interval
+    :param data_source: Database identifier
+    :param data_file: path to file
+    :param interval: pandas time interval to average over, e.g. '1h'
+    :param chunk_size: number of rows to read at a time
+    :param use_cache: read from and write to the local station data cache
+    :param compact: return the data in the compact representation - see compact.py
+    :return: DataFrame containing 'ws', 'wd', 'date' columns
+    """
+    cache_source = f"{data_source}_{interval}"
+    wind_df = load_cached_wind_df(cache_source, data_file) if use_cache else None
+    if wind_df is None:
+        parts = list(resample_chunks(iter_source_chunks(data_source, data_file, chunk_size), interval))
+        wind_df = pd.concat(parts, ignore_index=True)
+        if use_cache:
+            try:
+                save_cached_wind_df(wind_df, cache_source, data_file)
+            except OSError:
+                print("\nUnable to write to the local data cache - continuing without caching\n")
+    return compact_wind_df(wind_df) if compact else wind_df
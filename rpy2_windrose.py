@@ -1,8 +1,14 @@
+import os
+import tempfile
+import rpy2.rinterface as ri
 import rpy2.robjects as ro
-from rpy2.robjects.packages import importr
-from rpy2.robjects import pandas2ri
-from rpy2.robjects.conversion import localconverter
 from rpy2.rinterface_lib.callbacks import logger
+from r_runtime import get_r_runtime
+from r_transfer import wind_df_to_r
+from daylight import daylight_column
+from profiler import profile_stage
+from functions import is_vector_image, save_image_variants
+from checks import raise_error
 
 
 class Rpy2WindRose:
@@ -13,7 +19,13 @@ class Rpy2WindRose:
     Attributes:
         data: pandas.DataFrame
             A dataframe containing three columns 'date', 'ws' and 'wd' - these columns are used to generate an R dataframe via RPY2
+            A 'day_night' column (see daylight.add_daylight_column) is used in place of openair's daylight calculation, and is
+            required for daylight rose types
             No default, must be passed to WindRose() function
+        r_data: R data.frame
+            The R copy of the columns of 'data' that openair needs, built by prepare_r (see r_transfer.py) - 'data' itself
+            is left unchanged
+            Default = None
         latitude: float
             The latitude of the station - used to partition daytime and night-time hours in the wind roses
             Openair arg = 'lat'
@@ -53,8 +65,12 @@ class Rpy2WindRose:
             Used to append to output file name to denote a specfic annual wind rose when outputting a specified year
             Default = ''
         png_file_path: pathlib Path object or string
-            The path and file name for where to save the generated wind rose figure
+            The path and file name for where to save the generated wind rose figure - a .svg or .pdf extension saves the
+            figure in that format
             Default = 'wind_rose.png'
+        transparent_file_path: pathlib Path object or string
+            Optional path to also save a transparent version of the figure to, from the same render
+            Default = None
         width: int
             The specified width of the output wind rose in pixels
             Default = 1000
@@ -96,18 +112,26 @@ class Rpy2WindRose:
             Suppress warnings from R in console
             Default = True
         base: R 'base' package
-             The 'base' package is imported on initialisation of an Rpy2WindRose object
+             The 'base' package is shared by all Rpy2WindRose objects via the process-wide R runtime (see r_runtime.py)
         grdevices: R 'grDevices' package
-            The 'grDevices' package is imported on initialisation of an Rpy2WindRose object
+            The 'grDevices' package is shared by all Rpy2WindRose objects via the process-wide R runtime
         openair: R 'openair' package
-            The 'openair' package is imported on initialisation of an Rpy2WindRose object
+            The 'openair' package is shared by all Rpy2WindRose objects via the process-wide R runtime
             Note that the openair package must be installed for the user's instance of R
+        render_batch: R function
+            The batch rendering loop, shared by all Rpy2WindRose objects via the process-wide R runtime
 
     Functions:
-        prepare_r(self) -> None
+        get_type_names(self, rose_type) -> list
+            Returns the openair types for a rose type, using the precomputed daylight column for daylight types
+        prepare_r(self, type_names) -> None
             Import RPY2 packages, converts class variables to R-style and opens and returns R objects that are used for generating the wind roses
+        open_device(self, file_path, background) -> None
+            Opens an R graphics device for the image format of the file
         create_wind_rose(self) -> None
             Generates the wind rose  and saves it as a PNG file to the specified path location in 'self.png_file_path'
+        create_wind_roses(self, jobs) -> list
+            Generates a batch of wind roses of different types, layouts and years with one transfer of the data to R
     """
 
     def __init__(self, data):
@@ -118,6 +142,7 @@ class Rpy2WindRose:
         __version__ = "1.0.0"
         
         self.data = data
+        self.r_data = None
         self.latitude = -34
         self.longitude = 151
         self.station = 'station'
@@ -129,6 +154,7 @@ class Rpy2WindRose:
         self.rose_layout = [1,2]
         self.year_string = ""
         self.png_file_path = "wind_rose.png"
+        self.transparent_file_path = None
         self.image_name = ""
         self.width = 1000
         self.height = 1000
@@ -141,14 +167,34 @@ class Rpy2WindRose:
         self.border = "black"
         self.seg = 0.6
         self.suppress_r_warnings = True
-        self.base = importr("base")
-        self.grdevices = importr("grDevices")
-        self.openair = importr("openair")
+        # profiled as a stage - the full R warm-up for the first object in a process, close to zero after that
+        with profile_stage("R setup"):
+            r_runtime = get_r_runtime()
+        self.base = r_runtime.base
+        self.grdevices = r_runtime.grdevices
+        self.openair = r_runtime.openair
+        self.render_batch = r_runtime.render_batch
 
-    def prepare_r(self):
+    def get_type_names(self, rose_type: list = None) -> list:
+        """
+        :param rose_type: rose type to get the openair types of - defaults to self.rose_type
+        :raise: ValueError for a daylight type when 'self.data' has no 'day_night' column
+        :return: list of openair types - the precomputed daylight classification is used rather than openair's own solar
+                 calculation, which would be out by the station's UTC offset as the dates are sent to R as UTC (see
+                 r_transfer.to_r_posixct)
+        """
+        rose_type = rose_type or self.rose_type
+        if "daylight" in rose_type and daylight_column not in self.data.columns:
+            raise_error(f"Daylight wind roses need the '{daylight_column}' column - see daylight.add_daylight_column",
+                        ValueError)
+        return [daylight_column if x == "daylight" else x for x in rose_type]
+
+    def prepare_r(self, type_names: list = None):
         """
         Converts class variables to R-style and opens and returns R objects that are used for generating the wind roses
-        Pandas dataframe is converted to R dataframe
+        The columns of the pandas dataframe that openair needs are copied to an R dataframe in 'self.r_data'
+        :param type_names: openair types of every wind rose to be rendered from the R dataframe - defaults to the types
+                           of self.rose_type
         :return: three R packages - openair, grdevices and base
         """
         if self.suppress_r_warnings:
@@ -161,42 +207,138 @@ class Rpy2WindRose:
         if self.max_frequency == "NULL":
             self.max_frequency = ro.NULL
 
-        pandas2ri.activate()
+        type_columns = [x for x in dict.fromkeys(type_names or self.get_type_names()) if x in self.data.columns]
+        with profile_stage("pandas to R", len(self.data)):
+            self.r_data = wind_df_to_r(self.data, type_columns)
 
-        with localconverter(ro.default_converter + pandas2ri.converter):
-            self.data = ro.conversion.py2rpy(self.data)
+    def open_device(self,
+                    file_path: str,
+                    background: str):
+        """
+        Opens an R graphics device for the image format of the file - PNG unless the file has a .svg or .pdf extension
+        :param file_path: path to the image file
+        :param background: background colour, e.g. 'white' or 'transparent'
+        """
+        if file_path.lower().endswith(".svg"):
+            self.grdevices.svg(file=file_path, width=self.width / 72, height=self.height / 72, bg=background)
+        elif file_path.lower().endswith(".pdf"):
+            self.grdevices.pdf(file=file_path, width=self.width / 72, height=self.height / 72, bg=background)
+        else:
+            self.grdevices.png(file=file_path, width=self.width, height=self.height, bg=background)
 
     def create_wind_rose(self):
         """
         This function generates the wind rose and saves it as a PNG file to path specified in self.png_file_path
+        With a transparent_file_path, openair renders once to a local file that both versions are saved from
         """
 
-        self.prepare_r()
+        type_names = self.get_type_names()
+
+        with profile_stage("prepare R"):
+            self.prepare_r()
 
-        if len(self.rose_type) == 1:
-            r_type = self.base.c(self.rose_type[0])
+        if len(type_names) == 1:
+            r_type = self.base.c(type_names[0])
         else:
-            r_type = self.base.c(self.rose_type[0], self.rose_type[1])
-
-        self.grdevices.png(file=str(self.png_file_path), width=self.width, height=self.height)
-
-        self.openair.windRose(mydata=self.data,
-                              type=r_type,
-                              hemisphere=self.hemisphere,
-                              latitude=self.latitude,
-                              longitude=self.longitude,
-                              layout=self.base.c(self.rose_layout[0], self.rose_layout[1]),
-                              border=self.border,
-                              angle=self.ray_angle,
-                              cols=self.colours,
-                              breaks=self.categories,
-                              paddle=str(self.paddle),
-                              offset=self.offset,
-                              key_position=self.key_position,
-                              fontsize=self.fontsize,
-                              grid_line=self.grid,
-                              max_freq=self.max_frequency,
-                              seg=self.seg
-                              )
-
-        self.grdevices.dev_off()
+            r_type = self.base.c(type_names[0], type_names[1])
+
+        image_path = str(self.png_file_path)
+        local_image = None
+        if self.transparent_file_path is not None:
+            handle, local_image = tempfile.mkstemp(suffix=os.path.splitext(image_path)[1])
+            os.close(handle)
+            image_path = local_image
+        background = "transparent" if local_image is not None and is_vector_image(image_path) else "white"
+
+        with profile_stage("openair windRose"):
+            self.open_device(image_path, background)
+
+            self.openair.windRose(mydata=self.r_data,
+                                  type=r_type,
+                                  hemisphere=self.hemisphere,
+                                  latitude=self.latitude,
+                                  longitude=self.longitude,
+                                  layout=self.base.c(self.rose_layout[0], self.rose_layout[1]),
+                                  border=self.border,
+                                  angle=self.ray_angle,
+                                  cols=self.colours,
+                                  breaks=self.categories,
+                                  paddle=str(self.paddle),
+                                  offset=self.offset,
+                                  key_position=self.key_position,
+                                  fontsize=self.fontsize,
+                                  grid_line=self.grid,
+                                  max_freq=self.max_frequency,
+                                  seg=self.seg
+                                  )
+
+            self.grdevices.dev_off()
+
+        if local_image is not None:
+            try:
+                with profile_stage("save image variants"):
+                    save_image_variants(local_image, self.png_file_path, self.transparent_file_path)
+            finally:
+                os.remove(local_image)
+
+    def create_wind_roses(self, jobs: list) -> list:
+        """
+        Generates a batch of wind roses from 'self.data' with a single round trip to R - the data is sent to R once and
+        each wind rose is subset by year and rendered inside R by the runtime's render_batch function
+        The attributes shared by every wind rose (categories, grid, ray angle, colours etc.) are taken from this object
+        :param jobs: list of dictionaries with 'rose_type', 'rose_layout', 'width', 'height', 'png_file_path', optional
+                     'transparent_file_path' and 'year' keys - 'year' is None for a wind rose of all the data
+        :return: list of paths to the generated wind roses, in job order
+        """
+        with profile_stage("prepare R"):
+            self.prepare_r([x for job in jobs for x in self.get_type_names(job["rose_type"])])
+
+        options = ro.vectors.ListVector({
+            "hemisphere": self.hemisphere,
+            "latitude": self.latitude,
+            "longitude": self.longitude,
+            "border": self.border,
+            "angle": self.ray_angle,
+            "cols": self.colours,
+            "breaks": self.categories,
+            "paddle": str(self.paddle),
+            "offset": self.offset,
+            "key.position": self.key_position,
+            "fontsize": self.fontsize,
+            "grid.line": self.grid,
+            "max.freq": self.max_frequency,
+            "seg": self.seg
+        })
+
+        r_jobs = []
+        local_images = {}
+        for i, job in enumerate(jobs):
+            image_path = str(job["png_file_path"])
+            background = "white"
+            if job.get("transparent_file_path") is not None:
+                handle, image_path = tempfile.mkstemp(suffix=os.path.splitext(image_path)[1])
+                os.close(handle)
+                local_images[i] = image_path
+                background = "transparent" if is_vector_image(image_path) else "white"
+            r_jobs.append(ro.vectors.ListVector({
+                "file": image_path,
+                "device": os.path.splitext(image_path)[1].lower().lstrip("."),
+                "bg": background,
+                "width": int(job["width"]),
+                "height": int(job["height"]),
+                "year": ro.NA_Integer if job.get("year") is None else int(job["year"]),
+                "type": ro.StrVector(self.get_type_names(job["rose_type"])),
+                "layout": ro.IntVector([int(x) for x in job["rose_layout"]])
+            }))
+
+        try:
+            with profile_stage(f"openair windRose batch of {len(jobs)}", len(self.data)):
+                self.render_batch(self.r_data, ri.ListSexpVector(r_jobs), options)
+            with profile_stage("save image variants"):
+                for i, local_image in local_images.items():
+                    save_image_variants(local_image, jobs[i]["png_file_path"], jobs[i]["transparent_file_path"])
+        finally:
+            for local_image in local_images.values():
+                if os.path.exists(local_image):
+                    os.remove(local_image)
+        return [job["png_file_path"] for job in jobs]
@@ -0,0 +1,469 @@
+import argparse
+import io
+import json
+import os
+import queue
+import tempfile
+import threading
+import traceback
+import zipfile
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+from __params__ import data_source_dict, default_hours, default_ws_cats, default_grid, default_ray, default_calms, \
+    default_image_format
+from checks import raise_error
+
+# content types of the wind rose image formats
+image_content_types = {".png": "image/png", ".svg": "image/svg+xml", ".pdf": "application/pdf"}
+
+# GUI check boxes that can be used in a request in place of 'rose_types' and 'rose_layouts'
+rose_type_flags = ["all_hours", "seasons", "seasons_daylight", "monthly", "annual_daylight"]
+
+# windrose_from_data parameters that a request can set, and the types each accepts - anything else, e.g. the output folder,
+# render workers or profiling, is set by the service
+number_types = (int, float)
+request_parameters = {
+    "data_source": str,
+    "station_id": str,
+    "lat": number_types,
+    "long": number_types,
+    "data_period": (str, type(None)),
+    "selected_hours": str,
+    "ws_categories": str,
+    "grid_spacing": number_types,
+    "ray_angle": number_types,
+    "calms_threshold": number_types,
+    "max_freq": number_types + (type(None),),
+    "file_prefix": (str, type(None)),
+    "rose_types": list,
+    "rose_layouts": list,
+    "annual": bool,
+    "save_transparent": bool,
+    "image_format": str,
+    "backend": str,
+    **{x: bool for x in rose_type_flags}
+}
+
+# rendering backends a request can select
+backends = ["R", "matplotlib"]
+
+
+def check_request_parameters(params: dict):
+    """
+    Checks that a request only sets the documented wind rose parameters, with values of the right type
+    :param params: request parameters
+    :raise: ValueError for an unknown parameter or a value of the wrong type
+    """
+    if not isinstance(params, dict):
+        raise_error("The request must be a JSON object of windrose_from_data parameters", ValueError)
+    unknown = sorted(set(params).difference(request_parameters))
+    if unknown:
+        raise_error(f"Unknown request parameters {', '.join(unknown)} - select from {list(request_parameters)}",
+                    ValueError)
+    for name, value in params.items():
+        expected = request_parameters[name]
+        # JSON true/false are not numbers
+        if not isinstance(value, expected) or (isinstance(value, bool) and expected is not bool):
+            raise_error(f"The '{name}' parameter has the wrong type {type(value).__name__}", ValueError)
+    for name in ["station_id", "file_prefix"]:
+        if params.get(name) and ("/" in params[name] or "\\" in params[name] or ".." in params[name]):
+            raise_error(f"The '{name}' parameter must not contain a path", ValueError)
+    if "rose_types" in params and not all(isinstance(x, list) and x and all(isinstance(y, str) for y in x)
+                                          for x in params["rose_types"]):
+        raise_error("'rose_types' must be a list of lists of openair types, e.g. [[\"season\"]]", ValueError)
+    if "rose_layouts" in params and not all(isinstance(x, list) and len(x) == 2
+                                            and all(isinstance(y, int) and not isinstance(y, bool) for y in x)
+                                            for x in params["rose_layouts"]):
+        raise_error("'rose_layouts' must be a list of [rows, columns] layouts, e.g. [[2, 2]]", ValueError)
+    if "rose_types" in params and len(params["rose_types"]) != len(params.get("rose_layouts", [])):
+        raise_error("Requests that give 'rose_types' must give a layout for each in 'rose_layouts'", ValueError)
+    if params.get("backend", backends[0]) not in backends:
+        raise_error(f"Unknown backend {params['backend']} - select from {backends}", ValueError)
+    if "." + params.get("image_format", "png") not in image_content_types:
+        raise_error(f"Unknown image format {params['image_format']} - select from "
+                    f"{[x[1:] for x in image_content_types]}", ValueError)
+
+
+def get_request_options(params: dict,
+                        data_locations: dict,
+                        backend: str = "R") -> dict:
+    """
+    Builds the keyword arguments for windrose_from_data from the JSON parameters of a request for a database station. The
+    parameters are the wind rose parameters of windrose_from_data in request_parameters, and options that are left out take
+    the GUI defaults, apart from 'lat' and 'long', which are left out for the service to look up. Rose types can be given as 'rose_types' and 'rose_layouts' or with the GUI check boxes, e.g.
+    "seasons": true - the all hours wind rose if neither is given
+    :param params: request parameters
+    :param data_locations: dictionary of database identifier to directory path
+    :param backend: rendering backend for requests that do not set one
+    :raise: ValueError for parameters that are unknown, of the wrong type or set by the service
+    :return: keyword arguments for windrose_from_data, excluding the output folder
+    """
+    from functions import get_rose_types_and_layouts
+    check_request_parameters(params)
+
+    params = dict(params)
+    flags = {x: bool(params.pop(x, False)) for x in rose_type_flags}
+    options = dict(data_period=None, selected_hours=default_hours, ws_categories=default_ws_cats,
+                   grid_spacing=default_grid, ray_angle=default_ray, calms_threshold=default_calms, max_freq=None,
+                   file_prefix=None, annual=False, save_transparent=False, image_format=default_image_format,
+                   backend=backend)
+    if "rose_types" not in params:
+        if not any(flags.values()):
+            flags["all_hours"] = True
+        options["rose_types"], options["rose_layouts"] = get_rose_types_and_layouts(**flags)
+    options.update(params)
+
+    data_source = options.get("data_source")
+    if data_source not in data_locations:
+        raise_error(f"Unknown data source {data_source} - select from {list(data_locations)}", ValueError)
+    if not options.get("station_id"):
+        raise_error(f"Requests for the {data_source} database must give a 'station_id'", ValueError)
+    options["database_source"] = True
+    options["data_location"] = data_locations[data_source]
+    return options
+
+
+class RequestCoalescer:
+    """
+    Runs identical requests that arrive while the first of them is still running only once - the later requests wait for
+    and share the result of the first
+
+    Functions:
+        run(self, key, func) -> object
+            Returns the result of func, or of the call already running for the same key
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.running = {}
+        self.coalesced = 0
+
+    def run(self, key: str, func):
+        """
+        :param key: identifies identical requests
+        :param func: function without arguments that produces the result
+        :return: result of func - an exception raised by func is raised for every request sharing the call
+        """
+        with self.lock:
+            future = self.running.get(key)
+            first = future is None
+            if first:
+                future = self.running[key] = Future()
+            else:
+                self.coalesced += 1
+        if not first:
+            return future.result()
+        try:
+            result = func()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self.lock:
+                del self.running[key]
+        future.set_result(result)
+        return result
+
+
+class WindRoseService:
+    """
+    Generates wind roses and frequency tables on request in one long-running process. The R runtime, the station catalogue
+    and the parsed station data (in the data cache's memory cache) stay warm between requests, so a one-off wind rose does
+    not pay for starting Python, R and openair or for re-reading the station file
+    Runs of the wind rose pipeline are made one at a time on a dedicated render thread, which starts the R runtime itself,
+    as R and the profiler are not thread safe and R must only be used from the thread it was started on. The request
+    threads wait on the result of their run, and identical requests that arrive together are coalesced into one run
+
+    Functions:
+        warm_up(self)
+            Starts the R runtime on the render thread and indexes the databases that can be reached
+        submit(self, func) -> Future
+            Queues a function to run on the render thread
+        close(self)
+            Stops the render thread once the queued runs have finished
+        run_request(self, params, stats_only) -> dict
+            Runs windrose_from_data for a request and returns the output files
+        render(self, params) -> (bytes, str)
+            Wind rose image for a request, or a zip file of the images when the request produces several
+        tables(self, params) -> dict
+            Frequency tables for a request
+        list_stations(self, data_source, prefix) -> list
+            Station names in a database, optionally starting with a prefix
+    """
+
+    def __init__(self,
+                 data_locations: dict = None,
+                 backend: str = "R",
+                 memory_stations: int = 8):
+        """
+        :param data_locations: dictionary of database identifier to directory path, in place of the paths in __params__
+        :param backend: rendering backend for requests that do not set one - 'R' or 'matplotlib'
+        :param memory_stations: number of parsed stations to keep in memory
+        """
+        self.data_locations = dict(data_source_dict, **(data_locations or {}))
+        self.backend = backend
+        self.coalescer = RequestCoalescer()
+        self.runs = 0
+        self.render_queue = queue.Queue()
+        self.render_thread = threading.Thread(target=self.render_loop, name="render", daemon=True)
+        self.render_thread.start()
+        import data_cache
+        data_cache.set_memory_cache_size(memory_stations)
+
+    def render_loop(self):
+        """
+        Runs on the render thread - starts the R runtime, then runs the queued functions in order until close is called
+        """
+        from main_wind_rose_function import init_render_worker
+        init_render_worker(self.backend == "R")
+        while True:
+            func, future = self.render_queue.get()
+            if func is None:
+                break
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(func())
+            except BaseException as e:
+                future.set_exception(e)
+
+    def submit(self, func) -> Future:
+        """
+        :param func: function without arguments to run on the render thread
+        :return: future of its result
+        """
+        future = Future()
+        self.render_queue.put((func, future))
+        return future
+
+    def close(self):
+        self.render_queue.put((None, None))
+        self.render_thread.join()
+
+    def warm_up(self):
+        from station_catalogue import get_station_catalogue
+        # the render thread starts R before it runs anything it is given, so this waits for R to be ready
+        warm_r = self.submit(lambda: None)
+        for data_source, location in self.data_locations.items():
+            if os.path.isdir(location):
+                get_station_catalogue().refresh(data_source, location)
+        warm_r.result()
+
+    def get_station_location(self, options: dict):
+        """
+        Uses the station's coordinates from the database station list when a request does not give them
+        :raise: ValueError if the station list has no coordinates for the station, and the errors of get_data_file if the
+                station does not exist
+        """
+        from station_catalogue import get_station_catalogue
+        catalogue = get_station_catalogue()
+        station = catalogue.get_station(options["data_source"], options["data_location"], options["station_id"])
+        if station is None:
+            # raises the same error as a run for a station that does not exist
+            catalogue.get_data_file(options["data_source"], options["data_location"], options["station_id"])
+        if "latitude" not in station:
+            raise_error(f"The {options['data_source']} station list has no coordinates for station "
+                        f"{options['station_id']} - give its 'lat' and 'long' in the request", ValueError)
+        options.setdefault("lat", station["latitude"])
+        options.setdefault("long", station["longitude"])
+
+    def run_request(self,
+                    params: dict,
+                    stats_only: bool) -> dict:
+        """
+        :param params: request parameters - see get_request_options
+        :param stats_only: only produce the frequency tables
+        :return: dictionary of output file name to file contents, in output order
+        """
+        options = get_request_options(params, self.data_locations, self.backend)
+        options["stats_only"] = stats_only
+        if not {"lat", "long"}.issubset(options):
+            self.get_station_location(options)
+        key = json.dumps(options, sort_keys=True, default=str)
+        return self.coalescer.run(key, lambda: self.submit(lambda: self.run_windrose(options)).result())
+
+    def run_windrose(self, options: dict) -> dict:
+        """
+        Runs on the render thread
+        :param options: keyword arguments for windrose_from_data, see get_request_options
+        :return: dictionary of output file name to file contents, in output order
+        """
+        from main_wind_rose_function import windrose_from_data
+        with tempfile.TemporaryDirectory() as output_folder:
+            self.runs += 1
+            outputs = windrose_from_data(output_folder=output_folder, **options) or []
+            files = {}
+            for output in outputs:
+                with open(output, "rb") as f:
+                    files[os.path.basename(output)] = f.read()
+        return files
+
+    def render(self, params: dict) -> (bytes, str):
+        """
+        :param params: request parameters - see get_request_options
+        :return: image file contents and content type - a zip file of the images if the request produces more than one,
+                 e.g. annual or transparent wind roses
+        """
+        images = {name: data for name, data in self.run_request(params, False).items()
+                  if os.path.splitext(name)[1] in image_content_types}
+        if len(images) == 1:
+            name, data = next(iter(images.items()))
+            return data, image_content_types[os.path.splitext(name)[1]]
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, "w") as archive:
+            for name, data in images.items():
+                archive.writestr(name, data)
+        return buffer.getvalue(), "application/zip"
+
+    def tables(self, params: dict) -> dict:
+        """
+        :param params: request parameters - see get_request_options
+        :return: dictionary of wind rose name to its frequency table records
+        """
+        suffix = "_frequencies.json"
+        return {name[:-len(suffix)]: json.loads(data) for name, data in self.run_request(params, True).items()
+                if name.endswith(suffix)}
+
+    def list_stations(self,
+                      data_source: str,
+                      prefix: str = None) -> list:
+        from station_catalogue import get_station_catalogue
+        if data_source not in self.data_locations:
+            raise_error(f"Unknown data source {data_source} - select from {list(self.data_locations)}", ValueError)
+        location = self.data_locations[data_source]
+        if prefix:
+            return get_station_catalogue().search(data_source, location, prefix)
+        return get_station_catalogue().list_stations(data_source, location)
+
+
+class WindRoseRequestHandler(BaseHTTPRequestHandler):
+    """
+    HTTP interface of the wind rose service:
+        GET  /health                                  service status
+        GET  /stations?data_source=BOM&prefix=066     station names
+        POST /windrose                                wind rose image, or a zip file when the request produces several
+        POST /tables                                  frequency tables as JSON
+    POST requests take a JSON object of wind rose parameters for a database station - see get_request_options
+    """
+
+    def send_body(self,
+                  status: int,
+                  body: bytes,
+                  content_type: str):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_json(self,
+                  status: int,
+                  value):
+        self.send_body(status, json.dumps(value).encode(), "application/json")
+
+    def handle_request(self, respond):
+        """
+        Runs a request and sends its response, or an error response with the error message
+        """
+        try:
+            respond()
+        except ValueError as e:
+            self.send_json(400, {"error": str(e) or type(e).__name__})
+        except FileNotFoundError as e:
+            self.send_json(404, {"error": str(e) or type(e).__name__})
+        except Exception as e:
+            traceback.print_exc()
+            self.send_json(500, {"error": f"{type(e).__name__}: {e}"})
+
+    def do_GET(self):
+        import data_cache
+        service = self.server.service
+        url = urlparse(self.path)
+        query = {name: values[0] for name, values in parse_qs(url.query).items()}
+        if url.path == "/health":
+            self.send_json(200, {"status": "ok", "backend": service.backend, "runs": service.runs,
+                                 "coalesced": service.coalescer.coalesced,
+                                 "stations_in_memory": len(data_cache.get_memory_cache_stations())})
+        elif url.path == "/stations":
+            self.handle_request(lambda: self.send_json(200, service.list_stations(query.get("data_source"),
+                                                                                  query.get("prefix"))))
+        else:
+            self.send_json(404, {"error": f"Unknown path {url.path}"})
+
+    def do_POST(self):
+        service = self.server.service
+        path = urlparse(self.path).path
+        if path not in ("/windrose", "/tables"):
+            self.send_json(404, {"error": f"Unknown path {path}"})
+            return
+
+        def respond():
+            try:
+                params = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+            except ValueError:
+                raise_error("The request body must be a JSON object of windrose_from_data parameters", ValueError)
+            if path == "/windrose":
+                self.send_body(200, *service.render(params))
+            else:
+                self.send_json(200, service.tables(params))
+        self.handle_request(respond)
+
+
+def create_server(service: WindRoseService,
+                  host: str = "127.0.0.1",
+                  port: int = 8765) -> ThreadingHTTPServer:
+    """
+    :param service: wind rose service to answer the requests
+    :param host: address to listen on
+    :param port: port to listen on - 0 for any free port
+    :return: HTTP server, not yet serving - see serve_forever
+    """
+    server = ThreadingHTTPServer((host, port), WindRoseRequestHandler)
+    server.daemon_threads = True
+    server.service = service
+    return server
+
+
+def parse_args(argv: list = None):
+    """
+    Command line arguments for the wind rose service
+    :param argv: list of arguments, defaults to sys.argv
+    :return: parsed arguments
+    """
+    parser = argparse.ArgumentParser(description="Serve wind roses and frequency tables over HTTP from one long-running "
+                                                 "process, keeping R and the station data warm between requests")
+    parser.add_argument('--host', default="127.0.0.1", help="Address to listen on")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--backend', choices=['R', 'matplotlib'], default='R',
+                        help="Rendering backend for requests that do not set one")
+    parser.add_argument('--data_dir', action="append", default=[], metavar="SOURCE=PATH",
+                        help="Database folder in place of the path in __params__, e.g. BOM=D:/met/bom")
+    parser.add_argument('--memory_stations', type=int, default=8,
+                        help="Number of parsed stations to keep in memory")
+    return parser.parse_args(argv)
+
+
+def main(argv: list = None):
+    args = parse_args(argv)
+    data_locations = {}
+    for data_dir in args.data_dir:
+        data_source, _, location = data_dir.partition("=")
+        if not location:
+            raise_error(f"--data_dir must be given as SOURCE=PATH, not {data_dir}", ValueError)
+        data_locations[data_source] = location
+    service = WindRoseService(data_locations, args.backend, args.memory_stations)
+    service.warm_up()
+    server = create_server(service, args.host, args.port)
+    print(f"Wind rose service listening on http://{server.server_address[0]}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,251 @@
+import bisect
+import json
+import os
+import threading
+import time
+import pandas as pd
+import data_cache
+from checks import raise_error
+
+catalogue_version = 1
+station_list_name = "__station_list_complete.csv"
+bom_file_suffix = "_60min.csv"
+
+# seconds between checks of the database folders for changes - each check is one stat per database on the network share
+refresh_interval = 60
+
+
+def get_listing_signature(location: str) -> list:
+    """
+    Returns the modification time of a database folder and its station list - these change whenever stations are added,
+    removed or renamed
+    :param location: directory path for database
+    :return: list of [folder modification time in ns, station list size in bytes, station list modification time in ns]
+    """
+    signature = [os.stat(location).st_mtime_ns]
+    station_list = os.path.join(location, station_list_name)
+    if os.path.isfile(station_list):
+        stats = os.stat(station_list)
+        signature.extend([stats.st_size, stats.st_mtime_ns])
+    return signature
+
+
+def read_station_entries(source: str,
+                         location: str) -> list:
+    """
+    Reads the stations in one of AECOM's databases - BOM stations are listed from the folder, the other databases from
+    their station list
+    :param source: database identifier - BOM or OEH etc.
+    :param location: directory path for database
+    :return: list of station dictionaries with 'name', 'file' and, where available, 'latitude' and 'longitude' keys
+    """
+    if source == 'BOM':
+        return [{"name": x[:-len(bom_file_suffix)], "file": x} for x in sorted(os.listdir(location))
+                if x.endswith(bom_file_suffix)]
+    try:
+        station_list_df = pd.read_csv(os.path.join(location, station_list_name))
+    except FileNotFoundError:
+        raise_error(f"The 'station_list_complete.csv' file could not be found in {location}", FileNotFoundError)
+    has_location = {"Latitude", "Longitude"}.issubset(station_list_df.columns)
+    entries = []
+    for row in station_list_df.to_dict(orient="records"):
+        entry = {"name": str(row["Station Name"]), "file": str(row["File Name"])}
+        if has_location and pd.notna(row["Latitude"]) and pd.notna(row["Longitude"]):
+            entry["latitude"], entry["longitude"] = float(row["Latitude"]), float(row["Longitude"])
+        entries.append(entry)
+    return entries
+
+
+class StationCatalogue:
+    """
+    Index of the stations in each of AECOM's databases, kept in memory and in the local cache folder so station lookups
+    do not re-read the station lists or probe the network share. A database is only re-listed when its folder or station
+    list changes, and the folders are checked for changes at most once every 'refresh_interval' seconds
+    Refreshes and saves of the index are made under a lock, so the catalogue can be shared by the threads of a process,
+    e.g. the request and render threads of the wind rose service
+
+    Functions:
+        get_station(self, source, location, station_id) -> dict
+            Station entry for an exact or case-insensitive station name, or None
+        get_data_file(self, source, location, station_id) -> str
+            Path to the station's csv data file
+        search(self, source, location, prefix) -> list
+            Station names starting with a prefix, case-insensitive
+        list_stations(self, source, location) -> list
+            All station names in a database
+    """
+
+    def __init__(self, cache_dir: str = None):
+        """
+        :param cache_dir: local folder for the on-disk index - defaults to the data cache folder
+        """
+        self.cache_dir = cache_dir
+        self.sources = {}
+        self.checked = {}
+        self.loaded_from_disk = False
+        self.lock = threading.RLock()
+
+    @property
+    def index_path(self) -> str:
+        return os.path.join(self.cache_dir or data_cache.local_cache_dir, "station_catalogue.json")
+
+    def load_index(self):
+        """
+        Loads the on-disk index saved by a previous run
+        """
+        self.loaded_from_disk = True
+        try:
+            with open(self.index_path) as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            return
+        if saved.get("version") != catalogue_version:
+            return
+        for source, saved_source in saved.get("sources", {}).items():
+            self.sources.setdefault(source, self.build_source(saved_source["location"], saved_source["signature"],
+                                                              saved_source["stations"]))
+
+    def save_index(self):
+        """
+        Saves the index to the local cache folder, written to a temporary file first so a concurrent run never reads a
+        partial index
+        """
+        with self.lock:
+            saved = {"version": catalogue_version, "sources": {
+                source: {"location": x["location"], "signature": x["signature"], "stations": x["stations"]}
+                for source, x in self.sources.items()}}
+            try:
+                os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
+                temp_path = self.index_path + f".{os.getpid()}.tmp"
+                with open(temp_path, "w") as f:
+                    json.dump(saved, f)
+                os.replace(temp_path, self.index_path)
+            except OSError:
+                print("\nUnable to write the station catalogue to the local data cache - continuing without caching\n")
+
+    @staticmethod
+    def build_source(location: str,
+                     signature: list,
+                     stations: list) -> dict:
+        """
+        Builds the lookup tables for one database - a dictionary for exact and case-insensitive lookups and a sorted list
+        of lower case names for prefix search
+        """
+        by_name = {x["name"]: x for x in stations}
+        by_lower_name = {}
+        for x in stations:
+            by_lower_name.setdefault(x["name"].lower(), x)
+        return {"location": location, "signature": signature, "stations": stations, "by_name": by_name,
+                "by_lower_name": by_lower_name, "sorted_names": sorted(by_lower_name)}
+
+    def refresh(self,
+                source: str,
+                location: str,
+                force: bool = False) -> dict:
+        """
+        Returns the index for a database, re-listing the database only if its folder or station list has changed
+        :param source: database identifier - BOM or OEH etc.
+        :param location: directory path for database
+        :param force: check the database for changes even if it was checked within the refresh interval
+        :return: index dictionary for the database
+        """
+        with self.lock:
+            if not self.loaded_from_disk:
+                self.load_index()
+            indexed = self.sources.get(source)
+            if indexed is not None and indexed["location"] == location and not force \
+                    and time.monotonic() - self.checked.get(source, -refresh_interval) < refresh_interval:
+                return indexed
+            try:
+                signature = get_listing_signature(location)
+            except OSError:
+                raise_error(f"The {source} database folder {location} could not be found", FileNotFoundError)
+            if indexed is None or indexed["location"] != location or indexed["signature"] != signature:
+                indexed = self.build_source(location, signature, read_station_entries(source, location))
+                self.sources[source] = indexed
+                self.save_index()
+            self.checked[source] = time.monotonic()
+            return indexed
+
+    def get_station(self,
+                    source: str,
+                    location: str,
+                    station_id: str) -> dict:
+        """
+        Looks up a station by its exact name, then case-insensitively. A station that is not found triggers one check of the
+        database for changes, in case it was added within the refresh interval
+        :param source: database identifier - BOM or OEH etc.
+        :param location: directory path for database
+        :param station_id: name of station
+        :return: station dictionary, or None if the station is not in the database
+        """
+        for force in (False, True):
+            indexed = self.refresh(source, location, force)
+            station = indexed["by_name"].get(station_id) or indexed["by_lower_name"].get(str(station_id).lower())
+            if station is not None:
+                return station
+        return None
+
+    def get_data_file(self,
+                      source: str,
+                      location: str,
+                      station_id: str) -> str:
+        """
+        Returns the path to a station's csv data file
+        :param source: database identifier - BOM or OEH etc.
+        :param location: directory path for database
+        :param station_id: name of station
+        :return: string form of path to station's csv data file
+        """
+        station = self.get_station(source, location, station_id)
+        if station is None:
+            if source == 'BOM':
+                raise_error(f"Cannot find file for station {station_id} - check if valid", FileNotFoundError)
+            raise_error(f"The entered station does not exist in the {source} database - please select from "
+                        f"{self.list_stations(source, location)}", ValueError)
+        return os.path.join(location, station["file"])
+
+    def search(self,
+               source: str,
+               location: str,
+               prefix: str) -> list:
+        """
+        Returns the stations whose names start with a prefix, ignoring case
+        :param source: database identifier - BOM or OEH etc.
+        :param location: directory path for database
+        :param prefix: start of the station name
+        :return: list of station names, sorted
+        """
+        indexed = self.refresh(source, location)
+        prefix = str(prefix).lower()
+        sorted_names = indexed["sorted_names"]
+        start = bisect.bisect_left(sorted_names, prefix)
+        end = bisect.bisect_left(sorted_names, prefix + "\U0010ffff", lo=start)
+        return [indexed["by_lower_name"][x]["name"] for x in sorted_names[start:end]]
+
+    def list_stations(self,
+                      source: str,
+                      location: str) -> list:
+        """
+        Lists all stations in a database, in the order of the database's station list
+        :param source: database identifier - BOM or OEH etc.
+        :param location: directory path for database
+        :return: list of station names or IDs
+        """
+        return [x["name"] for x in self.refresh(source, location)["stations"]]
+
+
+_catalogue = None
+_catalogue_lock = threading.Lock()
+
+
+def get_station_catalogue() -> StationCatalogue:
+    """
+    Returns the station catalogue shared by the process, creating it on first use
+    :return: StationCatalogue
+    """
+    global _catalogue
+    with _catalogue_lock:
+        if _catalogue is None:
+            _catalogue = StationCatalogue()
+    return _catalogue
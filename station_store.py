@@ -0,0 +1,277 @@
+import argparse
+import os
+import sys
+import numpy as np
+import pandas as pd
+import data_cache
+from __params__ import data_source_dict
+from data_cache import get_file_signature
+from functions import import_data, get_custom_period_bounds
+from compact import wd_missing, get_wd_values
+
+store_magic = b"WRSTORE1"
+store_version = 1
+store_extension = ".wrs"
+
+# 64 byte header, followed by the timestamp, wind speed and wind direction columns
+header_dtype = np.dtype([
+    ("magic", "S8"),
+    ("version", "<u4"),
+    ("resolution_seconds", "<u4"),
+    ("n_rows", "<u8"),
+    ("source_size", "<i8"),
+    ("source_mtime_ns", "<i8"),
+    ("reserved", "V24")
+])
+
+
+def get_resolution_seconds(seconds: np.ndarray) -> int:
+    """
+    Returns the coarsest time step that every timestamp falls on - an hour, a minute or a second
+    :param seconds: array of timestamps in seconds since the epoch
+    :return: resolution in seconds
+    """
+    for resolution in (3600, 60):
+        if not np.any(seconds % resolution):
+            return resolution
+    return 1
+
+
+def write_station_store(wind_df: pd.DataFrame,
+                        store_path: str,
+                        signature: np.ndarray = None) -> str:
+    """
+    Writes a station's wind data to a binary store - columns of int32 timestamps (in units of the data's time step since
+    the epoch), float32 wind speeds and int16 wind directions in whole degrees, sorted by time
+    :param wind_df: data frame containing 'ws', 'wd', 'date' columns, as returned by import_data
+    :param store_path: path to the store file
+    :param signature: optional source file signature from get_file_signature, used to detect out of date stores
+    :return: path to the store file
+    """
+    dates = wind_df["date"].to_numpy(dtype="datetime64[s]")
+    valid = ~np.isnat(dates)
+    seconds = dates[valid].astype(np.int64)
+    order = np.argsort(seconds, kind="stable")
+    seconds = seconds[order]
+    ws = wind_df["ws"].to_numpy(dtype=np.float64)[valid][order]
+    wd = get_wd_values(wind_df["wd"])[valid][order]
+
+    resolution = get_resolution_seconds(seconds)
+    times = seconds // resolution
+    if len(times) and (times[0] < np.iinfo(np.int32).min or times[-1] > np.iinfo(np.int32).max):
+        raise ValueError(f"The data in {store_path} is outside the range of the store's timestamps")
+
+    header = np.zeros(1, dtype=header_dtype)
+    header["magic"] = store_magic
+    header["version"] = store_version
+    header["resolution_seconds"] = resolution
+    header["n_rows"] = len(times)
+    if signature is not None:
+        header["source_size"], header["source_mtime_ns"] = signature
+
+    os.makedirs(os.path.dirname(os.path.abspath(store_path)), exist_ok=True)
+    temp_path = store_path + f".{os.getpid()}.tmp"
+    with open(temp_path, "wb") as f:
+        f.write(header.tobytes())
+        f.write(times.astype("<i4").tobytes())
+        f.write(ws.astype("<f4").tobytes())
+        with np.errstate(invalid="ignore"):
+            f.write(np.where(np.isnan(wd), wd_missing, np.round(wd)).astype("<i2").tobytes())
+    os.replace(temp_path, store_path)
+    return store_path
+
+
+class StationStore:
+    """
+    Read-only view of a station's binary store, memory mapped so only the pages of the requested date range are read
+    Wind speeds are stored as float32, so values read back are accurate to about 7 significant figures
+
+    Attributes:
+        path: path to the store file
+        resolution_seconds: time step of the timestamps in seconds
+        signature: [size, modification time] of the source file the store was built from, [0, 0] if unknown
+        times: int32 array of timestamps, in units of resolution_seconds since the epoch
+        ws: float32 array of wind speeds in m/s
+        wd: int16 array of wind directions in degrees, wd_missing where missing
+    """
+
+    def __init__(self, path: str):
+        self.path = str(path)
+        header = np.fromfile(self.path, dtype=header_dtype, count=1)
+        if len(header) == 0 or header["magic"][0] != store_magic or header["version"][0] != store_version:
+            raise ValueError(f"{self.path} is not a version {store_version} station store")
+        header = header[0]
+        self.resolution_seconds = int(header["resolution_seconds"])
+        self.signature = np.array([header["source_size"], header["source_mtime_ns"]], dtype=np.int64)
+        n_rows = int(header["n_rows"])
+        offset = header_dtype.itemsize
+        if n_rows == 0:
+            self.times, self.ws, self.wd = np.empty(0, "<i4"), np.empty(0, "<f4"), np.empty(0, "<i2")
+            return
+        self.times = np.memmap(self.path, dtype="<i4", mode="r", offset=offset, shape=(n_rows,))
+        self.ws = np.memmap(self.path, dtype="<f4", mode="r", offset=offset + 4 * n_rows, shape=(n_rows,))
+        self.wd = np.memmap(self.path, dtype="<i2", mode="r", offset=offset + 8 * n_rows, shape=(n_rows,))
+
+    def __len__(self):
+        return len(self.times)
+
+    def get_index_range(self,
+                        start: pd.Timestamp = None,
+                        end: pd.Timestamp = None) -> (int, int):
+        """
+        Finds the rows between two times with two binary searches
+        :param start: first time to include, or None for the start of the data
+        :param end: last time to include, or None for the end of the data
+        :return: start and stop row indexes
+        """
+        first, stop = 0, len(self.times)
+        if start is not None:
+            first = int(np.searchsorted(self.times, -(-pd.Timestamp(start).value // (self.resolution_seconds * 10 ** 9)),
+                                        side="left"))
+        if end is not None:
+            stop = int(np.searchsorted(self.times, pd.Timestamp(end).value // (self.resolution_seconds * 10 ** 9),
+                                       side="right"))
+        return first, max(first, stop)
+
+    def query(self,
+              start: pd.Timestamp = None,
+              end: pd.Timestamp = None) -> (np.ndarray, np.ndarray, np.ndarray):
+        """
+        Returns the stored columns between two times - slices of the memory map, so no data is copied
+        :param start: first time to include, or None for the start of the data
+        :param end: last time to include, or None for the end of the data
+        :return: timestamps, wind speeds and wind directions as stored
+        """
+        first, stop = self.get_index_range(start, end)
+        return self.times[first:stop], self.ws[first:stop], self.wd[first:stop]
+
+    def to_wind_df(self,
+                   start: pd.Timestamp = None,
+                   end: pd.Timestamp = None,
+                   compact: bool = False) -> pd.DataFrame:
+        """
+        Returns the data between two times in the same layout as import_data
+        :param start: first time to include, or None for the start of the data
+        :param end: last time to include, or None for the end of the data
+        :param compact: return the data in the compact representation (see compact.py), which the store already uses
+        :return: DataFrame containing 'ws', 'wd', 'date' columns
+        """
+        times, ws, wd = self.query(start, end)
+        dates = (times.astype(np.int64) * self.resolution_seconds).astype("datetime64[s]")
+        if compact:
+            return pd.DataFrame({"ws": np.array(ws), "wd": np.array(wd), "date": dates}, copy=False)
+        dates = dates.astype("datetime64[ns]")
+        return pd.DataFrame({
+            "ws": ws.astype(np.float64),
+            "wd": np.where(wd == wd_missing, np.nan, wd.astype(np.float64)),
+            "date": dates
+        })
+
+    def read_period(self,
+                    data_period: str,
+                    compact: bool = False) -> pd.DataFrame:
+        """
+        Returns the data for a custom user data period, matching slice_by_custom_dates
+        :param data_period: custom user data period, e.g. '1/1/2019-31/12/2019', or None for all data
+        :param compact: return the data in the compact representation
+        :return: DataFrame containing 'ws', 'wd', 'date' columns
+        """
+        if not data_period:
+            return self.to_wind_df(compact=compact)
+        return self.to_wind_df(*get_custom_period_bounds(data_period), compact=compact)
+
+
+def get_store_path(data_source: str,
+                   data_file: str,
+                   store_dir: str = None) -> str:
+    """
+    Returns the path of the binary store for a station data file
+    :param data_source: Database identifier - BOM or OEH etc.
+    :param data_file: path to the station's csv data file
+    :param store_dir: folder for the stores - defaults to a 'stores' folder in the local data cache
+    :return: path to the store file in string form
+    """
+    if store_dir is None:
+        store_dir = os.path.join(data_cache.local_cache_dir, "stores")
+    name = os.path.splitext(os.path.basename(str(data_file)))[0]
+    return os.path.join(store_dir, data_source, name + store_extension)
+
+
+def open_station_store(data_source: str,
+                       data_file: str,
+                       store_dir: str = None):
+    """
+    Opens the binary store for a station if one has been built and the source file has not changed since
+    If the source file cannot be reached, e.g. off the network, the store is used as is
+    :param data_source: Database identifier
+    :param data_file: path to the station's csv data file
+    :param store_dir: folder for the stores
+    :return: StationStore, or None if there is no up to date store
+    """
+    store_path = get_store_path(data_source, data_file, store_dir)
+    if not os.path.isfile(store_path):
+        return None
+    try:
+        store = StationStore(store_path)
+    except (OSError, ValueError):
+        return None
+    try:
+        signature = get_file_signature(data_file)
+    except OSError:
+        return store
+    return store if np.array_equal(store.signature, signature) else None
+
+
+def convert_station(data_source: str,
+                    data_file: str,
+                    store_dir: str = None) -> str:
+    """
+    Builds the binary store for a station from its csv data file
+    :param data_source: Database identifier
+    :param data_file: path to the station's csv data file
+    :param store_dir: folder for the stores
+    :return: path to the store file
+    """
+    signature = get_file_signature(data_file)
+    wind_df = import_data(data_source, data_file)
+    return write_station_store(wind_df, get_store_path(data_source, data_file, store_dir), signature)
+
+
+def convert_database(data_source: str,
+                     location: str = None,
+                     store_dir: str = None,
+                     stations: list = None) -> list:
+    """
+    Builds the binary stores for the stations in one of AECOM's databases, skipping stores that are up to date
+    :param data_source: Database identifier
+    :param location: directory path for database - defaults to the path in __params__
+    :param store_dir: folder for the stores
+    :param stations: optional list of stations to convert - all stations if not set
+    :return: list of paths to the store files
+    """
+    from station_catalogue import get_station_catalogue
+    catalogue = get_station_catalogue()
+    location = location or data_source_dict.get(data_source)
+    store_paths = []
+    for station in stations or catalogue.list_stations(data_source, location):
+        data_file = catalogue.get_data_file(data_source, location, station)
+        if open_station_store(data_source, data_file, store_dir) is None:
+            print(f"Converting {station}")
+            convert_station(data_source, data_file, store_dir)
+        store_paths.append(get_store_path(data_source, data_file, store_dir))
+    return store_paths
+
+
+def main(argv: list = None) -> int:
+    parser = argparse.ArgumentParser(description="Convert the station csv files of one of AECOM's met databases to binary stores")
+    parser.add_argument('data_source', choices=list(data_source_dict), help="Database to convert")
+    parser.add_argument('--stations', nargs="+", help="Station IDs or names to convert - all stations if not set")
+    parser.add_argument('--store_dir', type=str, help="Folder for the stores - defaults to the local data cache")
+    args = parser.parse_args(argv)
+    store_paths = convert_database(args.data_source, store_dir=args.store_dir, stations=args.stations)
+    print(f"{len(store_paths)} {args.data_source} station stores up to date")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,58 @@
+import os
+import numpy as np
+import pandas as pd
+import data_cache
+from __params__ import data_source_dict
+from batch import run_station, run_batch, parse_args, print_summary
+from functions import get_rose_types_and_layouts
+
+
+def make_station_dir(tmp_path):
+    station_dir = tmp_path / "epav"
+    station_dir.mkdir()
+    periods = 24 * 30
+    rng = np.random.default_rng(0)
+    dates = pd.date_range(start=pd.to_datetime("2020/01/01"), freq='1H', periods=periods)
+    pd.DataFrame({"Date": dates.strftime("%d/%m/%Y %H:%M"), "WS (m/s)": rng.gamma(2, 2, periods),
+                  "WD (deg)": rng.uniform(0, 360, periods)}).to_csv(station_dir / "Alphington.csv", index=False)
+    pd.DataFrame({"Station Name": ["alphington"], "File Name": ["Alphington.csv"]}).to_csv(
+        station_dir / "__station_list_complete.csv", index=False)
+    return str(station_dir)
+
+
+def get_options(output_folder):
+    rose_types, rose_layouts = get_rose_types_and_layouts(True, True, False, False, False)
+    return dict(output_folder=output_folder, lat=-34, long=151, data_period=None, selected_hours="0-23",
+                ws_categories="0.5,1,2,3,4,5,7,10,15,20", grid_spacing=10, ray_angle=30, calms_threshold=0.5, max_freq=None,
+                file_prefix=None, rose_types=rose_types, rose_layouts=rose_layouts, annual=False, save_transparent=False,
+                stats_only=True)
+
+
+def test_parse_args():
+    args = parse_args(["EPAV", "out", "--stations", "alphington", "footscray", "--workers", "2"])
+    assert args.stations == ["alphington", "footscray"]
+    assert args.workers == 2
+    assert parse_args(["BOM", "out", "--all"]).all
+
+
+def test_run_station(tmp_path, monkeypatch):
+    monkeypatch.setattr(data_cache, "local_cache_dir", str(tmp_path / "cache"))
+    monkeypatch.setitem(data_source_dict, "EPAV", make_station_dir(tmp_path))
+    options = dict(get_options(str(tmp_path / "out")), data_source="EPAV")
+    result = run_station("alphington", options)
+    assert result["success"], result.get("traceback")
+    assert result["outputs"] == 4
+    assert os.path.isfile(tmp_path / "out" / "alphington_output" / "alphington_season_all_data_frequencies.csv")
+
+    result = run_station("not_a_station", options)
+    assert not result["success"]
+    assert "ValueError" in result["error"]
+
+
+def test_run_batch_reports_failures(tmp_path, capsys):
+    options = get_options(str(tmp_path / "out"))
+    results = run_batch("EPAV", ["missing_1", "missing_2"], options, workers=1)
+    assert [x["station"] for x in results] == ["missing_1", "missing_2"]
+    assert not any(x["success"] for x in results)
+    print_summary(results, 1.0)
+    assert "0 of 2 stations succeeded" in capsys.readouterr().out
@@ -0,0 +1,86 @@
+import numpy as np
+import pandas as pd
+import pytest
+from compact import compact_wind_df, expand_wind_df, is_compact, wd_missing
+from functions import generate_annual_wind_dict, windrose_data_not_empty, replace_calms, slice_by_custom_hours
+from windrose_frequencies import calculate_windrose_frequencies
+from wind_query import WindQuery
+from daylight import add_daylight_column
+from __params__ import r_type_size_dict
+
+categories = [0.5, 1, 2, 3, 4, 5, 7, 10, 15, 20]
+
+
+def make_wind_df(periods=24 * 365 * 2):
+    # whole degree directions and 0.1 m/s speeds, which the compact representation holds exactly
+    rng = np.random.default_rng(8)
+    wind_df = pd.DataFrame({
+        "ws": np.round(rng.gamma(2, 2, periods), 1),
+        "wd": np.round(rng.uniform(0, 360, periods)),
+        "date": pd.date_range(start=pd.to_datetime("2018/01/01"), freq='1H', periods=periods)
+    })
+    wind_df.loc[::97, "ws"] = np.nan
+    wind_df.loc[::89, "wd"] = np.nan
+    return wind_df
+
+
+def test_compact_round_trip():
+    wind_df = make_wind_df()
+    compact_df = compact_wind_df(wind_df)
+    assert is_compact(compact_df)
+    assert compact_df["ws"].dtype == np.float32 and compact_df["date"].dtype == "datetime64[s]"
+    assert (compact_df["wd"] == wd_missing).sum() == wind_df["wd"].isna().sum()
+    assert compact_df.memory_usage(index=False).sum() < 0.6 * wind_df.memory_usage(index=False).sum()
+    pd.testing.assert_frame_equal(expand_wind_df(compact_df), wind_df, check_exact=False, rtol=1e-6)
+
+
+@pytest.mark.parametrize("rose_type", [x.split("_") for x in r_type_size_dict])
+def test_compact_frequencies_match(rose_type):
+    wind_df = WindQuery(make_wind_df()).hours("0-6,18-23").calms(0.5).run()
+    compact_df = WindQuery(compact_wind_df(make_wind_df())).hours("0-6,18-23").calms(0.5).run()
+    assert is_compact(compact_df)
+    if "daylight" in rose_type:
+        wind_df, compact_df = add_daylight_column(wind_df, -34, 151), add_daylight_column(compact_df, -34, 151)
+    pd.testing.assert_frame_equal(calculate_windrose_frequencies(compact_df, rose_type, 30, categories),
+                                  calculate_windrose_frequencies(wind_df, rose_type, 30, categories))
+
+
+def test_compact_functions():
+    compact_df = compact_wind_df(make_wind_df())
+    annual_wind_dict = generate_annual_wind_dict(compact_df)
+    assert list(annual_wind_dict) == [2018, 2019]
+    assert len(annual_wind_dict[2018]) == 8760
+    assert len(slice_by_custom_hours(compact_df, "0-5")) == len(compact_df) // 4
+    calms_df = replace_calms(compact_df.copy(), 0.5)
+    assert calms_df["wd"].dtype == np.int16 and (calms_df["wd"] == -999).sum() == (compact_df["ws"] < 0.5).sum()
+    missing_df = compact_df.assign(wd=np.full(len(compact_df), wd_missing, dtype=np.int16))
+    assert windrose_data_not_empty(compact_df, False)
+    assert not windrose_data_not_empty(missing_df, False)
+
+
+def test_windrose_from_data_compact(tmp_path):
+    pytest.importorskip("matplotlib")
+    from main_wind_rose_function import windrose_from_data
+    num_hours = 24 * 365
+    wind_df = make_wind_df(num_hours)
+    # rows that are empty in the csv are dropped by import_csv_data
+    wind_df.loc[wind_df["ws"].isna() & wind_df["wd"].isna(), "ws"] = 1.0
+    csv_file = tmp_path / "station.csv"
+    wind_df[["ws", "wd"]].to_csv(csv_file, index=False)
+
+    def run(compact):
+        output_folder = tmp_path / str(compact)
+        output_folder.mkdir()
+        return windrose_from_data(data_source="csv", output_folder=str(output_folder), lat=-34, long=151, data_period=None,
+                                  selected_hours="0-23", ws_categories="0.5,1,2,3,4,5,7,10,15,20", grid_spacing=10,
+                                  ray_angle=30, calms_threshold=0.5, max_freq=None, file_prefix=None,
+                                  rose_types=[["default"], ["daylight"]], rose_layouts=[[1, 1], [2, 1]],
+                                  annual=False, save_transparent=False, database_source=False, csv_file=str(csv_file),
+                                  header_lines=1, start_date="1/1/2018", start_hour=0, num_hours=num_hours, ws_col="a",
+                                  wd_col="b", backend="matplotlib", save_tables=True, compact=compact)
+
+    outputs, compact_outputs = run(False), run(True)
+    assert len(outputs) == len(compact_outputs) == 2
+    for png_file, compact_png_file in zip(outputs, compact_outputs):
+        pd.testing.assert_frame_equal(pd.read_csv(compact_png_file.replace(".png", "_frequencies.csv")),
+                                      pd.read_csv(png_file.replace(".png", "_frequencies.csv")))
@@ -0,0 +1,34 @@
+import numpy as np
+import pandas as pd
+from daylight import classify_daylight, get_sunrise_table, add_daylight_column, daylight_column
+
+
+def test_classify_daylight():
+    # Sydney - sunrise around 4:50 and sunset around 19:10 (AEST) in mid January, 7:00 and 17:05 in mid July
+    summer = pd.date_range(start=pd.to_datetime("2020/01/15"), freq='1H', periods=24)
+    winter = pd.date_range(start=pd.to_datetime("2020/07/15"), freq='1H', periods=24)
+    assert list(np.flatnonzero(classify_daylight(summer, -34, 151))) == list(range(5, 20))
+    winter_daylight = classify_daylight(winter, -34, 151)
+    assert winter_daylight[8:17].all()
+    assert not winter_daylight[:7].any() and not winter_daylight[18:].any()
+
+
+def test_get_sunrise_table_cached():
+    get_sunrise_table.cache_clear()
+    dates = pd.date_range(start=pd.to_datetime("2019/06/01"), freq='1H', periods=24 * 365)
+    classify_daylight(dates, -34, 151)
+    classify_daylight(dates[:100], -34, 151)
+    info = get_sunrise_table.cache_info()
+    assert info.misses == 2 and info.hits == 1
+    sunrise, sunset = get_sunrise_table(-34.0, 151.0, 2020, 10.0)
+    assert len(sunrise) == 366 and (sunset > sunrise).all()
+
+
+def test_add_daylight_column():
+    dates = pd.date_range(start=pd.to_datetime("2020/01/15"), freq='1H', periods=24)
+    wind_df = pd.DataFrame({"ws": range(24), "wd": range(24), "date": dates})
+    with_daylight = add_daylight_column(wind_df, -34, 151)
+    assert daylight_column not in wind_df.columns
+    assert list(with_daylight[daylight_column].cat.categories) == ["daylight", "nighttime"]
+    assert with_daylight[daylight_column].iloc[12] == "daylight"
+    assert with_daylight[daylight_column].iloc[0] == "nighttime"
@@ -1,10 +1,13 @@
 import pytest
 import pandas as pd
 import datetime
+import os
+import data_cache
 from __params__ import epav_data_network_dir
 from functions import get_stations_and_files, get_data_source, import_data, replace_calms, get_custom_data_period
 from functions import get_rose_types_and_layouts, slice_by_custom_dates, parse_custom_hours, filter_df_by_hours
 from functions import slice_by_custom_hours, generate_annual_wind_dict, windrose_data_not_empty, import_csv_data
+from functions import make_image_transparent, make_images_transparent, get_column_index, partition_by_period
 
 test_csv_file = r"C:\Users\wardj6\PycharmProjects\WRT_II\Test_Data\Alphington.csv"
 
@@ -34,6 +37,25 @@ def test_import_data():
     assert list(wind_df.columns) == ['ws', 'wd', 'date']
 
 
+def test_import_data_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(data_cache, "local_cache_dir", str(tmp_path / "cache"))
+    data_file = tmp_path / "station.csv"
+    dates = pd.date_range(start=pd.to_datetime("2020/01/01"), freq='1H', periods=48)
+    source_df = pd.DataFrame({"Date": dates.strftime("%d/%m/%Y %H:%M"), "WS (m/s)": range(48), "WD (deg)": range(48)})
+    source_df.to_csv(data_file, index=False)
+
+    parsed_df = import_data("EPAV", str(data_file))
+    assert os.path.isfile(data_cache.get_cache_path("EPAV", str(data_file)))
+    cached_df = data_cache.load_cached_wind_df("EPAV", str(data_file))
+    pd.testing.assert_frame_equal(parsed_df, cached_df, check_dtype=False)
+    assert list(import_data("EPAV", str(data_file)).columns) == ['ws', 'wd', 'date']
+
+    # a changed source file invalidates the cache entry
+    source_df.iloc[:24].to_csv(data_file, index=False)
+    assert data_cache.load_cached_wind_df("EPAV", str(data_file)) is None
+    assert len(import_data("EPAV", str(data_file))) == 24
+
+
 def test_replace_calms():
     test_df = pd.DataFrame({
         "ws": [0.4, 0.5, 0.6],
@@ -48,6 +70,29 @@ def test_replace_calms():
     assert list(calms_replaced_df["date"]) == [1, 2, 3]
 
 
+def test_make_image_transparent(tmp_path):
+    from PIL import Image
+    images = []
+    for i in range(3):
+        image = str(tmp_path / f"rose_{i}.png")
+        img = Image.new("RGB", (4, 2), "white")
+        img.putpixel((1, 1), (255, 255, 254))
+        img.putpixel((2, 0), (0, 0, 0))
+        img.save(image, "PNG")
+        images.append(image)
+
+    transparent_image = make_image_transparent(images[0])
+    assert transparent_image == images[0].replace(".png", "_transparent.png")
+    pixels = Image.open(transparent_image).load()
+    assert pixels[0, 0] == (255, 255, 255, 0)
+    assert pixels[1, 1] == (255, 255, 254, 255)
+    assert pixels[2, 0] == (0, 0, 0, 255)
+
+    transparent_images = make_images_transparent(images)
+    assert transparent_images == [x.replace(".png", "_transparent.png") for x in images]
+    assert all(os.path.isfile(x) for x in transparent_images)
+
+
 def test_get_custom_data_period():
     test_date_1 = "1/1/2019-31/12/2019"
     test_date_2 = "1/1/2019 31/12/2019"
@@ -148,6 +193,36 @@ def test_generate_annual_wind_dict():
     assert years == [2017,2018,2019,2020]
 
 
+def test_generate_annual_wind_dict_includes_midnight():
+    dates = pd.date_range(start=pd.to_datetime("2017/12/31 22:00"), freq='1H', periods=4)
+    test_df = pd.DataFrame({"ws": range(4), "wd": range(4), "date": dates}, index=range(4))
+    test_dict = generate_annual_wind_dict(test_df)
+    assert len(test_dict[2017]) == 2
+    assert test_dict[2018]["date"].iloc[0] == pd.to_datetime("2018/01/01 00:00")
+
+    # years without data are kept as empty frames
+    gap_df = pd.concat([test_df, test_df.assign(date=test_df["date"] + pd.DateOffset(years=3))], ignore_index=True)
+    gap_dict = generate_annual_wind_dict(gap_df)
+    assert list(gap_dict.keys()) == [2017, 2018, 2019, 2020, 2021]
+    assert len(gap_dict[2019]) == 0
+
+
+def test_partition_by_period():
+    dates = pd.date_range(start=pd.to_datetime("2019/11/30"), freq='1D', periods=100)
+    test_df = pd.DataFrame({"ws": range(100), "wd": range(100), "date": dates}, index=range(100))
+    months = partition_by_period(test_df, 'month')
+    assert list(months.keys()) == [(2019, 11), (2019, 12), (2020, 1), (2020, 2), (2020, 3)]
+    assert len(months[(2019, 12)]) == 31
+    seasons = partition_by_period(test_df, 'season')
+    assert list(seasons.keys()) == [(2019, 'SON'), (2020, 'DJF'), (2020, 'MAM')]
+    assert len(seasons[(2020, 'DJF')]) == 31 + 31 + 29
+    # unsorted input is partitioned by date
+    shuffled = partition_by_period(test_df.sample(frac=1, random_state=0), 'year')
+    assert [len(x) for x in shuffled.values()] == [32, 68]
+    with pytest.raises(ValueError):
+        assert partition_by_period(test_df, 'week')
+
+
 def test_windrose_data_not_empty():
     # empty dataframe
     empty = pd.DataFrame({"ws": [], "wd": [], "date": []}, index=[])
@@ -197,4 +272,49 @@ def test_import_csv_data():
         assert import_csv_data(file, header_lines, start_date, start_hour, num_hours, ws_col, wd_col)
 
 
+def test_get_column_index():
+    assert get_column_index("a") == 0
+    assert get_column_index("Z") == 25
+    assert get_column_index("aa") == 26
+    assert get_column_index("AB") == 27
+    assert get_column_index("ba") == 52
+    with pytest.raises(ValueError):
+        assert get_column_index("a1")
+
+
+def test_import_csv_data_synthetic(tmp_path):
+    file = tmp_path / "wide.csv"
+    num_hours = 100
+    rows = []
+    for i in range(num_hours):
+        row = [0] * 28
+        row[26] = 999 if i == 5 else i % 20  # column AA holds WS
+        row[27] = 9999 if i == 7 else i      # column AB holds WD
+        rows.append(row)
+    pd.DataFrame(rows).to_csv(file, index=False)
+
+    data = import_csv_data(str(file), 1, "1/1/2019", 0, num_hours, "aa", "ab")
+    assert list(data.columns) == ['date', 'ws', 'wd']
+    assert len(data) == num_hours
+    assert data['date'].iloc[0] == pd.to_datetime("2019-01-01 00:00")
+    assert data['ws'].isna().sum() == 1 and pd.isna(data['ws'].iloc[5])
+    assert data['wd'].isna().sum() == 1 and pd.isna(data['wd'].iloc[7])
+
+    chunked = import_csv_data(str(file), 1, "1/1/2019", 0, num_hours, "aa", "ab", chunk_size=7)
+    pd.testing.assert_frame_equal(data, chunked)
+
+    with pytest.raises(ValueError):
+        assert import_csv_data(str(file), 1, "1/1/2019", 0, num_hours - 1, "aa", "ab", chunk_size=7)
+
+
+def test_import_csv_data_blank_ws_wd(tmp_path):
+    # a row with blank WS and WD but other fields filled is an hour of missing data, while a fully blank row is dropped
+    file = tmp_path / "blank.csv"
+    file.write_text("date,x,ws,wd\n1/1/2019 00:00,1,2.5,90\n1/1/2019 01:00,1,,\n1/1/2019 02:00,1,3,180\n,,,\n")
+    for chunk_size in [None, 2]:
+        data = import_csv_data(str(file), 1, "1/1/2019", 0, 3, "c", "d", chunk_size=chunk_size)
+        assert len(data) == 3 and data['ws'].isna().tolist() == [False, True, False]
+        assert data['wd'].tolist()[::2] == [90, 180]
+
+
 # More tests to follow
\ No newline at end of file
@@ -0,0 +1,32 @@
+import subprocess
+import sys
+import pytest
+from benchmarks.bench_importtime import entry_points, heavy_packages, parse_importtime, repo_dir
+from gui import parse_args
+from main import main
+
+csv_args = ["csv", "station.csv", "1", "1/1/2019", "0", "8760", "A", "B", "-34", "151", "test"]
+
+
+def test_headless_parse_args():
+    args = parse_args(csv_args + ["--seasons", "--grid_spacing", "5", "--ignore-gooey"])
+    assert args.command == "csv" and args.csv_file == "station.csv" and args.num_hours == 8760
+    assert args.seasons and not args.monthly and args.grid_spacing == 5 and args.cust_hours == "0-23"
+    args = parse_args(["BoM_OEH_DES_EPAV_Station", "BOM", "066037", "out", "-27", "153", "--compact"])
+    assert args.station_id == "066037" and args.latitude == -27 and args.compact and args.backend == "R"
+
+
+def test_validate_only(capsys):
+    main(["--validate_only"] + csv_args)
+    assert "Inputs are valid" in capsys.readouterr().out
+    with pytest.raises(ValueError):
+        main(["--validate_only"] + csv_args + ["--ray_angle", "5"])
+
+
+@pytest.mark.parametrize("name", ["main --help", "main --validate_only", "batch --help", "service --help"])
+def test_entry_points_avoid_heavy_imports(name):
+    process = subprocess.run([sys.executable, "-X", "importtime"] + entry_points[name], cwd=repo_dir, capture_output=True,
+                             text=True)
+    assert process.returncode == 0
+    modules = {x["module"].split(".")[0] for x in parse_importtime(process.stderr)}
+    assert not modules.intersection(heavy_packages)
@@ -0,0 +1,117 @@
+import json
+import os
+import pytest
+import numpy as np
+import pandas as pd
+from functions import get_rose_types_and_layouts
+
+pytest.importorskip("matplotlib")
+from main_wind_rose_function import windrose_from_data
+
+
+def make_csv(tmp_path, num_hours):
+    rng = np.random.default_rng(2)
+    csv_file = tmp_path / "station.csv"
+    pd.DataFrame({"ws": rng.gamma(2, 2, num_hours), "wd": rng.uniform(0, 360, num_hours)}).to_csv(csv_file, index=False)
+    return str(csv_file)
+
+
+def run_windrose(tmp_path, output_folder, render_workers, **kwargs):
+    num_hours = 24 * 365 * 2
+    output_folder.mkdir()
+    rose_types, rose_layouts = get_rose_types_and_layouts(True, False, False, False, True)
+    return windrose_from_data(data_source="csv", output_folder=str(output_folder), lat=-34, long=151, data_period=None,
+                              selected_hours="0-23", ws_categories="0.5,1,2,3,4,5,7,10,15,20", grid_spacing=10,
+                              ray_angle=30, calms_threshold=0.5, max_freq=None, file_prefix="test", rose_types=rose_types,
+                              rose_layouts=rose_layouts, annual=True, save_transparent=True, database_source=False,
+                              csv_file=make_csv(tmp_path, num_hours), header_lines=1, start_date="1/1/2018", start_hour=0,
+                              num_hours=num_hours, ws_col="a", wd_col="b", render_workers=render_workers,
+                              **{"backend": "matplotlib", **kwargs})
+
+
+def test_parallel_render_matches_serial(tmp_path):
+    serial = run_windrose(tmp_path, tmp_path / "serial", 1)
+    parallel = run_windrose(tmp_path, tmp_path / "parallel", 2)
+    names = [os.path.basename(x) for x in serial]
+    assert names == [os.path.basename(x) for x in parallel]
+    assert names == ["test__default_all_data.png", "test__default_2018.png", "test__default_2019.png",
+                     "test__daylight_all_data.png", "test__daylight_2018.png", "test__daylight_2019.png",
+                     "test__default_all_data_transparent.png", "test__default_2018_transparent.png",
+                     "test__default_2019_transparent.png"]
+    assert all(os.path.isfile(x) for x in parallel)
+
+
+def test_profile_report(tmp_path):
+    outputs = run_windrose(tmp_path, tmp_path / "profiled", 1, profile=True)
+    report = tmp_path / "profiled" / "test_station_profile.json"
+    assert report.is_file() and (tmp_path / "profiled" / "test_station_profile.csv").is_file()
+    assert str(report) not in outputs
+    stages = {x["stage"]: x for x in json.loads(report.read_text())["stages"]}
+    assert stages["import csv data"]["rows"] == 24 * 365 * 2
+    assert stages["import csv data"]["depth"] == 1 and stages["render default 2018"]["depth"] == 1
+    assert {"total", "dates, hours and calms", "daylight", "annual split"} <= set(stages)
+    assert stages["total"]["wall_seconds"] >= stages["render default"]["wall_seconds"]
+
+
+def test_r_jobs_rendered_in_one_batch(tmp_path, monkeypatch):
+    import main_wind_rose_function
+    batches = []
+
+    class BatchWindRose:
+        # records the batches rather than rendering them in R
+        def __init__(self, data):
+            self.data = data
+
+        def create_wind_roses(self, jobs):
+            batches.append((len(self.data), jobs))
+            for job in jobs:
+                for path in [job["png_file_path"], job["transparent_file_path"]]:
+                    if path is not None:
+                        with open(path, "wb") as f:
+                            f.write(b"image")
+            return [job["png_file_path"] for job in jobs]
+    monkeypatch.setattr(main_wind_rose_function, "get_wind_rose_class", lambda backend: BatchWindRose)
+
+    outputs = run_windrose(tmp_path, tmp_path / "batch", 1, backend="R", save_tables=True)
+    assert len(batches) == 1
+    rows, jobs = batches[0]
+    assert rows == 24 * 365 * 2
+    assert [(job["rose_type"], job["year"]) for job in jobs] == [(["default"], None), (["default"], 2018),
+                                                                   (["default"], 2019), (["daylight"], None),
+                                                                   (["daylight"], 2018), (["daylight"], 2019)]
+    assert [job["transparent_file_path"] is not None for job in jobs] == [True] * 3 + [False] * 3
+    assert len(outputs) == 9 and all(os.path.isfile(x) for x in outputs)
+    assert (tmp_path / "batch" / "test__daylight_2019_frequencies.csv").is_file()
+
+
+def test_r_batch_renders_each_job(tmp_path):
+    pytest.importorskip("rpy2")
+    from PIL import Image
+    from functions import generate_annual_wind_dict, replace_calms
+    from rpy2_windrose import Rpy2WindRose
+
+    rng = np.random.default_rng(3)
+    num_hours = 24 * 365 * 2
+    wind_df = replace_calms(pd.DataFrame({
+        "ws": np.round(rng.gamma(2, 2, num_hours), 1),
+        "wd": np.round(rng.uniform(0, 360, num_hours)),
+        "date": pd.date_range(start=pd.to_datetime("2018/01/01"), freq="1h", periods=num_hours)
+    }), 0.5)
+
+    def make_job(name, year=None, transparent=False):
+        return {"rose_type": ["default"], "rose_layout": [1, 1], "width": 600, "height": 600, "year": year,
+                "png_file_path": str(tmp_path / name),
+                "transparent_file_path": str(tmp_path / name.replace(".", "_transparent.")) if transparent else None}
+
+    jobs = [make_job("all_data.png"), make_job("2019.png", 2019), make_job("all_data.svg", transparent=True)]
+    outputs = Rpy2WindRose(wind_df).create_wind_roses(jobs)
+    assert outputs == [job["png_file_path"] for job in jobs]
+    assert all(os.path.getsize(x) for x in outputs + [jobs[2]["transparent_file_path"]])
+
+    # the annual wind rose is subset inside R - it matches a wind rose rendered from the Python annual data
+    single = Rpy2WindRose(generate_annual_wind_dict(wind_df)[2019])
+    single.rose_type, single.rose_layout, single.width, single.height = ["default"], [1, 1], 600, 600
+    single.png_file_path = str(tmp_path / "2019_single.png")
+    single.create_wind_rose()
+    with Image.open(outputs[1]) as batch_image, Image.open(single.png_file_path) as single_image:
+        assert np.array_equal(np.asarray(batch_image), np.asarray(single_image))
@@ -0,0 +1,70 @@
+import pytest
+import numpy as np
+import pandas as pd
+from PIL import Image
+from __params__ import r_type_size_dict
+from functions import get_rose_types_and_layouts, replace_calms, make_image_transparent
+
+pytest.importorskip("matplotlib")
+from mpl_windrose import MplWindRose
+
+
+def test_create_wind_rose(tmp_path):
+    rng = np.random.default_rng(1)
+    periods = 24 * 365
+    wind_df = pd.DataFrame({
+        "ws": rng.gamma(2, 2, periods),
+        "wd": rng.uniform(0, 360, periods),
+        "date": pd.date_range(start=pd.to_datetime("2019/01/01"), freq='1H', periods=periods)
+    })
+    wind_df = replace_calms(wind_df, 0.5)
+    rose_types, rose_layouts = get_rose_types_and_layouts(True, False, True, False, False)
+    for r_type, layout in zip(rose_types, rose_layouts):
+        wind_rose = MplWindRose(data=wind_df)
+        wind_rose.rose_type = r_type
+        wind_rose.rose_layout = layout
+        wind_rose.width, wind_rose.height = r_type_size_dict.get("_".join(r_type))
+        wind_rose.png_file_path = str(tmp_path / ("_".join(r_type) + ".png"))
+        wind_rose.create_wind_rose()
+        with Image.open(wind_rose.png_file_path) as img:
+            assert img.size == tuple(r_type_size_dict.get("_".join(r_type)))
+
+
+def make_rose(tmp_path, file_name, transparent_name=None):
+    rng = np.random.default_rng(1)
+    periods = 24 * 90
+    wind_df = replace_calms(pd.DataFrame({
+        "ws": rng.gamma(2, 2, periods),
+        "wd": rng.uniform(0, 360, periods),
+        "date": pd.date_range(start=pd.to_datetime("2019/01/01"), freq='1h', periods=periods)
+    }), 0.5)
+    wind_rose = MplWindRose(data=wind_df)
+    wind_rose.rose_layout = [1, 1]
+    wind_rose.width, wind_rose.height = 400, 400
+    wind_rose.png_file_path = str(tmp_path / file_name)
+    wind_rose.transparent_file_path = str(tmp_path / transparent_name) if transparent_name else None
+    wind_rose.create_wind_rose()
+    return wind_rose
+
+
+def test_transparent_from_same_render(tmp_path):
+    make_rose(tmp_path, "plain.png")
+    make_rose(tmp_path, "rose.png", "rose_transparent.png")
+    with Image.open(tmp_path / "plain.png") as plain, Image.open(tmp_path / "rose.png") as rose:
+        assert np.array_equal(np.array(plain.convert("RGBA")), np.array(rose.convert("RGBA")))
+    expected = make_image_transparent(str(tmp_path / "plain.png"))
+    with Image.open(expected) as expected_img, Image.open(tmp_path / "rose_transparent.png") as transparent:
+        assert np.array_equal(np.array(expected_img), np.array(transparent))
+
+
+@pytest.mark.parametrize("image_format", ["svg", "pdf"])
+def test_transparent_vector_formats(tmp_path, image_format):
+    make_rose(tmp_path, f"rose.{image_format}", f"rose_transparent.{image_format}")
+    opaque = (tmp_path / f"rose.{image_format}").read_bytes()
+    transparent = (tmp_path / f"rose_transparent.{image_format}").read_bytes()
+    if image_format == "svg":
+        assert b'<rect width="100%" height="100%" fill="white"/>' in opaque
+        assert opaque.replace(b'\n<rect width="100%" height="100%" fill="white"/>', b"") == transparent
+    else:
+        assert opaque == transparent and opaque.startswith(b"%PDF")
+
@@ -0,0 +1,39 @@
+import csv
+import json
+import numpy as np
+from profiler import StageProfiler, profile_stage, profile_run, get_profiler
+
+
+def test_nested_stages(tmp_path):
+    profiler = StageProfiler()
+    with profiler.stage("outer", 10):
+        with profiler.stage("inner") as record:
+            data = np.ones(20_000_000)
+            record["rows"] = len(data)
+        del data
+    outer, inner = profiler.records
+    assert (outer["depth"], inner["depth"]) == (0, 1)
+    assert inner["rows"] == 20_000_000 and outer["rows"] == 10
+    assert outer["wall_seconds"] >= inner["wall_seconds"] > 0
+    if outer["peak_rss_mb"] is not None:
+        # the peak of the inner stage is kept by the outer stage
+        assert outer["peak_rss_mb"] >= inner["peak_rss_mb"] > 150
+
+    profiler.set_report_path(tmp_path, "station")
+    json_path, csv_path = profiler.write_report()
+    assert [x["stage"] for x in json.load(open(json_path))["stages"]] == ["outer", "inner"]
+    with open(csv_path, newline="") as f:
+        assert [x["rows"] for x in csv.DictReader(f)] == ["10", "20000000"]
+
+
+def test_profile_run_is_opt_in():
+    @profile_run
+    def run(**kwargs):
+        with profile_stage("stage") as record:
+            record["rows"] = 1
+        return get_profiler()
+
+    assert run() is None
+    profiler = run(profile=True)
+    assert [x["stage"] for x in profiler.records] == ["total", "stage"]
+    assert get_profiler() is None
@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+import pytest
+from compact import compact_wind_df
+from daylight import add_daylight_column, daylight_column
+
+pytest.importorskip("rpy2")
+import rpy2.robjects as ro
+from r_transfer import wind_df_to_r
+
+
+def make_wind_df(periods=24 * 10):
+    rng = np.random.default_rng(6)
+    wind_df = pd.DataFrame({
+        "ws": np.round(rng.gamma(2, 2, periods), 1),
+        "wd": np.round(rng.uniform(0, 360, periods)),
+        "date": pd.date_range(start=pd.to_datetime("2019/01/01"), freq="1h", periods=periods)
+    })
+    wind_df.loc[::7, "wd"] = np.nan
+    wind_df.loc[::5, "wd"] = -999
+    return wind_df
+
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_wind_df_to_r(compact):
+    wind_df = add_daylight_column(make_wind_df(), -34, 151)
+    if compact:
+        wind_df = compact_wind_df(wind_df)
+    original = wind_df.copy()
+    r_df = ro.vectors.DataFrame(wind_df_to_r(wind_df, [daylight_column]))
+    pd.testing.assert_frame_equal(wind_df, original)
+
+    assert list(r_df.names) == ["date", "ws", "wd", daylight_column]
+    assert r_df.nrow == len(wind_df)
+    assert np.allclose(np.asarray(r_df.rx2("ws")), wind_df["ws"].to_numpy(dtype=np.float64))
+    expected_wd = make_wind_df()["wd"].to_numpy()
+    assert np.array_equal(np.asarray(r_df.rx2("wd")), expected_wd, equal_nan=True)
+    assert list(ro.r["is.na"](r_df.rx2("wd"))) == list(np.isnan(expected_wd))
+
+    r_dates = r_df.rx2("date")
+    assert list(ro.r["class"](r_dates)) == ["POSIXct", "POSIXt"]
+    assert list(ro.r["attr"](r_dates, "tzone")) == ["UTC"]
+    # R sees the same clock times as the naive timestamps
+    formatted = list(ro.r["format"](r_dates, "%Y-%m-%d %H:%M:%S"))
+    assert formatted == list(wind_df["date"].dt.strftime("%Y-%m-%d %H:%M:%S"))
+
+    day_night = r_df.rx2(daylight_column)
+    assert list(ro.r["levels"](day_night)) == ["daylight", "nighttime"]
+    assert list(ro.r["as.character"](day_night)) == list(wind_df[daylight_column].astype(str))
+
+
+def test_daylight_types_need_day_night_column():
+    # openair's own daylight calculation would treat the station's local times as UTC
+    from rpy2_windrose import Rpy2WindRose
+    with pytest.raises(ValueError):
+        Rpy2WindRose(make_wind_df()).get_type_names(["season", "daylight"])
+    wind_rose = Rpy2WindRose(add_daylight_column(make_wind_df(), -34, 151))
+    assert wind_rose.get_type_names(["season", "daylight"]) == ["season", daylight_column]
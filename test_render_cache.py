@@ -0,0 +1,86 @@
+import os
+import numpy as np
+import pandas as pd
+import pytest
+import data_cache
+from functions import get_rose_types_and_layouts
+from render_cache import RenderCache, get_render_key
+
+attributes = dict(latitude=-34, longitude=151, categories=[0.5, 1, 2, 3], grid=10, ray_angle=30, max_frequency="NULL",
+                  rose_type=["default"], rose_layout=[1, 1], width=800, height=800, year_string="all_data",
+                  station="test", png_file_path="a.png")
+
+
+def make_wind_df(periods=24 * 30):
+    rng = np.random.default_rng(5)
+    return pd.DataFrame({"ws": rng.gamma(2, 2, periods), "wd": rng.uniform(0, 360, periods),
+                         "date": pd.date_range("2019-01-01", periods=periods, freq="h")})
+
+
+def test_render_key():
+    wind_df = make_wind_df()
+    key = get_render_key(wind_df, "R", attributes)
+    assert key == get_render_key(wind_df.copy(), "R", dict(attributes, png_file_path="b.png", station="other"))
+    assert key != get_render_key(wind_df, "matplotlib", attributes)
+    assert key != get_render_key(wind_df, "R", dict(attributes, ray_angle=45))
+    assert key != get_render_key(wind_df, "R", dict(attributes, categories=[0.5, 1, 2, 4]))
+    changed_df = wind_df.copy()
+    changed_df.loc[5, "wd"] = -999
+    assert key != get_render_key(changed_df, "R", attributes)
+
+
+def test_store_and_fetch(tmp_path):
+    image = tmp_path / "rose.png"
+    image.write_bytes(b"image")
+    cache = RenderCache(str(tmp_path / "renders"))
+    assert not cache.fetch("ab12", tmp_path / "out.png")
+    cache.store("ab12", image)
+    image.write_bytes(b"changed")
+    # a second cache object sees the manifest written by the first, and the cached image is a copy
+    assert RenderCache(str(tmp_path / "renders")).fetch("ab12", tmp_path / "out.png")
+    assert (tmp_path / "out.png").read_bytes() == b"image"
+
+    # a transparent version is only fetched once one has been stored
+    assert not cache.fetch("ab12", tmp_path / "out.png", tmp_path / "out_transparent.png")
+    transparent = tmp_path / "rose_transparent.png"
+    transparent.write_bytes(b"transparent")
+    cache.store("ab12", image, transparent)
+    assert cache.fetch("ab12", tmp_path / "out.png", tmp_path / "out_transparent.png")
+    assert (tmp_path / "out_transparent.png").read_bytes() == b"transparent"
+
+
+def test_rerun_renders_only_changed_roses(tmp_path, monkeypatch):
+    pytest.importorskip("matplotlib")
+    import main_wind_rose_function
+    monkeypatch.setattr(data_cache, "local_cache_dir", str(tmp_path / "cache"))
+    num_hours = 24 * 365 * 2
+    csv_file = tmp_path / "station.csv"
+    rng = np.random.default_rng(2)
+    pd.DataFrame({"ws": rng.gamma(2, 2, num_hours), "wd": rng.uniform(0, 360, num_hours)}).to_csv(csv_file, index=False)
+
+    rendered = []
+    get_wind_rose_class = main_wind_rose_function.get_wind_rose_class
+
+    def counting_get_wind_rose_class(backend):
+        rendered.append(backend)
+        return get_wind_rose_class(backend)
+    monkeypatch.setattr(main_wind_rose_function, "get_wind_rose_class", counting_get_wind_rose_class)
+
+    def run(output_folder, annual):
+        output_folder.mkdir()
+        rose_types, rose_layouts = get_rose_types_and_layouts(True, False, False, False, False)
+        return main_wind_rose_function.windrose_from_data(
+            data_source="csv", output_folder=str(output_folder), lat=-34, long=151, data_period=None, selected_hours=None,
+            ws_categories="0.5,1,2,3,4,5,7,10,15,20", grid_spacing=10, ray_angle=30, calms_threshold=0.5, max_freq=None,
+            file_prefix="test", rose_types=rose_types, rose_layouts=rose_layouts, annual=annual, save_transparent=False,
+            database_source=False, csv_file=str(csv_file), header_lines=1, start_date="1/1/2018", start_hour=0,
+            num_hours=num_hours, ws_col="a", wd_col="b", backend="matplotlib", render_cache=True)
+
+    first = run(tmp_path / "first", False)
+    assert len(rendered) == 1
+    second = run(tmp_path / "second", True)
+    # only the new annual roses are rendered
+    assert len(rendered) == 3
+    assert len(second) == 3 and all(os.path.isfile(x) for x in second)
+    with open(first[0], "rb") as f, open(second[0], "rb") as g:
+        assert f.read() == g.read()
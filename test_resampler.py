@@ -0,0 +1,100 @@
+import numpy as np
+import pandas as pd
+import pytest
+import data_cache
+from functions import import_data
+from main_wind_rose_function import windrose_from_data
+from resampler import WindResampler, resample_chunks, import_data_resampled
+from wind_cube import load_or_build_wind_cube
+
+
+def make_minute_df(periods=60 * 24 * 3):
+    rng = np.random.default_rng(7)
+    wind_df = pd.DataFrame({
+        "ws": np.round(rng.gamma(2, 2, periods), 1),
+        "wd": np.round(rng.uniform(0, 360, periods)),
+        "date": pd.date_range(start=pd.to_datetime("2018/01/01"), freq="1min", periods=periods)
+    })
+    wind_df.loc[::53, "ws"] = np.nan
+    wind_df.loc[::41, "wd"] = np.nan
+    # a gap of a few hours
+    return wind_df.drop(index=range(600, 900)).reset_index(drop=True)
+
+
+def vector_average(wind_df, interval):
+    """ Reference average of the whole frame at once with pandas """
+    vector = wind_df["ws"].notna() & wind_df["wd"].notna()
+    df = pd.DataFrame({
+        "ws": wind_df["ws"],
+        "u": np.where(vector, wind_df["ws"] * np.sin(np.radians(wind_df["wd"])), 0),
+        "v": np.where(vector, wind_df["ws"] * np.cos(np.radians(wind_df["wd"])), 0),
+        "n": vector,
+        "date": wind_df["date"]
+    })
+    grouped = df.groupby(df["date"].dt.floor(interval))
+    sums = grouped[["u", "v", "n"]].sum()
+    wd = np.degrees(np.arctan2(sums["u"], sums["v"]))
+    wd = np.where(wd <= 0, wd + 360, wd)
+    wd[sums["n"].to_numpy() == 0] = np.nan
+    return pd.DataFrame({"ws": grouped["ws"].mean().to_numpy(), "wd": wd, "date": sums.index.to_numpy()})
+
+
+@pytest.mark.parametrize("chunk_size", [1, 59, 60, 1000, 10 ** 6])
+@pytest.mark.parametrize("interval", ["1h", "10min"])
+def test_chunks_match_whole_file(chunk_size, interval):
+    wind_df = make_minute_df()
+    chunks = (wind_df.iloc[i:i + chunk_size] for i in range(0, len(wind_df), chunk_size))
+    averaged = pd.concat(list(resample_chunks(chunks, interval)), ignore_index=True)
+    pd.testing.assert_frame_equal(averaged, vector_average(wind_df, interval))
+
+
+def test_vector_average_crosses_north():
+    resampler = WindResampler("1h")
+    chunk = pd.DataFrame({"ws": [2.0, 2.0], "wd": [350.0, 10.0],
+                          "date": pd.to_datetime(["2018-01-01 00:10", "2018-01-01 00:50"])})
+    assert resampler.add(chunk).empty
+    averaged = resampler.flush()
+    assert averaged["wd"].iloc[0] == pytest.approx(360)
+    assert averaged["ws"].iloc[0] == pytest.approx(2)
+    assert averaged["date"].iloc[0] == pd.Timestamp("2018-01-01")
+
+
+def test_chunks_out_of_order():
+    wind_df = make_minute_df().iloc[:180]
+    resampler = WindResampler("1h")
+    resampler.add(wind_df.iloc[120:])
+    with pytest.raises(ValueError):
+        resampler.add(wind_df.iloc[:120])
+
+
+def test_invalid_interval():
+    with pytest.raises(ValueError):
+        WindResampler("hourly")
+
+
+def test_import_data_resampled(tmp_path, monkeypatch):
+    monkeypatch.setattr(data_cache, "local_cache_dir", str(tmp_path / "cache"))
+    data_file = tmp_path / "066037.csv"
+    wind_df = make_minute_df()
+    pd.DataFrame({"Timestamp": wind_df["date"].dt.strftime("%d/%m/%Y %H:%M"),
+                  "Wind (1 minute) speed in km/h": wind_df["ws"] * 3.6,
+                  "Vector Average Wind Direction (in degrees)": wind_df["wd"]}).to_csv(data_file, index=False)
+
+    expected = vector_average(import_data("BOM", str(data_file), use_cache=False), "1h")
+    resampled = import_data_resampled("BOM", str(data_file), "1h", chunk_size=1000)
+    pd.testing.assert_frame_equal(resampled, expected)
+    # the averaged data is cached apart from the raw data
+    pd.testing.assert_frame_equal(import_data_resampled("BOM", str(data_file), "1h"), expected)
+    assert len(import_data("BOM", str(data_file))) == len(wind_df)
+
+    # the wind cube counts the averaged data, cached apart from the cube of the raw data
+    cube = load_or_build_wind_cube("BOM", str(data_file), -34, 151, resample="1h")
+    assert cube.counts.sum() == expected["ws"].notna().sum()
+    assert load_or_build_wind_cube("BOM", str(data_file), -34, 151).counts.sum() == wind_df["ws"].notna().sum()
+
+
+def test_store_with_resample_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        windrose_from_data("BOM", str(tmp_path), -34, 151, None, "0-23", "0.5,1,2,3,4,5,7,10,15,20", 10, 30, 0.5, None,
+                           None, [["default"]], [[1, 1]], False, False, station_id="066037", database_source=True,
+                           use_store=True, resample="1h")
@@ -0,0 +1,154 @@
+import io
+import json
+import os
+import threading
+import time
+import zipfile
+from collections import OrderedDict
+import urllib.error
+import urllib.request
+import pytest
+import data_cache
+from benchmarks.synthetic import write_station_csv
+from service import RequestCoalescer, WindRoseService, create_server, get_request_options
+
+pytest.importorskip("matplotlib")
+
+
+@pytest.fixture
+def service_url(tmp_path, monkeypatch):
+    monkeypatch.setattr(data_cache, "local_cache_dir", str(tmp_path / "cache"))
+    monkeypatch.setattr(data_cache, "memory_cache_size", 0)
+    monkeypatch.setattr(data_cache, "_memory_cache", OrderedDict())
+    bom_dir = tmp_path / "bom"
+    bom_dir.mkdir()
+    os.rename(write_station_csv(str(tmp_path), "BOM", years=2), bom_dir / "066037_60min.csv")
+    service = WindRoseService({"BOM": str(bom_dir)}, backend="matplotlib")
+    server = create_server(service, port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+    service.close()
+
+
+location = {"lat": -27, "long": 153}
+
+
+def post(url, params):
+    request = urllib.request.Request(url, json.dumps(params).encode(), {"Content-Type": "application/json"})
+    with urllib.request.urlopen(request) as response:
+        return response.headers["Content-Type"], response.read()
+
+
+def get_json(url):
+    with urllib.request.urlopen(url) as response:
+        return json.loads(response.read())
+
+
+def test_request_options():
+    options = get_request_options({"data_source": "BOM", "station_id": "066037", "seasons": True}, {"BOM": "bom_dir"})
+    assert options["rose_types"] == [["season"]] and options["rose_layouts"] == [[2, 2]]
+    assert options["database_source"] and options["data_location"] == "bom_dir" and options["backend"] == "R"
+    options = get_request_options({"data_source": "BOM", "station_id": "066037", "rose_types": [["month"]],
+                                   "rose_layouts": [[3, 4]], "ray_angle": 22.5}, {"BOM": "bom_dir"}, "matplotlib")
+    assert options["rose_types"] == [["month"]] and options["ray_angle"] == 22.5 and options["backend"] == "matplotlib"
+
+
+@pytest.mark.parametrize("params", [
+    {"data_source": "DES", "station_id": "066037"},
+    {"data_source": "csv", "csv_file": "/etc/passwd"},
+    {"data_source": "BOM", "station_id": "066037", "output_folder": "x"},
+    {"data_source": "BOM", "station_id": "066037", "render_workers": 4},
+    {"data_source": "BOM", "station_id": "066037", "profile": True},
+    {"data_source": "BOM", "station_id": "../066037"},
+    {"data_source": "BOM", "station_id": "066037", "ray_angle": "30"},
+    {"data_source": "BOM", "station_id": "066037", "lat": True},
+    {"data_source": "BOM", "station_id": "066037", "rose_types": [["month"]]},
+    {"data_source": "BOM", "station_id": "066037", "backend": "Excel"},
+    ["BOM", "066037"]
+])
+def test_request_options_rejected(params):
+    with pytest.raises(ValueError):
+        get_request_options(params, {"BOM": "bom_dir"})
+
+
+def test_coalesce_identical_requests():
+    coalescer = RequestCoalescer()
+    started = threading.Event()
+    calls = []
+
+    def slow_run():
+        calls.append(1)
+        started.set()
+        time.sleep(0.3)
+        return "result"
+
+    results = []
+    first = threading.Thread(target=lambda: results.append(coalescer.run("a", slow_run)))
+    first.start()
+    started.wait()
+    others = [threading.Thread(target=lambda: results.append(coalescer.run("a", slow_run))) for _ in range(3)]
+    for thread in others:
+        thread.start()
+    for thread in [first] + others:
+        thread.join()
+    assert results == ["result"] * 4
+    assert len(calls) == 1 and coalescer.coalesced == 3
+    # the next request once the first has finished is run again
+    assert coalescer.run("a", slow_run) == "result" and len(calls) == 2
+
+
+def test_runs_on_render_thread(monkeypatch):
+    import main_wind_rose_function
+    threads = []
+    monkeypatch.setattr(main_wind_rose_function, "init_render_worker",
+                        lambda warm_r: threads.append(threading.current_thread()))
+    monkeypatch.setattr(main_wind_rose_function, "windrose_from_data",
+                        lambda **kwargs: threads.append(threading.current_thread()) or [])
+    service = WindRoseService({"BOM": "bom_dir"}, backend="matplotlib")
+    requests = [threading.Thread(target=service.run_request, args=({"data_source": "BOM", "station_id": str(i),
+                                                                    "lat": -34, "long": 151}, True)) for i in range(4)]
+    for request in requests:
+        request.start()
+    for request in requests:
+        request.join()
+    service.close()
+    # R is started and every run is made on the one render thread
+    assert len(threads) == 5 and set(threads) == {service.render_thread}
+    assert service.runs == 4
+
+
+def test_service(service_url):
+    assert get_json(service_url + "/stations?data_source=BOM&prefix=0660") == ["066037"]
+
+    # BOM stations have no coordinates in the catalogue, so a request must give them
+    with pytest.raises(urllib.error.HTTPError) as error:
+        post(service_url + "/windrose", {"data_source": "BOM", "station_id": "066037"})
+    assert error.value.code == 400 and "'lat' and 'long'" in json.loads(error.value.read())["error"]
+
+    content_type, image = post(service_url + "/windrose", {"data_source": "BOM", "station_id": "066037", **location})
+    assert content_type == "image/png" and image.startswith(b"\x89PNG")
+    health = get_json(service_url + "/health")
+    assert health["runs"] == 1 and health["stations_in_memory"] == 1
+
+    content_type, archive = post(service_url + "/windrose", {"data_source": "BOM", "station_id": "066037",
+                                                            "annual": True, **location})
+    assert content_type == "application/zip"
+    assert zipfile.ZipFile(io.BytesIO(archive)).namelist() == ["066037_default_all_data.png", "066037_default_2000.png",
+                                                                "066037_default_2001.png"]
+
+    content_type, tables = post(service_url + "/tables", {"data_source": "BOM", "station_id": "066037", "seasons": True,
+                                                         **location})
+    tables = json.loads(tables)
+    assert list(tables) == ["066037_season_all_data"]
+    assert {"season", "wd", "count", "calm"} <= set(tables["066037_season_all_data"][0])
+
+    with pytest.raises(urllib.error.HTTPError) as error:
+        post(service_url + "/windrose", {"data_source": "BOM", "station_id": "unknown"})
+    assert error.value.code == 404 and "unknown" in json.loads(error.value.read())["error"]
+    with pytest.raises(urllib.error.HTTPError) as error:
+        post(service_url + "/windrose", {"data_source": "BOM", "station_id": "066037", "csv_file": "/etc/passwd",
+                                         **location})
+    assert error.value.code == 400 and "csv_file" in json.loads(error.value.read())["error"]
@@ -0,0 +1,67 @@
+import os
+import pytest
+import pandas as pd
+import station_catalogue
+from station_catalogue import StationCatalogue
+from functions import get_data_source, list_stations
+
+
+@pytest.fixture
+def databases(tmp_path):
+    epav_dir = tmp_path / "EPAV"
+    epav_dir.mkdir()
+    pd.DataFrame({"Station Name": ["Alphington", "Altona North", "Footscray"],
+                  "File Name": ["Alphington.csv", "Altona_North.csv", "Footscray.csv"],
+                  "Latitude": [-37.78, -37.84, -37.80], "Longitude": [145.03, 144.86, 144.87]}).to_csv(
+        epav_dir / "__station_list_complete.csv", index=False)
+    bom_dir = tmp_path / "BOM"
+    bom_dir.mkdir()
+    for station in ["066037", "066062"]:
+        (bom_dir / f"{station}_60min.csv").write_text("")
+    return str(epav_dir), str(bom_dir)
+
+
+def test_lookup_and_search(databases, tmp_path):
+    epav_dir, bom_dir = databases
+    catalogue = StationCatalogue(str(tmp_path / "cache"))
+    assert catalogue.get_data_file("EPAV", epav_dir, "Alphington") == os.path.join(epav_dir, "Alphington.csv")
+    assert catalogue.get_data_file("EPAV", epav_dir, "altona north") == os.path.join(epav_dir, "Altona_North.csv")
+    assert catalogue.get_data_file("BOM", bom_dir, "066062") == os.path.join(bom_dir, "066062_60min.csv")
+    assert catalogue.search("EPAV", epav_dir, "al") == ["Alphington", "Altona North"]
+    assert catalogue.search("BOM", bom_dir, "0660") == ["066037", "066062"]
+    assert catalogue.list_stations("EPAV", epav_dir) == ["Alphington", "Altona North", "Footscray"]
+    assert catalogue.get_station("EPAV", epav_dir, "Footscray")["latitude"] == -37.80
+    with pytest.raises(ValueError):
+        catalogue.get_data_file("EPAV", epav_dir, "Geelong")
+    with pytest.raises(FileNotFoundError):
+        catalogue.get_data_file("BOM", bom_dir, "000000")
+
+
+def test_index_reused_until_listing_changes(databases, tmp_path, monkeypatch):
+    epav_dir, bom_dir = databases
+    cache_dir = str(tmp_path / "cache")
+    StationCatalogue(cache_dir).list_stations("EPAV", epav_dir)
+    assert os.path.isfile(os.path.join(cache_dir, "station_catalogue.json"))
+
+    # a new process reuses the saved index without reading the station list
+    reads = []
+    read_station_entries = station_catalogue.read_station_entries
+    monkeypatch.setattr(station_catalogue, "read_station_entries", lambda *args: reads.append(args) or read_station_entries(*args))
+    catalogue = StationCatalogue(cache_dir)
+    assert catalogue.get_data_file("EPAV", epav_dir, "Footscray") == os.path.join(epav_dir, "Footscray.csv")
+    assert reads == []
+
+    # a station added to the folder is found straight away, without waiting for the refresh interval
+    (tmp_path / "BOM" / "066214_60min.csv").write_text("")
+    os.utime(bom_dir, ns=(0, 0))
+    catalogue.list_stations("BOM", bom_dir)
+    (tmp_path / "BOM" / "066999_60min.csv").write_text("")
+    os.utime(bom_dir, ns=(1, 1))
+    assert catalogue.get_data_file("BOM", bom_dir, "066999") == os.path.join(bom_dir, "066999_60min.csv")
+
+
+def test_functions_use_catalogue(databases, tmp_path, monkeypatch):
+    epav_dir, bom_dir = databases
+    monkeypatch.setattr(station_catalogue, "_catalogue", StationCatalogue(str(tmp_path / "cache")))
+    assert get_data_source("EPAV", epav_dir, "Alphington") == os.path.join(epav_dir, "Alphington.csv")
+    assert list_stations("BOM", bom_dir) == ["066037", "066062"]
@@ -0,0 +1,63 @@
+import os
+import numpy as np
+import pandas as pd
+import pytest
+import data_cache
+from functions import import_data, slice_by_custom_dates
+from station_store import StationStore, write_station_store, open_station_store, convert_station, get_store_path
+
+
+def make_wind_df(periods=24 * 365 * 2, freq='1H'):
+    rng = np.random.default_rng(4)
+    wind_df = pd.DataFrame({
+        "ws": np.round(rng.gamma(2, 2, periods), 1),
+        "wd": np.round(rng.uniform(0, 360, periods)),
+        "date": pd.date_range(start=pd.to_datetime("2018/01/01"), freq=freq, periods=periods)
+    })
+    wind_df.loc[::97, "ws"] = np.nan
+    wind_df.loc[::89, "wd"] = np.nan
+    return wind_df
+
+
+@pytest.mark.parametrize("data_period", [None, "1/3/2018-31/3/2018", "15/6/2019", "1/1/2017-1/1/2018"])
+def test_read_period_matches_slice(tmp_path, data_period):
+    wind_df = make_wind_df()
+    store = StationStore(write_station_store(wind_df, str(tmp_path / "station.wrs")))
+    assert store.resolution_seconds == 3600
+    expected = slice_by_custom_dates(wind_df, data_period).reset_index(drop=True)
+    pd.testing.assert_frame_equal(store.read_period(data_period), expected, check_exact=False, rtol=1e-6)
+
+
+def test_query_is_zero_copy(tmp_path):
+    store = StationStore(write_station_store(make_wind_df(), str(tmp_path / "station.wrs")))
+    times, ws, wd = store.query(pd.Timestamp("2019-02-01"), pd.Timestamp("2019-02-28 23:00"))
+    assert len(times) == 28 * 24
+    assert np.shares_memory(times, store.times) and np.shares_memory(ws, store.ws) and np.shares_memory(wd, store.wd)
+
+
+def test_minute_resolution(tmp_path):
+    wind_df = make_wind_df(periods=60 * 24 * 3, freq='1min')
+    store = StationStore(write_station_store(wind_df, str(tmp_path / "station.wrs")))
+    assert store.resolution_seconds == 60
+    period_df = store.to_wind_df(pd.Timestamp("2018-01-02 06:30"), pd.Timestamp("2018-01-02 07:29"))
+    assert len(period_df) == 60
+    assert period_df["date"].iloc[0] == pd.Timestamp("2018-01-02 06:30")
+
+
+def test_convert_station(tmp_path, monkeypatch):
+    monkeypatch.setattr(data_cache, "local_cache_dir", str(tmp_path / "cache"))
+    data_file = tmp_path / "Alphington.csv"
+    wind_df = make_wind_df(periods=24 * 60)
+    pd.DataFrame({"Date": wind_df["date"].dt.strftime("%d/%m/%Y %H:%M"), "WS (m/s)": wind_df["ws"],
+                  "WD (deg)": wind_df["wd"]}).to_csv(data_file, index=False)
+
+    assert open_station_store("EPAV", str(data_file)) is None
+    store_path = convert_station("EPAV", str(data_file))
+    assert store_path == get_store_path("EPAV", str(data_file))
+    assert store_path.endswith(os.path.join("EPAV", "Alphington.wrs"))
+    store = open_station_store("EPAV", str(data_file))
+    pd.testing.assert_frame_equal(store.to_wind_df(), import_data("EPAV", str(data_file)), check_exact=False, rtol=1e-6)
+
+    # a changed source file makes the store out of date
+    os.utime(data_file, ns=(0, 0))
+    assert open_station_store("EPAV", str(data_file)) is None
@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+import pytest
+import data_cache
+import timestamp_parsing
+from timestamp_parsing import detect_timestamp_format, get_source_format, parse_timestamps, read_wind_csv
+
+
+@pytest.fixture(autouse=True)
+def local_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(data_cache, "local_cache_dir", str(tmp_path / "cache"))
+    monkeypatch.setattr(timestamp_parsing, "_source_formats", {})
+
+
+@pytest.mark.parametrize("samples, expected", [
+    (["13/01/2020 00:00", "13/01/2020 01:00"], "%d/%m/%Y %H:%M"),
+    (["01/02/2020 00:00:00", "01/02/2020 01:00:00"], "%d/%m/%Y %H:%M:%S"),
+    (["2020-01-13 00:00:00", "2020-01-13 01:00:00"], "%Y-%m-%d %H:%M:%S"),
+    (["13/01/2020 1:00:00 PM"], "%d/%m/%Y %I:%M:%S %p"),
+    (["not a date"], None)
+])
+def test_detect_timestamp_format(samples, expected):
+    assert detect_timestamp_format(pd.Series(samples)) == expected
+
+
+def test_source_format_cached(tmp_path):
+    assert get_source_format("EPAV", pd.Series(["13/01/2020 00:00"])) == "%d/%m/%Y %H:%M"
+    # a new process reads the format from the local cache folder
+    timestamp_parsing._source_formats.clear()
+    assert timestamp_parsing.load_source_formats() == {"EPAV": "%d/%m/%Y %H:%M"}
+    # a file that no longer matches the cached format is detected again
+    assert get_source_format("EPAV", pd.Series(["2020-01-13 00:00"])) == "%Y-%m-%d %H:%M"
+
+
+def test_parse_timestamps_falls_back():
+    values = pd.Series(["13/01/2020 00:00", "13/01/2020 01:00", "2020-01-13 02:00:00", None])
+    parsed = parse_timestamps(values, "%d/%m/%Y %H:%M")
+    assert list(parsed[:3]) == list(pd.date_range("2020-01-13", periods=3, freq="h"))
+    assert pd.isna(parsed[3])
+
+
+@pytest.mark.parametrize("timestamp_format", ["%d/%m/%Y %H:%M", "%Y-%m-%d %H:%M:%S"])
+@pytest.mark.parametrize("engine", ["c", "pyarrow"])
+def test_read_wind_csv_matches_parse_dates(tmp_path, engine, timestamp_format):
+    if engine == "pyarrow":
+        pytest.importorskip("pyarrow")
+    data_file = tmp_path / "station.csv"
+    dates = pd.date_range(start="2019-12-30", freq='1H', periods=24 * 40)
+    rng = np.random.default_rng(1)
+    pd.DataFrame({"Date": dates.strftime(timestamp_format), "Site": "x", "WS (m/s)": rng.gamma(2, 2, len(dates)),
+                  "WD (deg)": rng.uniform(0, 360, len(dates))}).to_csv(data_file, index=False)
+    expected = pd.read_csv(data_file, parse_dates=['Date'], dayfirst=timestamp_format.startswith("%d"))[['Date', 'WS (m/s)', 'WD (deg)']]
+    df = read_wind_csv(str(data_file), "EPAV", "Date", ["WS (m/s)", "WD (deg)"], engine=engine)
+    pd.testing.assert_frame_equal(df[['Date', 'WS (m/s)', 'WD (deg)']], expected)
+
+
+def test_parse_fixed_width():
+    values = pd.Series(["29/02/2020 23:59:59", "31/12/1969 00:00:00", "30/02/2020 00:00:00", "1/03/2020 00:00:00",
+                        "01/03/2020 00:00:001", "xx/03/2020 00:00:00"])
+    parsed = timestamp_parsing.parse_fixed_width(values, "%d/%m/%Y %H:%M:%S")
+    assert list(parsed[:2]) == [np.datetime64("2020-02-29T23:59:59"), np.datetime64("1969-12-31T00:00:00")]
+    assert np.isnat(parsed[2:]).all()
+
+
+@pytest.mark.parametrize("timestamp_format", ["%Y-%m-%d %H:%M:%S", "%d/%m/%Y %I:%M %p"])
+def test_read_wind_csv_odd_rows(tmp_path, timestamp_format):
+    data_file = tmp_path / "station.csv"
+    dates = pd.date_range(start="2019-12-30", freq='1H', periods=300)
+    timestamps = list(dates.strftime(timestamp_format))
+    timestamps[250] = dates[250].strftime("%d/%m/%Y %H:%M")
+    pd.DataFrame({"Date": timestamps, "WS (m/s)": 1.0, "WD (deg)": 90}).to_csv(data_file, index=False)
+    df = read_wind_csv(str(data_file), "DES", "Date", ["WS (m/s)", "WD (deg)"], engine="c")
+    assert list(df["Date"]) == list(dates)
@@ -0,0 +1,131 @@
+import os
+import pytest
+import numpy as np
+import pandas as pd
+import data_cache
+import main_wind_rose_function
+from __params__ import r_type_size_dict
+from functions import replace_calms, filter_df_by_hours
+from windrose_frequencies import calculate_windrose_frequencies
+from wind_cube import WindCube, get_cube_period, load_or_build_wind_cube
+
+categories = [0.5, 1, 2, 3, 4, 5, 7, 10, 15, 20]
+
+
+def make_wind_df(periods=24 * 365 * 2, seed=0):
+    # whole degree directions and 0.1 m/s speeds, as recorded by the met databases
+    rng = np.random.default_rng(seed)
+    wind_df = pd.DataFrame({
+        "ws": np.round(rng.gamma(2, 2, periods), 1),
+        "wd": np.round(rng.uniform(0, 360, periods)),
+        "date": pd.date_range(start=pd.to_datetime("2018/01/01"), freq='1H', periods=periods)
+    })
+    wind_df.loc[::97, "ws"] = np.nan
+    wind_df.loc[::89, "wd"] = np.nan
+    return wind_df
+
+
+def assert_tables_equal(cube_table, table):
+    # column names included - the last speed interval is labelled from the maximum speed in both tables
+    assert list(cube_table.columns) == list(table.columns)
+    pd.testing.assert_frame_equal(cube_table, table, check_dtype=False)
+
+
+@pytest.mark.parametrize("rose_type", [x.split("_") for x in r_type_size_dict])
+def test_cube_matches_frequencies(rose_type):
+    wind_df = make_wind_df()
+    cube = WindCube.from_wind_df(wind_df, -34, 151)
+    table = calculate_windrose_frequencies(replace_calms(wind_df.copy(), 0.5), rose_type, 30, categories, -34, 151)
+    assert_tables_equal(cube.frequency_table(rose_type, 30, categories, 0.5), table)
+
+
+def test_cube_slices_match_frequencies():
+    wind_df = make_wind_df()
+    cube = WindCube.from_wind_df(wind_df, -34, 151)
+    new_categories = [1, 2.5, 5, 10]
+    hours = [0, 1, 2, 3, 18, 19, 20, 21, 22, 23]
+    sliced_df = filter_df_by_hours(wind_df.loc[wind_df["date"].dt.year == 2019].copy(), hours)
+    table = calculate_windrose_frequencies(replace_calms(sliced_df, 1), ["season"], 45, new_categories)
+    assert_tables_equal(cube.frequency_table(["season"], 45, new_categories, 1, hours=hours, years=[2019]), table)
+    assert_tables_equal(cube.frequency_table(["season"], 45, new_categories, 1, hours=hours, period=((2019, 1), (2019, 12))),
+                        table)
+
+
+def test_cube_labels_last_interval_from_maximum_speed():
+    wind_df = make_wind_df(periods=24 * 60)
+    wind_df.loc[10, ["ws", "wd"]] = [27.13, 90]
+    cube = WindCube.from_wind_df(wind_df, -34, 151)
+    table = calculate_windrose_frequencies(replace_calms(wind_df.copy(), 0.5), ["default"], 30, categories, -34, 151)
+    cube_table = cube.frequency_table(["default"], 30, categories, 0.5)
+    assert "20 to 27.13" in cube_table.columns
+    assert_tables_equal(cube_table, table)
+
+
+def test_get_cube_period():
+    assert get_cube_period(None) is None
+    assert get_cube_period("1/1/2019-31/12/2019") == ((2019, 1), (2019, 12))
+    assert get_cube_period("1/2/2019-29/2/2020") == ((2019, 2), (2020, 2))
+    assert get_cube_period("5/1/2019-31/12/2019") is False
+    assert get_cube_period("1/1/2019") is False
+
+
+def test_load_or_build_wind_cube(tmp_path, monkeypatch):
+    monkeypatch.setattr(data_cache, "local_cache_dir", str(tmp_path / "cache"))
+    data_file = tmp_path / "station.csv"
+    data_file.write_text("placeholder")
+    wind_df = make_wind_df(periods=24 * 60)
+
+    cube = load_or_build_wind_cube("EPAV", str(data_file), -34, 151, wind_df)
+    loaded = load_or_build_wind_cube("EPAV", str(data_file), -34, 151)
+    assert np.array_equal(cube.codes, loaded.codes) and np.array_equal(cube.counts, loaded.counts)
+    assert np.array_equal(cube.max_ws, loaded.max_ws) and cube.max_ws.max() == wind_df["ws"].max()
+    assert cube.dims == loaded.dims
+    assert cube.counts.sum() == wind_df["ws"].notna().sum()
+
+    # a changed source file invalidates the cached cube
+    os.utime(data_file, ns=(0, 0))
+    assert WindCube.load(data_cache.get_cache_path("EPAV", str(data_file), suffix="_cube_-34_151"),
+                         data_cache.get_file_signature(str(data_file))) is None
+
+
+def test_cube_is_exact_for():
+    cube = WindCube.from_wind_df(make_wind_df(periods=24), -34, 151)
+    assert cube.is_exact_for(30, categories, 0.5) and cube.is_exact_for(10, [0.3, 2.5], 0.2)
+    assert not cube.is_exact_for(22.5, categories, 0.5)
+    assert not cube.is_exact_for(30, categories, 0.25)
+    assert not cube.is_exact_for(30, [0.5, 1.25], 0.5)
+
+
+@pytest.mark.parametrize("ray_angle, ws_categories", [(30, "0.5,1,2,3,4,5,7,10,15,20"), (22.5, "0.5,1,2,3,4,5,7,10,15,20"),
+                                                      (30, "0.25,1,2,3,4,5,7,10,15,20")])
+def test_windrose_from_cube_stats_only(tmp_path, monkeypatch, ray_angle, ws_categories):
+    # ray angles and categories that do not line up with the cube bins are answered from the station data
+    monkeypatch.setattr(data_cache, "local_cache_dir", str(tmp_path / "cache"))
+    data_file = tmp_path / "station.csv"
+    wind_df = make_wind_df(periods=24 * 400)
+    source_df = pd.DataFrame({"Date": wind_df["date"].dt.strftime("%d/%m/%Y %H:%M"), "WS (m/s)": wind_df["ws"],
+                              "WD (deg)": wind_df["wd"]})
+    source_df.to_csv(data_file, index=False)
+    monkeypatch.setattr(main_wind_rose_function, "get_data_source", lambda source, location, station: str(data_file))
+    cube_runs = []
+    render_jobs_from_cube = main_wind_rose_function.render_jobs_from_cube
+    monkeypatch.setattr(main_wind_rose_function, "render_jobs_from_cube",
+                        lambda *args: cube_runs.append(1) or render_jobs_from_cube(*args))
+
+    def run(use_cube):
+        output_folder = tmp_path / ("cube" if use_cube else "data")
+        output_folder.mkdir()
+        return main_wind_rose_function.windrose_from_data(
+            data_source="EPAV", output_folder=str(output_folder), lat=-34, long=151, data_period="1/1/2018-31/12/2018",
+            selected_hours="6-18", ws_categories=ws_categories, grid_spacing=10, ray_angle=ray_angle,
+            calms_threshold=float(ws_categories.split(",")[0]), max_freq=None, file_prefix=None,
+            rose_types=[["default"], ["season", "daylight"]],
+            rose_layouts=[[1, 1], [2, 4]], annual=True, save_transparent=False, station_id="station",
+            database_source=True, stats_only=True, use_cube=use_cube)
+
+    from_data, from_cube = run(False), run(True)
+    assert len(cube_runs) == (ray_angle == 30 and ws_categories.startswith("0.5,"))
+    assert [os.path.basename(x) for x in from_cube] == [os.path.basename(x) for x in from_data]
+    for cube_file, data_file in zip(from_cube, from_data):
+        if cube_file.endswith(".csv"):
+            assert_tables_equal(pd.read_csv(cube_file), pd.read_csv(data_file))
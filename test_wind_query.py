@@ -0,0 +1,33 @@
+import numpy as np
+import pandas as pd
+import pytest
+from functions import slice_by_custom_dates, slice_by_custom_hours, replace_calms
+from wind_query import WindQuery, get_hour_mask
+
+
+def make_wind_df(periods=24 * 365 * 2):
+    rng = np.random.default_rng(6)
+    wind_df = pd.DataFrame({
+        "ws": rng.gamma(2, 2, periods),
+        "wd": rng.uniform(0, 360, periods),
+        "date": pd.date_range(start=pd.to_datetime("2018/01/01"), freq='1H', periods=periods)
+    })
+    wind_df.loc[::97, "ws"] = np.nan
+    return wind_df
+
+
+def test_get_hour_mask():
+    assert get_hour_mask(range(24)) == (1 << 24) - 1
+    assert get_hour_mask([0, 23]) == 1 | 1 << 23
+
+
+@pytest.mark.parametrize("data_period, selected_hours", [(None, None), (None, "0-23"), ("1/3/2018-31/3/2019", None),
+                                                         ("1/3/2018-31/3/2019", "0-6,18-23"), ("15/6/2019", "9,12")])
+def test_query_matches_chain(data_period, selected_hours):
+    wind_df = make_wind_df()
+    original = wind_df.copy()
+    result = WindQuery(wind_df).dates(data_period).hours(selected_hours).calms(0.5).run()
+    expected = replace_calms(slice_by_custom_hours(slice_by_custom_dates(original.copy(), data_period), selected_hours), 0.5)
+    pd.testing.assert_frame_equal(result, expected)
+    # the caller's frame is left unchanged
+    pd.testing.assert_frame_equal(wind_df, original)
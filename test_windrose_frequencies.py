@@ -0,0 +1,109 @@
+import pytest
+import numpy as np
+import pandas as pd
+from __params__ import r_type_size_dict
+from functions import replace_calms
+from windrose_frequencies import calculate_windrose_frequencies, get_sectors, write_frequency_tables
+
+categories = [0.5, 1, 2, 3, 4, 5, 7, 10, 15, 20]
+
+
+def make_wind_df(periods=24 * 365 * 2, seed=0, ws_decimals=None):
+    # ws_decimals rounds the speeds as the met databases record them, so many fall exactly on a break
+    rng = np.random.default_rng(seed)
+    ws = rng.gamma(2, 2, periods)
+    wind_df = pd.DataFrame({
+        "ws": ws if ws_decimals is None else np.round(ws, ws_decimals),
+        "wd": rng.uniform(0, 360, periods),
+        "date": pd.date_range(start=pd.to_datetime("2018/01/01"), freq='1H', periods=periods)
+    })
+    wind_df.loc[::97, "ws"] = np.nan
+    return replace_calms(wind_df, categories[0])
+
+
+def test_get_sectors():
+    assert list(get_sectors(30)) == list(range(30, 361, 30))
+    assert list(get_sectors(45)) == list(range(45, 361, 45))
+    assert len(get_sectors(22.5)) == 16
+
+
+def test_frequencies_default():
+    wind_df = pd.DataFrame({
+        "ws": [0.2, 1.5, 1.5, 3.5, 25, np.nan],
+        "wd": [-999, 10, 350, 100, 200, 90],
+        "date": pd.date_range(start=pd.to_datetime("2020/01/01"), freq='1H', periods=6)
+    })
+    table = calculate_windrose_frequencies(wind_df, ["default"], 30, categories)
+    assert len(table) == 12
+    assert (table["count"] == 5).all()
+    assert table["calm"].iloc[0] == pytest.approx(20)
+    north = table.loc[table["wd"] == 360].iloc[0]
+    assert north["1 to 2"] == pytest.approx(40)
+    assert table.loc[table["wd"] == 90, "3 to 4"].iloc[0] == pytest.approx(20)
+    assert table.loc[table["wd"] == 210, "20 to 25"].iloc[0] == pytest.approx(20)
+    assert table["total"].sum() + table["calm"].iloc[0] == pytest.approx(100)
+
+
+def test_frequencies_right_closed_intervals():
+    # openair cuts the speeds into intervals closed on the right, and speeds at or below the first break are in none
+    wind_df = pd.DataFrame({
+        "ws": [0.5, 1, 1.0000001, 2, 5, 7, 0.3],
+        "wd": [10, 10, 10, 10, 10, 10, 10],
+        "date": pd.date_range(start=pd.to_datetime("2020/01/01"), freq='1H', periods=7)
+    })
+    north = calculate_windrose_frequencies(wind_df, ["default"], 30, categories).iloc[-1]
+    assert north["count"] == 7 and north["calm"] == 0
+    assert north["0.5 to 1"] == pytest.approx(100 / 7)
+    assert north["1 to 2"] == pytest.approx(200 / 7)
+    assert north["4 to 5"] == pytest.approx(100 / 7) and north["5 to 7"] == pytest.approx(100 / 7)
+    assert north["total"] == pytest.approx(500 / 7)
+
+
+@pytest.mark.parametrize("rose_type", [x.split("_") for x in r_type_size_dict])
+def test_frequencies_sum_to_100(rose_type):
+    wind_df = make_wind_df()
+    table = calculate_windrose_frequencies(wind_df, rose_type, 30, categories)
+    panels = table.groupby(rose_type, sort=False)
+    assert np.allclose(panels["total"].sum() + panels["calm"].first(), 100)
+    assert panels["count"].first().sum() == wind_df["ws"].notna().sum()
+
+
+def test_write_frequency_tables(tmp_path):
+    table = calculate_windrose_frequencies(make_wind_df(periods=48), ["default"], 30, categories)
+    csv_file, json_file = write_frequency_tables(table, str(tmp_path / "station_default_all_data.png"))
+    assert csv_file.endswith("station_default_all_data_frequencies.csv")
+    assert json_file.endswith("station_default_all_data_frequencies.json")
+    assert len(pd.read_csv(csv_file)) == len(table)
+    assert len(pd.read_json(json_file)) == len(table)
+
+
+@pytest.mark.parametrize("rose_type", [x.split("_") for x in r_type_size_dict])
+def test_frequencies_match_openair(rose_type):
+    pytest.importorskip("rpy2")
+    import rpy2.robjects as ro
+    from rpy2.robjects import pandas2ri
+    from rpy2.robjects.conversion import localconverter
+    from r_runtime import get_r_runtime
+
+    r_runtime = get_r_runtime()
+    wind_df = make_wind_df(ws_decimals=1)
+    with localconverter(ro.default_converter + pandas2ri.converter):
+        r_df = ro.conversion.py2rpy(wind_df)
+    result = r_runtime.openair.windRose(mydata=r_df, type=ro.StrVector(rose_type), angle=30, breaks=ro.FloatVector(categories),
+                                        latitude=-34, longitude=151, hemisphere="southern", plot=False)
+    with localconverter(ro.default_converter + pandas2ri.converter):
+        openair_df = ro.conversion.rpy2py(result.rx2("data"))
+
+    table = calculate_windrose_frequencies(wind_df, rose_type, 30, categories, -34, 151)
+    interval_cols = [x for x in table.columns if " to " in x]
+    openair_df = openair_df.loc[openair_df["wd"] > 0]
+    for col in rose_type:
+        if col != "default":
+            openair_df[col] = openair_df[col].astype(str)
+    merged = table.merge(openair_df, on=[x for x in rose_type if x != "default"] + ["wd"], how="inner")
+    assert len(merged) == len(table)
+    # openair reports the intervals cumulatively
+    cumulative = merged[interval_cols].cumsum(axis=1).to_numpy()
+    openair_cumulative = merged[[f"Interval{i + 1}" for i in range(len(interval_cols))]].to_numpy()
+    tolerance = 0.5 if "daylight" in rose_type else 1e-6
+    assert np.allclose(cumulative, openair_cumulative, atol=tolerance)
@@ -0,0 +1,267 @@
+import json
+import os
+import re
+import numpy as np
+import pandas as pd
+import data_cache
+
+# day first formats are tried before year first ones, matching the dayfirst parsing used for the databases
+candidate_formats = [
+    "%d/%m/%Y %H:%M",
+    "%d/%m/%Y %H:%M:%S",
+    "%d/%m/%Y %I:%M:%S %p",
+    "%d/%m/%Y %I:%M %p",
+    "%d-%m-%Y %H:%M",
+    "%d-%m-%Y %H:%M:%S",
+    "%d/%m/%y %H:%M",
+    "%d/%m/%Y",
+    "%Y-%m-%d %H:%M:%S",
+    "%Y-%m-%d %H:%M",
+    "%Y-%m-%dT%H:%M:%S",
+    "%Y/%m/%d %H:%M:%S",
+    "%Y/%m/%d %H:%M",
+    "%Y-%m-%d"
+]
+
+# number of rows read to detect the timestamp format of a file
+sample_rows = 200
+
+# zero padded fields that can be read straight from the bytes of fixed width timestamps
+fixed_width_fields = {"%Y": 4, "%m": 2, "%d": 2, "%H": 2, "%M": 2, "%S": 2}
+
+# ISO 8601 formats are parsed with the ISO 8601 fast paths of pandas and pyarrow rather than their strptime format
+iso_formats = {"%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M", "%Y-%m-%dT%H:%M:%S", "%Y-%m-%d"}
+
+_source_formats = {}
+
+
+def get_formats_path() -> str:
+    return os.path.join(data_cache.local_cache_dir, "timestamp_formats.json")
+
+
+def load_source_formats() -> dict:
+    """
+    Returns the timestamp format detected for each data source, from memory or the local cache folder
+    :return: dictionary of data source to format string
+    """
+    if not _source_formats:
+        try:
+            with open(get_formats_path()) as f:
+                _source_formats.update(json.load(f))
+        except (OSError, ValueError):
+            pass
+    return _source_formats
+
+
+def save_source_format(data_source: str,
+                       timestamp_format: str):
+    """
+    Records the timestamp format of a data source in memory and in the local cache folder
+    :param data_source: Database identifier - BOM or OEH etc.
+    :param timestamp_format: strptime format string
+    """
+    formats = load_source_formats()
+    if formats.get(data_source) == timestamp_format:
+        return
+    formats[data_source] = timestamp_format
+    try:
+        os.makedirs(os.path.dirname(get_formats_path()), exist_ok=True)
+        temp_path = get_formats_path() + f".{os.getpid()}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump(formats, f)
+        os.replace(temp_path, get_formats_path())
+    except OSError:
+        pass
+
+
+def matches_format(samples: pd.Series,
+                   timestamp_format: str) -> bool:
+    """
+    :param samples: series of timestamp strings
+    :param timestamp_format: strptime format string
+    :return: True if every non-empty sample parses with the format
+    """
+    parsed = pd.to_datetime(samples, format=timestamp_format, errors="coerce")
+    return bool(len(samples)) and not (parsed.isna() & samples.notna()).any()
+
+
+def detect_timestamp_format(samples: pd.Series):
+    """
+    Finds the first candidate format that parses every sample
+    :param samples: series of timestamp strings
+    :return: strptime format string, or None if no candidate matches
+    """
+    samples = samples.dropna().astype(str).str.strip()
+    for timestamp_format in candidate_formats:
+        if matches_format(samples, timestamp_format):
+            return timestamp_format
+    return None
+
+
+def get_source_format(data_source: str,
+                      samples: pd.Series):
+    """
+    Returns the timestamp format of a data source - the cached format if it still matches the samples, otherwise the format
+    is detected again and cached
+    :param data_source: Database identifier
+    :param samples: series of timestamp strings from the file being read
+    :return: strptime format string, or None if the format could not be detected
+    """
+    samples = samples.dropna().astype(str).str.strip()
+    cached_format = load_source_formats().get(data_source)
+    if cached_format is not None and matches_format(samples, cached_format):
+        return cached_format
+    timestamp_format = detect_timestamp_format(samples)
+    if timestamp_format is not None:
+        save_source_format(data_source, timestamp_format)
+    return timestamp_format
+
+
+def get_fixed_width_layout(timestamp_format: str):
+    """
+    Works out the byte position of each field of a format with only zero padded numeric fields, e.g. '%d/%m/%Y %H:%M'
+    :param timestamp_format: strptime format string
+    :return: dictionary of field to (start, width), dictionary of separator position to character and the total width,
+             or None if the format has other fields
+    """
+    fields, separators, position = {}, {}, 0
+    for token in re.findall(r"%.|[^%]", timestamp_format):
+        if token.startswith("%"):
+            if token not in fixed_width_fields:
+                return None
+            fields[token] = (position, fixed_width_fields[token])
+            position += fixed_width_fields[token]
+        else:
+            separators[position] = ord(token)
+            position += 1
+    return fields, separators, position
+
+
+def parse_fixed_width(values: pd.Series,
+                      timestamp_format: str) -> np.ndarray:
+    """
+    Parses fixed width timestamps with array arithmetic on their bytes - several times faster than strptime
+    :param values: series of timestamp strings
+    :param timestamp_format: strptime format string with only zero padded numeric fields
+    :return: array of datetime64[ns] values - NaT where a value does not match the format
+    """
+    fields, separators, width = get_fixed_width_layout(timestamp_format)
+    # one spare byte shows up values that are longer than the format
+    chars = np.asarray(values.to_numpy(), dtype=f"S{width + 1}").view(np.uint8).reshape(-1, width + 1)
+    digits = chars.astype(np.int64) - ord("0")
+    valid = chars[:, width] == 0
+    for position, separator in separators.items():
+        valid &= chars[:, position] == separator
+
+    def read_field(field, default):
+        if field not in fields:
+            return np.full(len(chars), default, dtype=np.int64)
+        start, field_width = fields[field]
+        field_digits = digits[:, start:start + field_width]
+        nonlocal valid
+        valid &= ((field_digits >= 0) & (field_digits <= 9)).all(axis=1)
+        return field_digits @ (10 ** np.arange(field_width - 1, -1, -1))
+
+    year, month, day = read_field("%Y", 1970), read_field("%m", 1), read_field("%d", 1)
+    hour, minute, second = read_field("%H", 0), read_field("%M", 0), read_field("%S", 0)
+    valid &= (month >= 1) & (month <= 12) & (hour < 24) & (minute < 60) & (second < 60)
+    month_start = ((year - 1970) * 12 + month - 1).astype("datetime64[M]")
+    days_in_month = ((month_start + 1).astype("datetime64[D]") - month_start.astype("datetime64[D]")).astype(np.int64)
+    valid &= (day >= 1) & (day <= days_in_month)
+
+    dates = month_start.astype("datetime64[s]") + ((day - 1) * 86400 + hour * 3600 + minute * 60 + second)
+    dates = dates.astype("datetime64[ns]")
+    dates[~valid] = np.datetime64("NaT")
+    return dates
+
+
+def get_reader_format(timestamp_format: str) -> str:
+    """
+    :param timestamp_format: strptime format string
+    :return: 'ISO8601' for ISO 8601 formats, so pandas uses its ISO 8601 parser, otherwise the format itself
+    """
+    return "ISO8601" if timestamp_format in iso_formats else timestamp_format
+
+
+def parse_timestamps(values: pd.Series,
+                     timestamp_format: str = None) -> pd.Series:
+    """
+    Parses timestamp strings with an explicit format - read from the bytes directly for fixed width formats. Values that do
+    not match the format go through pandas' day first inference one by one, so a few odd rows do not fail the file - values
+    that cannot be parsed at all become NaT
+    :param values: series of timestamp strings
+    :param timestamp_format: strptime format string, or None to infer every value
+    :return: series of datetime64 values
+    """
+    if timestamp_format is None:
+        return pd.to_datetime(values, dayfirst=True, format="mixed", errors="coerce")
+    if timestamp_format not in iso_formats and get_fixed_width_layout(timestamp_format) is not None:
+        parsed = pd.Series(parse_fixed_width(values, timestamp_format), index=values.index)
+    else:
+        parsed = pd.to_datetime(values, format=get_reader_format(timestamp_format), errors="coerce")
+    unmatched = parsed.isna() & values.notna()
+    if unmatched.any():
+        parsed[unmatched] = pd.to_datetime(values[unmatched], dayfirst=True, format="mixed", errors="coerce")
+    return parsed
+
+
+def read_with_pyarrow(data_file: str,
+                      date_col: str,
+                      value_cols: list,
+                      timestamp_format: str):
+    """
+    Reads the columns with pyarrow's multithreaded csv reader, parsing the timestamps with the detected format
+    :return: DataFrame, or None if pyarrow is not installed or a timestamp does not match the format
+    """
+    try:
+        import pyarrow as pa
+        from pyarrow import csv as pa_csv
+    except ImportError:
+        return None
+    convert_options = pa_csv.ConvertOptions(include_columns=[date_col] + list(value_cols),
+                                            column_types={date_col: pa.timestamp("s")},
+                                            timestamp_parsers=[pa_csv.ISO8601 if timestamp_format in iso_formats
+                                                               else timestamp_format])
+    try:
+        table = pa_csv.read_csv(str(data_file), convert_options=convert_options)
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+        return None
+    df = table.to_pandas()
+    df[date_col] = df[date_col].astype("datetime64[ns]")
+    return df
+
+
+def read_wind_csv(data_file: str,
+                  data_source: str,
+                  date_col: str,
+                  value_cols: list,
+                  engine: str = "pyarrow") -> pd.DataFrame:
+    """
+    Reads the date and wind columns of a station csv file, parsing the dates with the data source's timestamp format
+    :param data_file: path to the station's csv data file
+    :param data_source: Database identifier - BOM or OEH etc.
+    :param date_col: name of the timestamp column
+    :param value_cols: names of the other columns to read
+    :param engine: 'pyarrow' to read with pyarrow's csv reader where installed, or 'c' for pandas' C reader
+    :return: DataFrame with the date column as datetime64 values
+    """
+    samples = pd.read_csv(data_file, usecols=[date_col], dtype=str, nrows=sample_rows)[date_col]
+    timestamp_format = get_source_format(data_source, samples)
+    if engine == "pyarrow" and timestamp_format is not None:
+        df = read_with_pyarrow(data_file, date_col, value_cols, timestamp_format)
+        if df is not None:
+            return df
+    if timestamp_format is not None and timestamp_format not in iso_formats \
+            and get_fixed_width_layout(timestamp_format) is not None:
+        df = pd.read_csv(data_file, usecols=[date_col] + list(value_cols), dtype={date_col: str})
+        df[date_col] = parse_timestamps(df[date_col], timestamp_format)
+        return df
+    # other formats are parsed by the reader - a column left as strings has values that need the slow path
+    if timestamp_format is None:
+        df = pd.read_csv(data_file, usecols=[date_col] + list(value_cols), parse_dates=[date_col], dayfirst=True)
+    else:
+        df = pd.read_csv(data_file, usecols=[date_col] + list(value_cols), parse_dates=[date_col],
+                         date_format=get_reader_format(timestamp_format))
+    if not pd.api.types.is_datetime64_any_dtype(df[date_col]):
+        df[date_col] = parse_timestamps(df[date_col], timestamp_format)
+    return df
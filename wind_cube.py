@@ -0,0 +1,289 @@
+import os
+import numpy as np
+import pandas as pd
+from data_cache import get_cache_path, get_file_signature
+from daylight import classify_daylight
+from compact import get_wd_values
+from windrose_frequencies import get_sectors, get_sector_codes, get_interval_labels, get_ws_codes, \
+    get_panel_codes_from_parts, frequency_table_from_counts
+
+cube_version = 3
+
+# wind direction bins are whole degrees 0-360, with one extra bin for missing directions
+n_wd_bins = 362
+wd_missing_bin = 361
+
+
+class WindCube:
+    """
+    Sparse count cube of a station's wind data - the number of hours in each (year, month, hour, daylight flag,
+    1 degree direction bin, fine speed bin) cell. Any wind rose frequency table can be produced by summing and re-binning the
+    cells, without re-reading or re-slicing the station data.
+    Direction bins are exact for ray angles whose half angle is a whole number of degrees, and speed bins are exact for wind
+    speed categories and calms thresholds that are multiples of ws_resolution. Speeds exactly on a multiple of ws_resolution
+    have their own speed bin, 2 * k for k * ws_resolution, apart from the speeds between multiples, 2 * k + 1, so both the
+    right-closed speed intervals of openair and the calms threshold (speeds below it) can be re-binned exactly
+
+    Attributes:
+        codes: numpy array
+            Linear index of each non-empty cell, see dims
+        counts: numpy array
+            Number of hours in each non-empty cell
+        start_year: int
+            First year in the cube
+        dims: tuple
+            Size of each cube dimension - (years, 12 months, 24 hours, 2 daylight flags, 362 direction bins, speed bins)
+        latitude: float
+            Latitude used to classify daylight hours
+        longitude: float
+            Longitude used to classify daylight hours
+        ws_resolution: float
+            Width of the fine wind speed bins in m/s
+        max_ws: numpy array
+            Highest wind speed recorded in each non-empty cell, so the last speed interval is labelled from the data
+    """
+
+    def __init__(self, codes, counts, start_year, dims, latitude, longitude, ws_resolution, max_ws):
+        self.codes = codes
+        self.counts = counts
+        self.max_ws = max_ws
+        self.start_year = int(start_year)
+        self.dims = tuple(int(x) for x in dims)
+        self.latitude = float(latitude)
+        self.longitude = float(longitude)
+        self.ws_resolution = float(ws_resolution)
+        self._cells = None
+
+    @classmethod
+    def from_wind_df(cls,
+                     wind_df: pd.DataFrame,
+                     latitude: float,
+                     longitude: float,
+                     ws_resolution: float = 0.1):
+        """
+        Builds the count cube from a station data frame in one pass
+        :param wind_df: data frame containing 'date', 'ws', 'wd' columns, as returned by import_data
+        :param latitude: latitude of station
+        :param longitude: longitude of station
+        :param ws_resolution: width of the fine wind speed bins in m/s
+        :return: WindCube
+        """
+        ws = wind_df["ws"].to_numpy(dtype=np.float64)
+        wd = get_wd_values(wind_df["wd"])
+        dates = wind_df["date"].to_numpy(dtype="datetime64[s]")
+        valid = ~np.isnan(ws) & ~np.isnat(dates)
+        ws, wd, dates = ws[valid], wd[valid], dates[valid]
+
+        years = dates.astype("datetime64[Y]").astype(np.int64) + 1970
+        start_year = int(years.min()) if len(years) else 1970
+        months = dates.astype("datetime64[M]").astype(np.int64) % 12
+        hours = (dates - dates.astype("datetime64[D]")).astype("timedelta64[h]").astype(np.int64)
+        daylight = classify_daylight(dates, latitude, longitude).astype(np.int64)
+        with np.errstate(invalid="ignore"):
+            wd_bin = np.where(np.isnan(wd) | (wd < 0), wd_missing_bin, np.clip(np.ceil(wd), 0, 360)).astype(np.int64)
+        ws_steps = np.round(np.clip(ws, 0, None) / ws_resolution, 6)
+        ws_bin = 2 * np.floor(ws_steps).astype(np.int64) + (ws_steps != np.floor(ws_steps))
+
+        dims = (int(years.max()) - start_year + 1 if len(years) else 0, 12, 24, 2, n_wd_bins,
+                int(ws_bin.max()) + 1 if len(ws_bin) else 1)
+        linear_code = np.ravel_multi_index((years - start_year, months, hours, daylight, wd_bin, ws_bin), dims)
+        # sort by cell so the counts and maximum speeds are reductions over runs of equal codes
+        order = np.argsort(linear_code, kind="stable")
+        linear_code = linear_code[order]
+        starts = np.flatnonzero(np.r_[True, linear_code[1:] != linear_code[:-1]]) if len(linear_code) \
+            else np.zeros(0, dtype=np.int64)
+        codes = linear_code[starts]
+        counts = np.diff(np.r_[starts, len(linear_code)])
+        max_ws = np.maximum.reduceat(ws[order], starts) if len(starts) else np.zeros(0)
+        return cls(codes, counts, start_year, dims, latitude, longitude, ws_resolution, max_ws)
+
+    def save(self, path: str, signature: np.ndarray = None):
+        """
+        Saves the cube to a .npz file
+        :param path: output path
+        :param signature: optional source file signature used to detect when the cube is out of date
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        temp_path = path + f".{os.getpid()}.tmp"
+        with open(temp_path, "wb") as f:
+            np.savez(f, version=np.array(cube_version), codes=self.codes, counts=self.counts, max_ws=self.max_ws,
+                     start_year=np.array(self.start_year), dims=np.array(self.dims),
+                     location=np.array([self.latitude, self.longitude]), ws_resolution=np.array(self.ws_resolution),
+                     signature=signature if signature is not None else np.array([], dtype=np.int64))
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path: str, signature: np.ndarray = None):
+        """
+        Loads a cube saved with save
+        :param path: path to the .npz file
+        :param signature: optional source file signature - the cube is treated as out of date if it does not match
+        :return: WindCube, or None if the file is missing or out of date
+        """
+        if not os.path.isfile(path):
+            return None
+        try:
+            with np.load(path, allow_pickle=False) as saved:
+                if int(saved["version"]) != cube_version:
+                    return None
+                if signature is not None and not np.array_equal(saved["signature"], signature):
+                    return None
+                return cls(saved["codes"], saved["counts"], int(saved["start_year"]), saved["dims"],
+                           saved["location"][0], saved["location"][1], float(saved["ws_resolution"]), saved["max_ws"])
+        except (OSError, ValueError, KeyError):
+            return None
+
+    @property
+    def cells(self) -> dict:
+        """
+        The coordinates of each non-empty cell, decoded from the linear index on first use
+        :return: dictionary of 'year', 'month', 'hour', 'daylight', 'wd_bin', 'ws_bin' arrays
+        """
+        if self._cells is None:
+            year, month, hour, daylight, wd_bin, ws_bin = np.unravel_index(self.codes, self.dims)
+            self._cells = {"year": year + self.start_year, "month": month, "hour": hour, "daylight": daylight,
+                           "wd_bin": wd_bin, "ws_bin": ws_bin}
+        return self._cells
+
+    def get_years(self) -> list:
+        """
+        :return: list of the years with data in the cube
+        """
+        return [int(x) for x in np.unique(self.cells["year"])]
+
+    def is_exact_for(self,
+                     ray_angle: float,
+                     categories: list,
+                     calms_threshold: float) -> bool:
+        """
+        Checks that the cube bins line up with the wind rose bins, so frequency_table matches the station data exactly
+        :param ray_angle: angle between rays of the wind rose
+        :param categories: list of wind speed breaks
+        :param calms_threshold: threshold for calms in m/s
+        :return: True if half the ray angle is a whole number of degrees, and the speed breaks and calms threshold are
+                 multiples of ws_resolution - the edges of the right-closed speed intervals then fall on the exact speed
+                 bins
+        """
+        def is_multiple(value, step):
+            return abs(value / step - round(value / step)) < 1e-6
+
+        return is_multiple(float(ray_angle) / 2, 1) and \
+            all(is_multiple(float(x), self.ws_resolution) for x in list(categories) + [calms_threshold])
+
+    def frequency_table(self,
+                        rose_type: list,
+                        ray_angle: float,
+                        categories: list,
+                        calms_threshold: float,
+                        hours: list = None,
+                        years: list = None,
+                        period: tuple = None,
+                        hemisphere: str = "southern") -> pd.DataFrame:
+        """
+        Produces the same frequency table as calculate_windrose_frequencies by summing and re-binning the cube cells
+        :param rose_type: list of openair types, e.g. ['season', 'daylight']
+        :param ray_angle: angle between rays of the wind rose
+        :param categories: list of wind speed breaks
+        :param calms_threshold: threshold for calms in m/s
+        :param hours: optional list of hours to include
+        :param years: optional list of years to include
+        :param period: optional inclusive ((start year, start month), (end year, end month)) range, months numbered from 1
+        :param hemisphere: 'southern' or 'northern'
+        :return: frequency table data frame, see calculate_windrose_frequencies
+        """
+        cells = self.cells
+        mask = np.ones(len(self.counts), dtype=bool)
+        if hours is not None:
+            mask &= np.isin(cells["hour"], np.asarray(hours))
+        if years is not None:
+            mask &= np.isin(cells["year"], np.asarray(years))
+        if period is not None:
+            month_index = cells["year"] * 12 + cells["month"]
+            mask &= (month_index >= period[0][0] * 12 + period[0][1] - 1) & (month_index <= period[1][0] * 12 + period[1][1] - 1)
+
+        counts = self.counts[mask]
+        ws_bin = cells["ws_bin"][mask]
+        wd = cells["wd_bin"][mask].astype(np.float64)
+        # calms as set by replace_calms, then directions missing for non-calm hours are dropped as openair does
+        calm = ws_bin < 2 * round(calms_threshold / self.ws_resolution)
+        wd[calm] = -999
+        keep = calm | (cells["wd_bin"][mask] != wd_missing_bin)
+        counts, ws_bin, wd = counts[keep], ws_bin[keep], wd[keep]
+        max_ws = self.max_ws[mask][keep]
+        months = cells["month"][mask][keep]
+        daylight = cells["daylight"][mask][keep] == 1
+
+        panel_code = np.zeros(len(counts), dtype=np.int64)
+        type_labels = []
+        for type_name in rose_type:
+            codes, labels = get_panel_codes_from_parts(months, daylight, type_name, hemisphere)
+            panel_code = panel_code * len(labels) + codes
+            type_labels.append(labels)
+        n_panels = int(np.prod([len(x) for x in type_labels]))
+
+        sectors = get_sectors(ray_angle)
+        sector_code = get_sector_codes(wd, ray_angle, sectors)
+        interval_labels = get_interval_labels(categories, float(max_ws.max()) if len(max_ws) else categories[-1])
+        # the speed bins are compared with the breaks in the same units, which avoids floating point error at the breaks
+        ws_code = get_ws_codes(ws_bin, [2 * round(x / self.ws_resolution) for x in categories], len(interval_labels))
+
+        n_sectors = len(sectors) + 1
+        # one extra interval code for the speeds below the first break
+        n_codes = len(interval_labels) + 1
+        linear_code = (panel_code * n_sectors + sector_code) * n_codes + ws_code
+        binned = np.bincount(linear_code, weights=counts, minlength=n_panels * n_sectors * n_codes)
+        return frequency_table_from_counts(binned.astype(np.int64).reshape(n_panels, n_sectors, n_codes), rose_type,
+                                           type_labels, sectors, interval_labels)
+
+
+def get_cube_period(data_period: str):
+    """
+    Converts a custom data period into a month range that can be answered from a wind cube
+    :param data_period: custom user data period, e.g. '1/1/2019-31/12/2019'
+    :return: ((start year, start month), (end year, end month)), None if no period is set, or False if the period does
+             not start and end on whole months
+    """
+    if not data_period:
+        return None
+    from functions import get_custom_data_period
+    dates = get_custom_data_period(data_period)
+    start, end = dates[0], dates[-1]
+    if len(dates) == 1 or start.day != 1 or not end.is_month_end:
+        return False
+    return (start.year, start.month), (end.year, end.month)
+
+
+def load_or_build_wind_cube(data_source: str,
+                            data_file: str,
+                            latitude: float,
+                            longitude: float,
+                            wind_df: pd.DataFrame = None,
+                            resample: str = None) -> WindCube:
+    """
+    Loads the station's wind cube from the local cache, or builds and caches it if the source file has changed
+    :param data_source: Database identifier
+    :param data_file: path to the station's csv data file
+    :param latitude: latitude of station
+    :param longitude: longitude of station
+    :param wind_df: optional station data frame, to avoid re-importing the data if the cube has to be built
+    :param resample: optional interval the data is averaged into before it is counted, e.g. '1h' - a separate cube is
+                     cached for each interval (see resampler.py)
+    :return: WindCube
+    """
+    suffix = f"_cube_{float(latitude):g}_{float(longitude):g}" + (f"_{resample}" if resample else "")
+    cube_path = get_cache_path(data_source, data_file, suffix=suffix)
+    signature = get_file_signature(data_file)
+    cube = WindCube.load(cube_path, signature)
+    if cube is None:
+        if wind_df is None and resample:
+            from resampler import import_data_resampled
+            wind_df = import_data_resampled(data_source, data_file, resample)
+        elif wind_df is None:
+            from functions import import_data
+            wind_df = import_data(data_source, data_file)
+        cube = WindCube.from_wind_df(wind_df, latitude, longitude)
+        try:
+            cube.save(cube_path, signature)
+        except OSError:
+            print("\nUnable to write the wind cube to the local data cache - continuing without caching\n")
+    return cube
@@ -0,0 +1,108 @@
+import numpy as np
+import pandas as pd
+from functions import get_custom_period_bounds, parse_custom_hours, report_custom_period
+
+all_hours_mask = (1 << 24) - 1
+
+
+def get_hour_mask(hours) -> int:
+    """
+    Converts a list of hours into a 24 bit mask, bit 0 for midnight
+    :param hours: list of hours of the day
+    :return: integer hour mask
+    """
+    mask = 0
+    for hour in hours:
+        mask |= 1 << int(hour)
+    return mask
+
+
+class WindQuery:
+    """
+    Lazy query over a station's wind data that replaces the slice_by_custom_dates -> slice_by_custom_hours -> replace_calms
+    chain. Each stage is only recorded, then run() applies them together in one NumPy pass and builds a single output frame.
+    The source frame is never modified
+
+    Functions:
+        dates(self, data_period) -> WindQuery
+            Keeps the rows in a custom user data period
+        hours(self, selected_hours) -> WindQuery
+            Keeps the rows in a custom subset of hours
+        calms(self, calms_threshold) -> WindQuery
+            Sets the wind direction of calm hours to openair's null flag -999
+        run(self) -> pd.DataFrame
+            Applies the recorded stages and returns the result
+    """
+
+    def __init__(self, wind_df: pd.DataFrame):
+        """
+        :param wind_df: data frame containing 'date', 'ws', 'wd' columns
+        """
+        self.wind_df = wind_df
+        self.start = None
+        self.end = None
+        self.hour_mask = all_hours_mask
+        self.calms_threshold = None
+
+    def dates(self, data_period: str):
+        """
+        :param data_period: custom user data period, e.g. '1/1/2019-31/12/2019', or None for all data
+        """
+        if data_period:
+            self.start, self.end = get_custom_period_bounds(data_period)
+        return self
+
+    def hours(self, selected_hours: str):
+        """
+        :param selected_hours: string of custom hours from GUI, e.g. '0-6,18-23', or None for all hours
+        """
+        if selected_hours:
+            self.hour_mask &= get_hour_mask(parse_custom_hours(selected_hours))
+        return self
+
+    def calms(self, calms_threshold: float):
+        """
+        :param calms_threshold: threshold for calms in m/s
+        """
+        self.calms_threshold = calms_threshold
+        return self
+
+    def run(self) -> pd.DataFrame:
+        """
+        Applies the date period, hours and calms in one pass over the data
+        :return: new data frame with the same columns as the source, indexed from 0
+        """
+        # dates keep their unit, so compact datetime64[s] frames are not widened
+        dates = self.wind_df["date"].to_numpy()
+        if len(dates):
+            wind_start_year = int(dates[0].astype("datetime64[Y]").astype(np.int64)) + 1970
+            wind_end_year = int(dates[-1].astype("datetime64[Y]").astype(np.int64)) + 1970
+            if self.start is not None:
+                report_custom_period(wind_start_year, wind_end_year, self.start, self.end)
+            else:
+                print(f"\nThe processed wind data period is {wind_start_year} to {wind_end_year}\n")
+
+        keep = None
+        if self.start is not None:
+            keep = (dates >= self.start.to_datetime64()) & (dates <= self.end.to_datetime64())
+        if self.hour_mask != all_hours_mask:
+            hour_allowed = np.array([bool(self.hour_mask >> hour & 1) for hour in range(24)])
+            in_hours = hour_allowed[dates.astype("datetime64[h]").view(np.int64) % 24]
+            keep = in_hours if keep is None else keep & in_hours
+        rows = np.flatnonzero(keep) if keep is not None else None
+
+        columns = {}
+        for col in self.wind_df.columns:
+            if col in ("date", "ws", "wd"):
+                values = dates if col == "date" else self.wind_df[col].to_numpy()
+                columns[col] = values[rows] if rows is not None else values.copy()
+            else:
+                # other columns, e.g. categoricals, keep their pandas dtype
+                values = self.wind_df[col] if rows is None else self.wind_df[col].iloc[rows]
+                columns[col] = values.reset_index(drop=True)
+        if self.calms_threshold is not None:
+            with np.errstate(invalid="ignore"):
+                calm = columns["ws"] < self.calms_threshold
+            # the wd column is already a copy, in its own dtype
+            columns["wd"][calm] = -999
+        return pd.DataFrame(columns, copy=False)
@@ -0,0 +1,234 @@
+import json
+import numpy as np
+import pandas as pd
+from daylight import classify_daylight, daylight_labels, daylight_column
+from compact import get_wd_values
+
+month_labels = ["January", "February", "March", "April", "May", "June", "July", "August", "September", "October",
+                "November", "December"]
+
+season_labels = {
+    "southern": ["spring (SON)", "summer (DJF)", "autumn (MAM)", "winter (JJA)"],
+    "northern": ["spring (MAM)", "summer (JJA)", "autumn (SON)", "winter (DJF)"]
+}
+
+# index into the season labels for each month, January first - the seasons are ordered spring, summer, autumn, winter
+season_of_month = np.array([1, 1, 2, 2, 2, 3, 3, 3, 0, 0, 0, 1])
+
+
+def get_sectors(ray_angle: float) -> np.ndarray:
+    """
+    Returns the wind direction sector centres used by openair for a given ray angle
+    :param ray_angle: angle between rays of the wind rose
+    :return: sorted array of sector centres in degrees, with north as 360
+    """
+    max_k = int(np.ceil(360 / ray_angle - 0.5))
+    sectors = ray_angle * np.arange(0, max_k + 1)
+    sectors[sectors == 0] = 360
+    return np.unique(sectors)
+
+
+def get_interval_labels(categories: list,
+                        max_ws: float) -> list:
+    """
+    Creates openair style labels for the wind speed intervals, e.g. '0.5 to 1'
+    :param categories: list of wind speed breaks
+    :param max_ws: maximum wind speed in the data - closes the last interval
+    :return: list of interval labels
+    """
+    breaks = list(categories)
+    if max_ws > breaks[-1]:
+        breaks.append(max_ws)
+    breaks = [float(x) for x in breaks]
+    return [f"{breaks[i]:g} to {breaks[i + 1]:g}" for i in range(len(breaks) - 1)] if len(breaks) > 1 \
+        else [f"{breaks[0]:g} to {breaks[0]:g}"]
+
+
+def get_panel_codes(dates: np.ndarray,
+                    type_name: str,
+                    hemisphere: str,
+                    latitude: float,
+                    longitude: float,
+                    daylight_flags: np.ndarray = None) -> (np.ndarray, list):
+    """
+    Assigns each row of data to a panel for one openair rose type
+    :param dates: array of datetime64 dates
+    :param type_name: openair type - 'default', 'season', 'month' or 'daylight'
+    :param hemisphere: 'southern' or 'northern'
+    :param latitude: latitude of station
+    :param longitude: longitude of station
+    :param daylight_flags: optional precomputed daylight classification, True for daylight
+    :return: integer panel code for each row, list of panel labels
+    """
+    months = dates.astype("datetime64[M]").astype(np.int64) % 12
+    if type_name == "daylight" and daylight_flags is None:
+        daylight_flags = classify_daylight(dates, latitude, longitude)
+    return get_panel_codes_from_parts(months, daylight_flags, type_name, hemisphere)
+
+
+def get_panel_codes_from_parts(months: np.ndarray,
+                               daylight_flags: np.ndarray,
+                               type_name: str,
+                               hemisphere: str) -> (np.ndarray, list):
+    """
+    Assigns panels for one openair rose type from the month and daylight classification of each row
+    :param months: array of months, 0 for January
+    :param daylight_flags: array of daylight classifications, True for daylight - only used for 'daylight'
+    :param type_name: openair type - 'default', 'season', 'month' or 'daylight'
+    :param hemisphere: 'southern' or 'northern'
+    :return: integer panel code for each row, list of panel labels
+    """
+    if type_name == "default":
+        return np.zeros(len(months), dtype=np.int64), ["all data"]
+    if type_name == "month":
+        return months, month_labels
+    if type_name == "season":
+        return season_of_month[months], season_labels[hemisphere]
+    if type_name == "daylight":
+        return np.where(daylight_flags, 0, 1), daylight_labels
+    raise ValueError(f"Rose type '{type_name}' is not supported by the frequency engine")
+
+
+def calculate_windrose_frequencies(wind_df: pd.DataFrame,
+                                   rose_type: list = None,
+                                   ray_angle: float = 30,
+                                   categories: list = None,
+                                   latitude: float = -34,
+                                   longitude: float = 151,
+                                   hemisphere: str = "southern") -> pd.DataFrame:
+    """
+    Calculates the binned wind rose frequency table that openair's windRose plots, in a single histogram pass
+    Rows with a wind direction of -999 (see replace_calms) are counted as calms. Frequencies are percentages of all valid
+    hours in each panel, including calms and the speeds at or below the first break, which are in no interval as in openair
+    :param wind_df: data frame containing 'date', 'ws', 'wd' columns, as produced by replace_calms - in either representation
+    :param rose_type: list of openair types, e.g. ['season', 'daylight']
+    :param ray_angle: angle between rays of the wind rose
+    :param categories: list of wind speed breaks
+    :param latitude: latitude of station - used for daylight types
+    :param longitude: longitude of station - used for daylight types
+    :param hemisphere: 'southern' or 'northern' - used for season types
+    :return: data frame with one row per panel and direction sector - a column for each rose type, 'wd', a column for each
+             wind speed interval, 'total', 'calm' and 'count'
+    """
+    if rose_type is None:
+        rose_type = ["default"]
+    if categories is None:
+        categories = [0.5, 1, 2, 3, 4, 5, 7, 10, 15, 20]
+    daylight_flags = None
+    if daylight_column in wind_df.columns:
+        daylight_flags = wind_df[daylight_column].to_numpy() == daylight_labels[0]
+
+    ws = wind_df["ws"].to_numpy(dtype=np.float64)
+    wd = get_wd_values(wind_df["wd"])
+    dates = wind_df["date"].to_numpy()
+    valid = ~(np.isnan(ws) | np.isnan(wd))
+    ws, wd, dates = ws[valid], wd[valid], dates[valid]
+    if daylight_flags is not None:
+        daylight_flags = daylight_flags[valid]
+
+    # panel code combining every type, e.g. season x daylight
+    panel_code = np.zeros(len(ws), dtype=np.int64)
+    type_labels = []
+    for type_name in rose_type:
+        codes, labels = get_panel_codes(dates, type_name, hemisphere, latitude, longitude, daylight_flags)
+        panel_code = panel_code * len(labels) + codes
+        type_labels.append(labels)
+    n_panels = int(np.prod([len(x) for x in type_labels]))
+
+    sectors = get_sectors(ray_angle)
+    sector_code = get_sector_codes(wd, ray_angle, sectors)
+    interval_labels = get_interval_labels(categories, np.max(ws) if len(ws) else categories[-1])
+    ws_code = get_ws_codes(ws, categories, len(interval_labels))
+
+    n_sectors = len(sectors) + 1
+    # one extra interval code for the speeds below the first break
+    n_codes = len(interval_labels) + 1
+    linear_code = (panel_code * n_sectors + sector_code) * n_codes + ws_code
+    counts = np.bincount(linear_code, minlength=n_panels * n_sectors * n_codes)
+    return frequency_table_from_counts(counts.reshape(n_panels, n_sectors, n_codes), rose_type, type_labels, sectors,
+                                       interval_labels)
+
+
+def get_sector_codes(wd: np.ndarray,
+                     ray_angle: float,
+                     sectors: np.ndarray) -> np.ndarray:
+    """
+    Assigns each wind direction to an openair direction sector - code 0 is reserved for calms (wd == -999)
+    :param wd: array of wind directions
+    :param ray_angle: angle between rays of the wind rose
+    :param sectors: sector centres from get_sectors
+    :return: array of sector codes, 1 for the first sector in 'sectors'
+    """
+    rounded_wd = ray_angle * np.ceil(wd / ray_angle - 0.5)
+    rounded_wd[rounded_wd == 0] = 360
+    sector_code = np.searchsorted(sectors, rounded_wd) + 1
+    sector_code[wd == -999] = 0
+    return sector_code
+
+
+def get_ws_codes(ws: np.ndarray,
+                 categories: list,
+                 n_intervals: int) -> np.ndarray:
+    """
+    Assigns each wind speed to a wind speed interval. The intervals are closed on the right like openair's cut of the wind
+    speeds, so a speed exactly on a break is counted in the interval below it. Speeds at or below the first break are in no
+    interval - they only count towards the panel totals, as in openair
+    :param ws: array of wind speeds
+    :param categories: list of wind speed breaks
+    :param n_intervals: number of intervals from get_interval_labels
+    :return: array of interval codes - n_intervals for speeds at or below the first break
+    """
+    codes = np.searchsorted(np.asarray(categories, dtype=np.float64), ws, side="left") - 1
+    return np.where(codes < 0, n_intervals, np.minimum(codes, n_intervals - 1))
+
+
+def frequency_table_from_counts(counts: np.ndarray,
+                                rose_type: list,
+                                type_labels: list,
+                                sectors: np.ndarray,
+                                interval_labels: list) -> pd.DataFrame:
+    """
+    Converts binned counts into a frequency table - see calculate_windrose_frequencies for the table layout
+    :param counts: array of counts with shape (panels, calm + sectors, intervals + 1) - the last interval code holds the
+                   speeds at or below the first break, see get_ws_codes
+    :param rose_type: list of openair types
+    :param type_labels: list of the panel labels for each type
+    :param sectors: sector centres from get_sectors
+    :param interval_labels: wind speed interval labels
+    :return: frequency table data frame
+    """
+    n_panels, n_intervals = counts.shape[0], len(interval_labels)
+    panel_totals = counts.sum(axis=(1, 2))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        freqs = 100 * counts / panel_totals[:, None, None]
+    freqs = np.nan_to_num(freqs)
+
+    panel_index = pd.MultiIndex.from_product(type_labels, names=rose_type).to_frame(index=False)
+    table = panel_index.loc[panel_index.index.repeat(len(sectors))].reset_index(drop=True)
+    table["wd"] = np.tile(sectors, n_panels)
+    sector_freqs = freqs[:, 1:, :n_intervals].reshape(-1, n_intervals)
+    for i, label in enumerate(interval_labels):
+        table[label] = sector_freqs[:, i]
+    table["total"] = sector_freqs.sum(axis=1)
+    table["calm"] = np.repeat(freqs[:, 0, :].sum(axis=1), len(sectors))
+    table["count"] = np.repeat(panel_totals, len(sectors))
+    return table
+
+
+def write_frequency_tables(table: pd.DataFrame,
+                           png_file_path: str) -> list:
+    """
+    Saves a frequency table as CSV and JSON files next to the wind rose image
+    :param table: frequency table from calculate_windrose_frequencies
+    :param png_file_path: path to the wind rose image file
+    :return: list of paths to the CSV and JSON files
+    """
+    base_path = str(png_file_path)
+    if base_path.endswith((".png", ".svg", ".pdf")):
+        base_path = base_path[:-4]
+    csv_file = base_path + "_frequencies.csv"
+    json_file = base_path + "_frequencies.json"
+    table.to_csv(csv_file, index=False)
+    with open(json_file, "w") as f:
+        json.dump(table.to_dict(orient="records"), f, indent=1)
+    return [csv_file, json_file]